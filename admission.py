@@ -0,0 +1,172 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from instrumentation import instrumentation
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted; carries the HTTP status to return."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Global concurrency cap with a bounded priority wait queue.
+
+    At most ``max_concurrency`` requests run at once. Further requests wait
+    in a queue ordered by priority class (lower value first) and arrival
+    time. A full queue is rejected immediately with 429; a request that
+    waits longer than ``queue_timeout`` is rejected with 503. Both carry a
+    ``Retry-After`` estimate based on recent service times.
+    """
+
+    def __init__(self, enabled: bool, max_concurrency: int, max_queue: int,
+                 queue_timeout: float, priorities: Dict[str, int]):
+        self.enabled = enabled
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.priorities = priorities
+
+        self.active = 0
+        self._queue: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+        self._service_ms_ewma = 1000.0
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _class_stats(self, priority_class: str) -> Dict[str, float]:
+        if priority_class not in self._stats:
+            self._stats[priority_class] = {
+                "admitted": 0, "queued": 0, "rejected_queue_full": 0, "rejected_timeout": 0,
+                "wait_ms_total": 0.0, "wait_ms_max": 0.0,
+            }
+        return self._stats[priority_class]
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, f in self._queue if not f.done())
+
+    def _retry_after(self) -> int:
+        """Seconds until the current backlog should have drained."""
+        backlog = self.queue_depth + self.active
+        seconds = backlog * self._service_ms_ewma / 1000 / self.max_concurrency
+        return max(1, math.ceil(seconds))
+
+    async def acquire(self, priority_class: str) -> float:
+        """Wait for a slot; returns the time spent queued in milliseconds."""
+        stats = self._class_stats(priority_class)
+        if not self.enabled:
+            self.active += 1
+            stats["admitted"] += 1
+            return 0.0
+
+        if self.active < self.max_concurrency and self.queue_depth == 0:
+            self.active += 1
+            stats["admitted"] += 1
+            instrumentation.observe_stage("queue", 0.0)
+            return 0.0
+
+        if self.queue_depth >= self.max_queue:
+            stats["rejected_queue_full"] += 1
+            raise AdmissionRejected(429, "Server is at capacity, admission queue is full", self._retry_after())
+
+        priority = self.priorities.get(priority_class, max(self.priorities.values(), default=0))
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._sequence), future))
+        stats["queued"] += 1
+
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # Admitted just as the timeout fired; hand the slot back
+                self.release()
+            future.cancel()
+            stats["rejected_timeout"] += 1
+            raise AdmissionRejected(
+                503, f"Request waited {self.queue_timeout}s in the admission queue", self._retry_after()
+            )
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            future.cancel()
+            raise
+
+        wait_ms = (time.perf_counter() - start) * 1000
+        stats["admitted"] += 1
+        stats["wait_ms_total"] += wait_ms
+        stats["wait_ms_max"] = max(stats["wait_ms_max"], wait_ms)
+        instrumentation.observe_stage("queue", wait_ms / 1000)
+        return wait_ms
+
+    def release(self, service_ms: Optional[float] = None):
+        """Free a slot and hand it to the highest-priority waiter."""
+        if service_ms is not None:
+            self._service_ms_ewma = 0.8 * self._service_ms_ewma + 0.2 * service_ms
+
+        self.active -= 1
+        while self._queue:
+            _, _, future = heapq.heappop(self._queue)
+            if not future.done():
+                self.active += 1
+                future.set_result(None)
+                break
+
+    @asynccontextmanager
+    async def admit(self, priority_class: str) -> AsyncIterator[float]:
+        """Hold a slot for the duration of the block."""
+        wait_ms = await self.acquire(priority_class)
+        start = time.perf_counter()
+        try:
+            yield wait_ms
+        finally:
+            self.release((time.perf_counter() - start) * 1000)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        classes = {}
+        for name, stats in self._stats.items():
+            waited = stats["queued"] - stats["rejected_timeout"]
+            classes[name] = {
+                "admitted": int(stats["admitted"]),
+                "queued": int(stats["queued"]),
+                "rejected_queue_full": int(stats["rejected_queue_full"]),
+                "rejected_timeout": int(stats["rejected_timeout"]),
+                "avg_wait_ms": round(stats["wait_ms_total"] / waited, 3) if waited > 0 else 0.0,
+                "max_wait_ms": round(stats["wait_ms_max"], 3),
+            }
+        return {
+            "enabled": self.enabled,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "active": self.active,
+            "queue_depth": self.queue_depth,
+            "avg_service_ms": round(self._service_ms_ewma, 3),
+            "priority_classes": self.priorities,
+            "classes": classes,
+        }
+
+
+# Global admission controller instance
+admission_controller = AdmissionController(
+    enabled=settings.admission_enabled,
+    max_concurrency=settings.admission_max_concurrency,
+    max_queue=settings.admission_max_queue,
+    queue_timeout=settings.admission_queue_timeout,
+    priorities=settings.admission_priorities,
+)
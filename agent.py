@@ -1,55 +1,56 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
 from langchain_openai import ChatOpenAI
-from langchain.agents import AgentExecutor, create_openai_functions_agent
+from langchain_core.language_models import BaseChatModel
+from langchain_core.utils.function_calling import convert_to_openai_function
+from langchain.agents import AgentExecutor, create_openai_functions_agent, create_tool_calling_agent
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.tools import Tool
-from langchain.schema import SystemMessage, HumanMessage
+from langchain.tools import StructuredTool, Tool
+from langchain.schema import AIMessage, BaseMessage, SystemMessage, HumanMessage
+from pydantic import BaseModel, Field
 from mcp_client import mcp_client
+from tool_catalog import tool_catalog
+from tool_cache import tool_cache
+from tool_output import tool_output
+from response_cache import response_cache, normalize_request
+from semantic_cache import semantic_cache
+from fast_path import fast_path
+from tool_router import tool_router, estimate_tokens
+from model_router import ModelTier, model_router
+from llm_client import llm_clients
+from prompt_cache import prompt_prefix
+from sessions import session_store
+from pipeline_edit import (
+    EDIT_REQUEST_TEMPLATE,
+    EDIT_SYSTEM_PROMPT,
+    REPAIR_TEMPLATE,
+    PipelineEditError,
+    apply_patch,
+    extract_pipeline_yaml,
+    outline,
+    parse_patch,
+    parse_pipeline_yaml,
+    strip_fences,
+)
+from schema_validation import schema_validator, extract_yaml, replace_yaml
+from yaml_codec import yaml_codec
+from instrumentation import LLMTimingCallback, instrumentation
 from config import settings
-import yaml
+import asyncio
+import contextvars
+import functools
+import hashlib
 import json
 import logging
+import math
 import time
+import yaml
 import os
 
 logger = logging.getLogger(__name__)
 
-
-class HarnessPipelineAgent:
-    """LangChain agent for generating Harness.io pipeline and connector YAML."""
-
-    def __init__(self):
-        self.llm = None
-        self.agent_executor = None
-        self.tools = []
-
-    async def initialize(self):
-        """Initialize the agent with OpenAI and MCP tools."""
-        logger.info("Initializing Harness Pipeline Agent...")
-        
-        # Initialize OpenAI LLM
-        logger.info("Initializing OpenAI LLM...")
-        self.llm = ChatOpenAI(
-            model="gpt-4",
-            temperature=0,
-            openai_api_key=settings.openai_api_key
-        )
-        logger.info("OpenAI LLM initialized")
-
-        # Connect to MCP server and get tools
-        logger.info("Connecting to MCP server...")
-        await mcp_client.connect()
-        logger.info("MCP server connected")
-
-        # Convert MCP tools to LangChain tools
-        logger.info("Creating LangChain tools...")
-        self.tools = await self._create_langchain_tools()
-        logger.info(f"Created {len(self.tools)} LangChain tools")
-
-        # Create the agent
-        logger.info("Creating agent executor...")
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a Harness.io pipeline and connector expert. Your role is to help users create
+SYSTEM_PROMPT = """You are a Harness.io pipeline and connector expert. Your role is to help users create
 pipeline with Harness V0 format and connector YAML configurations for Harness.io based on their requirements.
 
 You have access to Harness.io MCP server tools that can help you:
@@ -86,25 +87,385 @@ pipeline:
         -
 
 Send as the response the YAML configuration only, no other text or explanation.
-Provide only the YAML configuration, no other text or explanation."""),
+Provide only the YAML configuration, no other text or explanation."""
+
+PIPELINE_REQUEST_TEMPLATE = """Generate a Harness.io pipeline YAML based on the following request:
+
+{user_request}
+
+Please create the appropriate pipeline configuration and return it as YAML."""
+
+CONNECTOR_REQUEST_TEMPLATE = """Generate a Harness.io connector YAML based on the following request:
+
+{user_request}
+
+Please create the appropriate connector configuration and return it as YAML."""
+
+FOLLOW_UP_TEMPLATE = """Update the {kind} YAML from our conversation as follows:
+
+{user_request}
+
+Return the complete updated YAML."""
+
+SUBMIT_YAML_INSTRUCTION = """When the YAML is complete, call the submit_yaml tool with the whole document
+instead of writing it in your reply."""
+
+SUMMARY_PROMPT = """Summarize the earlier part of a conversation about Harness.io pipelines and
+connectors in at most {max_words} words. Keep names, identifiers, and requirements the
+user stated; drop YAML bodies.
+
+Existing summary:
+{summary}
+
+Turns to add:
+{turns}"""
+
+# Changes whenever the prompts change, so cached responses from older prompts are not reused
+PROMPT_VERSION = hashlib.sha256(
+    (SYSTEM_PROMPT + PIPELINE_REQUEST_TEMPLATE + CONNECTOR_REQUEST_TEMPLATE
+     + (SUBMIT_YAML_INSTRUCTION if settings.structured_output_tool else "")).encode("utf-8")
+).hexdigest()[:12]
+
+# Caps concurrent tool calls within one agent run; set per run by _tool_concurrency()
+_tool_slots: contextvars.ContextVar[Optional[asyncio.Semaphore]] = contextvars.ContextVar(
+    "tool_slots", default=None
+)
+
+
+class SubmitYamlInput(BaseModel):
+    """Arguments of the ``submit_yaml`` tool."""
+    yaml: str = Field(description="The complete Harness V0 pipeline or connector YAML document")
+
+
+@contextmanager
+def _tool_concurrency(limit: int):
+    """Give the agent run started in this block its own tool concurrency cap."""
+    token = _tool_slots.set(asyncio.Semaphore(max(1, limit)))
+    try:
+        yield
+    finally:
+        _tool_slots.reset(token)
+
+
+class AgentNotReady(Exception):
+    """Raised while the agent is still initializing (or gave up); maps to 503."""
+
+    status_code = 503
+
+    def __init__(self, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class _InFlightRun:
+    """A running agent execution that identical requests can wait on."""
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.waiters = 0
+        self.started_at = time.time()
+
+
+class HarnessPipelineAgent:
+    """LangChain agent for generating Harness.io pipeline and connector YAML."""
+
+    def __init__(self):
+        self.llm = None  # the default tier's model
+        self.llms: Dict[str, BaseChatModel] = {}
+        self.agent_executor = None  # the default tier over all tools
+        self.tools = []
+        self._schemas_by_name: Dict[str, Dict[str, Any]] = {}
+        # Executors over all tools for the other model tiers
+        self._tier_executors: Dict[str, AgentExecutor] = {}
+        # Executors over routed tool subsets, keyed by model tier and the subset's tool names (LRU)
+        self._subset_executors: "OrderedDict[Tuple[str, Tuple[str, ...]], AgentExecutor]" = OrderedDict()
+        # LLM timing per model tier, also feeding the router's latency and cost metrics
+        self._llm_callbacks = {
+            name: LLMTimingCallback(instrumentation, functools.partial(model_router.observe, name))
+            for name in model_router.tiers
+        }
+
+        # Background initialization state: pending | initializing | retrying | ready | failed
+        self.status = "pending"
+        self.init_attempts = 0
+        self.last_init_error: Optional[str] = None
+        self.startup_timings: Dict[str, float] = {}
+        self._init_task: Optional[asyncio.Task] = None
+        self._next_attempt_at: Optional[float] = None
+
+        # Rebuild tools and executor when background revalidation finds a new catalog
+        mcp_client.add_catalog_listener(self._on_catalog_changed)
+
+        # In-flight request coalescing
+        self._in_flight: Dict[Tuple[str, str], _InFlightRun] = {}
+        self._coalesce_stats = {"executions": 0, "coalesced": 0, "wait_timeouts": 0}
+
+    @property
+    def is_ready(self) -> bool:
+        return self.agent_executor is not None
+
+    async def initialize(self):
+        """Initialize the agent with OpenAI and MCP tools."""
+        logger.info("Initializing Harness Pipeline Agent...")
+        self.status = "initializing"
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
+        
+        # Initialize OpenAI LLM (one per model tier)
+        logger.info("Initializing OpenAI LLM...")
+        step = time.perf_counter()
+        self.llms = {name: self._create_llm(model_router.tiers[name]) for name in model_router.active_tiers}
+        self.llm = self.llms[model_router.default_tier]
+        timings["llm_ms"] = (time.perf_counter() - step) * 1000
+        logger.info(f"OpenAI LLM initialized for tiers: {', '.join(self.llms)}")
+
+        # Connect to MCP server and get tools
+        logger.info("Connecting to MCP server...")
+        await mcp_client.connect()
+        timings["mcp_spawn_ms"] = mcp_client.startup_timings.get("spawn_ms", 0.0)
+        timings["mcp_list_tools_ms"] = mcp_client.startup_timings.get("list_tools_ms", 0.0)
+        logger.info("MCP server connected")
+
+        # Convert MCP tools to LangChain tools
+        logger.info("Creating LangChain tools...")
+        step = time.perf_counter()
+        self.tools = await self._create_langchain_tools()
+        timings["tools_ms"] = (time.perf_counter() - step) * 1000
+        logger.info(f"Created {len(self.tools)} LangChain tools")
+
+        # Create the agent
+        logger.info("Creating agent executor...")
+        step = time.perf_counter()
+        self._tier_executors.clear()
+        self.agent_executor = self._build_executor()
+        timings["agent_build_ms"] = (time.perf_counter() - step) * 1000
+
+        if settings.schema_validation_enabled:
+            logger.info("Compiling YAML schemas...")
+            timings["schema_compile_ms"] = schema_validator.load()
+        
+        logger.info("Agent executor created successfully")
+        timings["total_ms"] = (time.perf_counter() - started) * 1000
+        self.startup_timings = {name: round(ms, 2) for name, ms in timings.items()}
+        self.status = "ready"
+        logger.info(f"Harness Pipeline Agent initialization complete in {timings['total_ms']:.0f}ms")
+
+        return self
+
+    def start_background_initialize(self, delay: float = 0.0) -> asyncio.Task:
+        """Initialize in a background task so the API can serve while MCP starts."""
+        self._init_task = asyncio.create_task(self._initialize_with_retry(delay))
+        return self._init_task
+
+    async def _initialize_with_retry(self, startup_delay: float = 0.0):
+        """
+        Call ``initialize`` until it succeeds, backing off exponentially.
+
+        Gives up (status ``failed``) after ``AGENT_INIT_MAX_ATTEMPTS``
+        attempts; 0 retries forever.
+        """
+        if startup_delay > 0:
+            await asyncio.sleep(startup_delay)
+
+        delay = settings.agent_init_retry_initial_delay
+        while True:
+            self.init_attempts += 1
+            try:
+                await self.initialize()
+            except Exception as e:
+                self.last_init_error = str(e)
+                logger.error(f"Agent initialization attempt {self.init_attempts} failed: {e}")
+                # Tear down whatever the failed attempt started before trying again
+                await mcp_client.disconnect()
+
+                if settings.agent_init_max_attempts and self.init_attempts >= settings.agent_init_max_attempts:
+                    self.status = "failed"
+                    self._next_attempt_at = None
+                    logger.error(f"Giving up on agent initialization after {self.init_attempts} attempts")
+                    return
+
+                self.status = "retrying"
+                self._next_attempt_at = time.monotonic() + delay
+                logger.info(f"Retrying agent initialization in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, settings.agent_init_retry_max_delay)
+            else:
+                self.last_init_error = None
+                self._next_attempt_at = None
+                return
+
+    def not_ready_error(self) -> AgentNotReady:
+        """The 503 to return for a request that needs the agent before it is ready."""
+        if self._next_attempt_at is not None:
+            retry_after = max(1, math.ceil(self._next_attempt_at - time.monotonic()))
+        else:
+            retry_after = 5
+        detail = f"Agent is not ready yet (status: {self.status})"
+        if self.last_init_error:
+            detail += f"; last initialization error: {self.last_init_error}"
+        return AgentNotReady(detail, retry_after)
+
+    def get_startup_status(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "attempts": self.init_attempts,
+            "last_error": self.last_init_error,
+            "startup_timings": self.startup_timings,
+        }
+
+    def _create_llm(self, tier: ModelTier) -> BaseChatModel:
+        """Create the chat model for a model tier, on the shared HTTP client of its backend."""
+        base_url = tier.base_url or settings.openai_base_url
+        return ChatOpenAI(
+            model=tier.model,
+            temperature=0,
+            openai_api_key=tier.api_key or settings.openai_api_key,
+            base_url=base_url,
+            max_tokens=tier.max_tokens,
+            http_async_client=llm_clients.client_for(base_url),
+            timeout=llm_clients.timeout,
+            max_retries=llm_clients.client_max_retries
+        )
+
+    def _llm_config(self, tier: str) -> Dict[str, Any]:
+        """Run config for LLM calls on ``tier``."""
+        return {"callbacks": [self._llm_callbacks[tier]]}
+
+    def _build_executor(self, tool_names: Optional[Sequence[str]] = None,
+                        tier: Optional[str] = None) -> AgentExecutor:
+        """
+        Build the agent executor over ``self.tools``, or only the named subset
+        of them, driven by the model of ``tier`` (default tier if not given).
+        """
+        if not self._schemas_by_name:
+            self._schemas_by_name = {schema["name"]: schema for schema in self._function_schemas()}
+        tools = self.tools if tool_names is None else [t for t in self.tools if t.name in tool_names]
+        # Tool definitions and the system prompt form the provider-cacheable
+        # prefix of every call; keep them byte-stable and everything
+        # request-specific in the human message
+        schemas = prompt_prefix.tool_block([self._schemas_by_name[tool.name] for tool in tools])
+        prompt_prefix.register(SYSTEM_PROMPT, schemas, mcp_client.catalog_hash)
+
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", SYSTEM_PROMPT),
             MessagesPlaceholder(variable_name="chat_history", optional=True),
             ("human", "{input}"),
             MessagesPlaceholder(variable_name="agent_scratchpad"),
         ])
 
-        agent = create_openai_functions_agent(self.llm, self.tools, prompt)
-        self.agent_executor = AgentExecutor(
+        agent = self._create_agent(prompt, schemas, self.llms[tier or model_router.default_tier])
+        return AgentExecutor(
             agent=agent,
-            tools=self.tools,
+            tools=tools,
             verbose=True,
             return_intermediate_steps=True,
             handle_parsing_errors=True
         )
-        
-        logger.info("Agent executor created successfully")
-        logger.info("Harness Pipeline Agent initialization complete")
 
-        return self
+    def _function_schemas(self) -> List[Dict[str, Any]]:
+        """
+        OpenAI function schemas for ``self.tools``.
+
+        Generating them is the slow part of building the agent, so they are
+        stored in the tool catalog snapshot per catalog version and reused
+        on restart. They are bound to the LLM once per executor, never per
+        request.
+        """
+        digest = mcp_client.catalog_hash
+        names = [tool.name for tool in self.tools]
+        schemas = tool_catalog.get_function_schemas(digest) if digest else None
+        if schemas is None or [schema["name"] for schema in schemas] != names:
+            schemas = [dict(convert_to_openai_function(tool)) for tool in self.tools]
+            if digest:
+                tool_catalog.save_function_schemas(digest, schemas)
+        return schemas
+
+    def _create_agent(self, prompt: ChatPromptTemplate, schemas: List[Dict[str, Any]], llm: BaseChatModel):
+        """
+        Build the agent runnable for ``AGENT_MODE``.
+
+        ``tools`` uses the tool-calling API, where the model can request
+        several tools in one turn and the executor runs them concurrently;
+        ``functions`` is the legacy one-function-call-per-turn agent.
+        """
+        if settings.agent_mode == "tools":
+            tools = [{"type": "function", "function": schema} for schema in schemas]
+            return create_tool_calling_agent(llm, tools, prompt)
+        if settings.agent_mode == "functions":
+            return create_openai_functions_agent(llm, schemas, prompt)
+        raise ValueError(f"Unknown agent mode '{settings.agent_mode}'. Use tools or functions.")
+
+    async def _on_catalog_changed(self):
+        """Swap in tools and an executor for the new MCP tool catalog."""
+        if not self.is_ready:
+            return
+        self.tools = await self._create_langchain_tools()
+        # In-flight runs keep the executor they started with
+        self._schemas_by_name = {}
+        self._subset_executors.clear()
+        self._tier_executors.clear()
+        self.agent_executor = self._build_executor()
+        logger.info(f"Rebuilt agent with {len(self.tools)} tools for catalog {mcp_client.catalog_hash}")
+
+    async def _plan(self, kind: str, user_request: str,
+                    inputs: Dict[str, Any]) -> Tuple[str, Optional[List[str]]]:
+        """
+        Pick the tools for a request, then the model tier to run it on.
+
+        Returns the tier and the routed tool subset, or ``None`` for all
+        tools when tool routing is off or finds nothing relevant. The tier
+        depends on the endpoint, the request, the estimated prompt size and
+        how many tools are offered.
+        """
+        names = await tool_router.select(kind, user_request, self._schemas_by_name, mcp_client.catalog_hash or "")
+        if names is not None and len(names) >= len(self.tools):
+            names = None
+        offered = names if names is not None else [tool.name for tool in self.tools]
+
+        text = SYSTEM_PROMPT + inputs["input"]
+        text += "".join(str(message.content) for message in inputs.get("chat_history") or [])
+        prompt_tokens = len(text) // 4 + sum(
+            estimate_tokens(self._schemas_by_name[name]) for name in offered if name in self._schemas_by_name
+        )
+        tier = model_router.route(kind, user_request, follow_up=bool(inputs.get("chat_history")),
+                                  prompt_tokens=prompt_tokens, tools=len(offered))
+        return tier, names
+
+    def _executor_for(self, tier: str, names: Optional[List[str]] = None) -> AgentExecutor:
+        """
+        The executor for a model tier over the named tools (all tools if
+        ``None``). Executors are built on first use; subset executors share
+        the precomputed schemas and are kept in a small LRU.
+        """
+        if names is None:
+            if tier == model_router.default_tier:
+                return self.agent_executor
+            if tier not in self._tier_executors:
+                self._tier_executors[tier] = self._build_executor(tier=tier)
+            return self._tier_executors[tier]
+
+        key = (tier, tuple(names))
+        subset = self._subset_executors.get(key)
+        if subset is None:
+            subset = self._build_executor(names, tier)
+            self._subset_executors[key] = subset
+            while len(self._subset_executors) > settings.tool_routing_executor_cache_size:
+                self._subset_executors.popitem(last=False)
+        else:
+            self._subset_executors.move_to_end(key)
+        return subset
+
+    @staticmethod
+    def _missing_tools(intermediate_steps: List[Any], offered: List[str]) -> List[str]:
+        """Tools the model asked for that were not in the routed subset."""
+        missing = []
+        for step in intermediate_steps:
+            action = step[0] if isinstance(step, tuple) else None
+            name = getattr(action, "tool", None)
+            if name and name not in offered and name != "_Exception":
+                missing.append(name)
+        return missing
 
     async def _create_langchain_tools(self) -> List[Tool]:
         """Convert MCP tools to LangChain tools."""
@@ -132,14 +493,14 @@ Provide only the YAML configuration, no other text or explanation."""),
                             else:
                                 args = arguments
 
-                            # Call MCP tool
-                            result = await mcp_client.call_tool(name, args)
-                            
-                            # MCP returns a CallToolResult object with content array
-                            # Extract text content from the result
-                            result_text = self._extract_mcp_result(result)
+                            # Call MCP tool (read-only tools are served from the cache)
+                            async with _tool_slots.get() or nullcontext():
+                                result_text = await tool_cache.get_or_load(
+                                    name, args, lambda: self._call_mcp_tool(name, args)
+                                )
                             
                             duration = (time.time() - start_time) * 1000
+                            instrumentation.observe_tool(name, duration / 1000, "success")
                             logger.info(f"✅ Tool {name} completed in {duration:.2f}ms")
                             logger.debug(f"📤 Tool output: {result_text[:200]}...")
                             
@@ -147,11 +508,13 @@ Provide only the YAML configuration, no other text or explanation."""),
                             
                         except json.JSONDecodeError as e:
                             duration = (time.time() - start_time) * 1000
+                            instrumentation.observe_tool(name, duration / 1000, "error")
                             error_msg = f"JSON parsing error in tool {name}: {str(e)}"
                             logger.error(f"❌ {error_msg} (after {duration:.2f}ms)")
                             return json.dumps({"error": error_msg, "tool": name, "status": "failed"})
                         except Exception as e:
                             duration = (time.time() - start_time) * 1000
+                            instrumentation.observe_tool(name, duration / 1000, "error")
                             error_msg = f"Error calling tool {name}: {str(e)}"
                             logger.error(f"❌ {error_msg} (after {duration:.2f}ms)", exc_info=True)
                             return json.dumps({"error": str(e), "tool": name, "status": "failed"})
@@ -175,19 +538,67 @@ Provide only the YAML configuration, no other text or explanation."""),
         )
         langchain_tools.append(yaml_tool)
 
+        if settings.structured_output_tool:
+            # The model hands over its final YAML as a tool argument instead of
+            # free text; return_direct ends the run without another LLM turn
+            langchain_tools.append(StructuredTool.from_function(
+                func=self._submit_yaml,
+                coroutine=self._submit_yaml_async,
+                name="submit_yaml",
+                description="Submit the final pipeline or connector YAML as the answer",
+                args_schema=SubmitYamlInput,
+                return_direct=True,
+            ))
+
         return langchain_tools
 
+    async def _call_mcp_tool(self, name: str, args: Dict[str, Any], shape: bool = True) -> str:
+        """
+        Call an MCP tool and return its text content.
+
+        With ``shape`` the text is fitted into the tool's output budget for
+        the LLM; callers that parse the full result themselves pass False.
+        """
+        with instrumentation.span("mcp_call"):
+            result = await mcp_client.call_tool(name, args)
+
+        # MCP returns a CallToolResult object with content array
+        # Extract text content from the result
+        with instrumentation.span("extract_result"):
+            result_text = self._extract_mcp_result(result)
+
+            # Raise on tool-level errors so they are never cached
+            if getattr(result, "isError", False):
+                raise RuntimeError(result_text)
+
+            if shape:
+                result_text = await tool_output.shape(name, result_text)
+
+        return result_text
+
     def _generate_yaml(self, data: str) -> str:
         """Synchronous YAML generation."""
         try:
             data_dict = json.loads(data) if isinstance(data, str) else data
-            return yaml.dump(data_dict, default_flow_style=False, sort_keys=False)
+            return yaml_codec.dump(data_dict)
         except Exception as e:
             return f"Error generating YAML: {str(e)}"
 
     async def _generate_yaml_async(self, data: str) -> str:
-        """Asynchronous YAML generation."""
-        return self._generate_yaml(data)
+        """Asynchronous YAML generation; large documents are dumped in a worker thread."""
+        try:
+            data_dict = json.loads(data) if isinstance(data, str) else data
+            return await yaml_codec.adump(data_dict)
+        except Exception as e:
+            return f"Error generating YAML: {str(e)}"
+
+    @staticmethod
+    def _submit_yaml(yaml: str) -> str:
+        """The submitted YAML becomes the agent's output."""
+        return strip_fences(yaml).strip() + "\n"
+
+    async def _submit_yaml_async(self, yaml: str) -> str:
+        return self._submit_yaml(yaml)
 
     def _extract_mcp_result(self, result: Any) -> str:
         """
@@ -215,14 +626,8 @@ Provide only the YAML configuration, no other text or explanation."""),
                         content_parts.append(str(item))
                 
                 if content_parts:
-                    combined = '\n'.join(content_parts)
-                    # Try to parse as JSON for better formatting
-                    try:
-                        parsed = json.loads(combined)
-                        return json.dumps(parsed, indent=2)
-                    except json.JSONDecodeError:
-                        # Return as-is if not JSON
-                        return combined
+                    # Passed through as sent: re-indenting JSON only made it bigger
+                    return '\n'.join(content_parts)
                 else:
                     return json.dumps({"status": "success", "message": "No content returned"})
             
@@ -287,69 +692,604 @@ Provide only the YAML configuration, no other text or explanation."""),
         
         return parsed
 
-    async def generate_pipeline(self, user_request: str) -> Dict[str, Any]:
-        """Generate a Harness pipeline based on user request."""
+    def _build_input(self, kind: str, user_request: str, follow_up: bool = False) -> str:
+        """Wrap the user request in the human message for an endpoint kind."""
+        if kind not in ("pipeline", "connector"):
+            return user_request
+        if follow_up:
+            # The previous YAML is in chat_history; ask for an edit, not a new design
+            text = FOLLOW_UP_TEMPLATE.format(kind=kind, user_request=user_request)
+        elif kind == "pipeline":
+            text = PIPELINE_REQUEST_TEMPLATE.format(user_request=user_request)
+        else:
+            text = CONNECTOR_REQUEST_TEMPLATE.format(user_request=user_request)
+        if settings.structured_output_tool:
+            text += "\n\n" + SUBMIT_YAML_INSTRUCTION
+        return text
+
+    async def _execute(self, kind: str, user_request: str, use_cache: bool = True,
+                       session_id: Optional[str] = None, store_cache: bool = True) -> Dict[str, Any]:
+        """
+        Serve a request from the template fast path, the response caches or the agent.
+
+        ``use_cache`` False skips the cache lookup (``Cache-Control: no-cache``);
+        ``store_cache`` False also keeps the answer out of the caches (``no-store``).
+        """
+        if session_id and session_store.enabled:
+            async with session_store.lock(session_id):
+                return await self._execute_in_session(kind, user_request, use_cache, session_id, store_cache)
+
+        rendered = fast_path.try_generate(kind, user_request)
+        if rendered is not None:
+            return rendered
+
         if not self.agent_executor:
-            raise RuntimeError("Agent not initialized. Call initialize() first.")
+            raise self.not_ready_error()
 
-        prompt = f"""Generate a Harness.io pipeline YAML based on the following request:
+        cached = await self._lookup_caches(kind, user_request, use_cache)
+        if cached is not None:
+            return cached
 
-{user_request}
+        result = await self._run_coalesced(kind, user_request)
+        if store_cache:
+            await self._store_caches(kind, user_request, result)
+        return result
 
-Please create the appropriate pipeline configuration and return it as YAML."""
+    async def _execute_in_session(self, kind: str, user_request: str, use_cache: bool,
+                                  session_id: str, store_cache: bool = True) -> Dict[str, Any]:
+        """
+        Serve a request as the next turn of a conversation.
 
-        result = await self.agent_executor.ainvoke({"input": prompt})
-        
-        # Parse intermediate steps for better readability
-        parsed_steps = self._parse_intermediate_steps(result.get("intermediate_steps", []))
-        
+        The first turn takes the normal path, shortcuts included. Follow-ups
+        depend on the history, so they skip the fast path, the caches and
+        coalescing and run the agent with the session as ``chat_history``.
+        """
+        history = session_store.history_messages(await session_store.get(session_id))
+        if history:
+            if not self.agent_executor:
+                raise self.not_ready_error()
+            result = await self._run_agent(kind, user_request, history)
+        else:
+            result = await self._execute(kind, user_request, use_cache, store_cache=store_cache)
+
+        await session_store.append(session_id, kind, user_request, result["output"], self._session_summarizer())
+        return {**result, "session_id": session_id}
+
+    def _session_summarizer(self):
+        """LLM summarizer for compacted session turns, or None to trim extractively."""
+        if settings.session_summarizer != "llm" or self.llm is None:
+            return None
+
+        async def summarize(summary: str, turns: List[Dict[str, Any]]) -> str:
+            words = settings.session_max_summary_tokens * 3 // 4
+            rendered = "\n".join(f"- {t['kind']}: {t['request']}" for t in turns)
+            prompt = SUMMARY_PROMPT.format(max_words=words, summary=summary or "(none)", turns=rendered)
+            tier = model_router.route("summary", rendered, prompt_tokens=len(prompt) // 4)
+            message = await self.llms[tier].ainvoke(prompt, config=self._llm_config(tier))
+            return str(message.content).strip()
+
+        return summarize
+
+    async def _lookup_caches(self, kind: str, user_request: str, use_cache: bool) -> Optional[Dict[str, Any]]:
+        """Check the exact-match cache, then the semantic cache."""
+        if not use_cache:
+            if response_cache.enabled:
+                response_cache.record_bypass()
+            return None
+
+        if response_cache.enabled:
+            cached = await response_cache.get(self._response_cache_key(kind, user_request))
+            if cached is not None:
+                logger.info(f"Response cache hit for {kind} request")
+                return {**cached, "cached": True}
+
+        if semantic_cache.enabled:
+            namespace = semantic_cache.namespace(kind, model_router.model_key, PROMPT_VERSION)
+            cached = await semantic_cache.lookup(namespace, user_request)
+            if cached is not None:
+                return {**cached, "cached": True}
+
+        return None
+
+    @staticmethod
+    def _cacheable(result: Dict[str, Any]) -> bool:
+        """Whether a result may be served again: not a stopped run, no YAML left invalid."""
+        if str(result.get("output", "")).startswith("Agent stopped"):
+            return False
+        return (result.get("validation") or {}).get("valid", True)
+
+    async def _store_caches(self, kind: str, user_request: str, result: Dict[str, Any]):
+        if not self._cacheable(result):
+            logger.info(f"Not caching {kind} response: run stopped or YAML still invalid")
+            return
+        if response_cache.enabled:
+            await response_cache.set(self._response_cache_key(kind, user_request), result)
+        if semantic_cache.enabled:
+            namespace = semantic_cache.namespace(kind, model_router.model_key, PROMPT_VERSION)
+            await semantic_cache.store(namespace, user_request, result)
+
+    def _response_cache_key(self, kind: str, user_request: str) -> str:
+        return response_cache.make_key(kind, user_request, model_router.model_key, PROMPT_VERSION)
+
+    async def _run_coalesced(self, kind: str, user_request: str) -> Dict[str, Any]:
+        """
+        Run the agent once for concurrent identical requests.
+
+        The first request for a normalized key executes; later ones wait on
+        its result for up to ``COALESCE_MAX_WAIT`` seconds and then start
+        their own execution instead.
+        """
+        if not settings.coalesce_enabled:
+            return await self._run_agent(kind, user_request)
+
+        key = (kind, normalize_request(user_request))
+        entry = self._in_flight.get(key)
+
+        if entry is not None:
+            entry.waiters += 1
+            self._coalesce_stats["coalesced"] += 1
+            logger.info(f"Coalescing {kind} request onto in-flight run ({entry.waiters} waiting)")
+            try:
+                result = await asyncio.wait_for(
+                    asyncio.shield(entry.future), timeout=settings.coalesce_max_wait
+                )
+                return dict(result)
+            except asyncio.TimeoutError:
+                self._coalesce_stats["wait_timeouts"] += 1
+                logger.warning(f"Coalesced {kind} request waited {settings.coalesce_max_wait}s, running its own execution")
+            except asyncio.CancelledError:
+                # The leader was cancelled, not us: run our own execution
+                if not entry.future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+            finally:
+                entry.waiters -= 1
+            return await self._run_agent(kind, user_request)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = _InFlightRun(future)
+        self._coalesce_stats["executions"] += 1
+        try:
+            result = await self._run_agent(kind, user_request)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an uncontended failure doesn't log a warning
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._in_flight.pop(key, None)
+
+    def get_coalescing_metrics(self) -> Dict[str, Any]:
+        """In-flight executions and how many requests are sharing them."""
+        now = time.time()
         return {
-            "output": result["output"],
-            "intermediate_steps": None,  # Don't send raw tuples (causes Pydantic errors)
-            "tool_calls": parsed_steps
+            "enabled": settings.coalesce_enabled,
+            "max_wait_seconds": settings.coalesce_max_wait,
+            **self._coalesce_stats,
+            "in_flight": [
+                {
+                    "kind": kind,
+                    "request": request[:100],
+                    "waiters": entry.waiters,
+                    "running_seconds": round(now - entry.started_at, 2),
+                }
+                for (kind, request), entry in self._in_flight.items()
+            ],
         }
 
-    async def generate_connector(self, user_request: str) -> Dict[str, Any]:
-        """Generate a Harness connector based on user request."""
-        if not self.agent_executor:
-            raise RuntimeError("Agent not initialized. Call initialize() first.")
+    async def _run_agent(self, kind: str, user_request: str,
+                         chat_history: Optional[List[BaseMessage]] = None) -> Dict[str, Any]:
+        """
+        Run the agent for a request on the routed model tier and shape the result.
 
-        prompt = f"""Generate a Harness.io connector YAML based on the following request:
+        If the run raises, stops without an answer or leaves YAML that is
+        still invalid after repair, it is run again from the start on the
+        next stronger tier (``MODEL_ESCALATION_ENABLED``).
+        """
+        inputs = self._agent_inputs(kind, user_request, chat_history)
+        tier, offered = await self._plan(kind, user_request, inputs)
+        while True:
+            started = time.perf_counter()
+            try:
+                result = await self._run_on_tier(tier, offered, kind, inputs)
+            except Exception as e:
+                next_tier = model_router.next_tier(tier)
+                model_router.record_run(tier, time.perf_counter() - started, "escalated" if next_tier else "error")
+                if next_tier is None:
+                    raise
+                reason = "error"
+                logger.warning(f"{kind} request failed on model tier {tier}: {e}; escalating to {next_tier}")
+            else:
+                # The toolset fallback may have moved the run to a stronger tier
+                tier = result["model_tier"]
+                if result["output"].startswith("Agent stopped"):
+                    reason = "incomplete"
+                elif not (result.get("validation") or {}).get("valid", True):
+                    reason = "validation"
+                else:
+                    reason = None
+                next_tier = model_router.next_tier(tier) if reason else None
+                model_router.record_run(tier, time.perf_counter() - started, "escalated" if next_tier else "ok")
+                if next_tier is None:
+                    return result
+                logger.info(f"{kind} request on model tier {tier} ended with {reason}; escalating to {next_tier}")
+            model_router.record_escalation(tier, next_tier, reason)
+            tier = next_tier
 
-{user_request}
+    async def _run_on_tier(self, tier: str, offered: Optional[List[str]], kind: str,
+                           inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        One agent run on a model tier, with its tool fallback and validation.
 
-Please create the appropriate connector configuration and return it as YAML."""
+        The result's ``model_tier`` is the tier that produced it: stronger
+        than ``tier`` when the fallback to all tools needed a bigger tier.
+        """
+        executor = self._executor_for(tier, offered)
+        with _tool_concurrency(settings.agent_max_parallel_tools):
+            result = await executor.ainvoke(inputs, config=self._llm_config(tier))
+            missing = self._missing_tools(result.get("intermediate_steps", []), offered) if offered else []
+            if missing:
+                # The router left out a tool the model wanted: rerun with everything,
+                # on a tier that can take the full toolset
+                tool_router.record_fallback("invalid_tool")
+                tier = model_router.for_tools(tier, len(self.tools))
+                logger.info(f"Routed toolset lacked {missing}; retrying with all {len(self.tools)} tools "
+                            f"on tier {tier}")
+                result = await self._executor_for(tier).ainvoke(inputs, config=self._llm_config(tier))
 
-        result = await self.agent_executor.ainvoke({"input": prompt})
-        
         # Parse intermediate steps for better readability
-        parsed_steps = self._parse_intermediate_steps(result.get("intermediate_steps", []))
-        
-        return {
+        with instrumentation.span("parse_steps"):
+            parsed_steps = self._parse_intermediate_steps(result.get("intermediate_steps", []))
+
+        result = await self._validate({
             "output": result["output"],
             "intermediate_steps": None,  # Don't send raw tuples (causes Pydantic errors)
             "tool_calls": parsed_steps
+        }, kind, inputs["input"], tier)
+        return {**result, "model_tier": tier}
+
+    async def _validate(self, result: Dict[str, Any], kind: str, agent_input: str,
+                        tier: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Check generated YAML against the V0 schema and repair it if needed.
+
+        A repair continues the conversation with only the error list; the
+        model answers with a JSON Patch that is applied to the parsed
+        document and validated again, up to ``SCHEMA_REPAIR_ATTEMPTS``
+        rounds, on the model of ``tier``. The result carries the last report
+        under ``validation``.
+        """
+        tier = tier or model_router.default_tier
+        if not schema_validator.handles(kind):
+            return result
+        with instrumentation.span("validate"):
+            report, document = await schema_validator.check_output(kind, result["output"])
+        if report["valid"] or not schema_validator.repair_attempts or report["errors"][0]["rule"] == "yaml":
+            return {**result, "validation": {**report, "repair_attempts": 0}}
+
+        _, span = extract_yaml(result["output"])
+        errors = report["errors"]
+        messages: List[BaseMessage] = [
+            SystemMessage(content=SYSTEM_PROMPT),
+            HumanMessage(content=agent_input),
+            AIMessage(content=result["output"]),
+            HumanMessage(content=schema_validator.repair_prompt(kind, errors)),
+        ]
+        for attempt in range(1, schema_validator.repair_attempts + 1):
+            reply = await self.llms[tier].ainvoke(messages, config=self._llm_config(tier))
+            try:
+                document = apply_patch(document, parse_patch(str(reply.content)), root=kind)
+            except PipelineEditError as e:
+                logger.info(f"Schema repair attempt {attempt} for {kind} failed: {e}")
+                feedback = f"That patch could not be applied: {e}\n{schema_validator.repair_prompt(kind, errors)}"
+            else:
+                with instrumentation.span("validate"):
+                    errors = schema_validator.validate(kind, document)
+                if not errors:
+                    break
+                feedback = schema_validator.repair_prompt(kind, errors)
+            messages += [reply, HumanMessage(content=feedback)]
+
+        schema_validator.record_repair(not errors)
+        if errors:
+            logger.info(f"{kind} YAML still has {len(errors)} schema errors after {attempt} repair attempts")
+            return {**result, "validation": {**report, "errors": errors, "repair_attempts": attempt}}
+        logger.info(f"Repaired {kind} YAML after {attempt} attempts")
+        return {
+            **result,
+            "output": replace_yaml(result["output"], span, await yaml_codec.adump(document)),
+            "validation": {**report, "valid": True, "errors": [], "repair_attempts": attempt},
         }
 
-    async def process_request(self, user_request: str) -> Dict[str, Any]:
-        """Process a general user request."""
+    async def edit_pipeline(
+        self,
+        instruction: str,
+        pipeline_yaml: Optional[str] = None,
+        pipeline_identifier: Optional[str] = None,
+        org_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Apply an instruction to an existing pipeline through a JSON Patch.
+
+        The model sees the pipeline (given, or fetched with ``get_pipeline``)
+        and answers with a short patch instead of the whole YAML, which the
+        server applies to the parsed document and dumps back to YAML. A
+        patch that does not parse or apply is sent back to the model with
+        the error, up to ``PIPELINE_EDIT_MAX_ATTEMPTS`` replies, after which
+        the edit is retried on the next stronger model tier.
+        """
         if not self.agent_executor:
-            raise RuntimeError("Agent not initialized. Call initialize() first.")
+            raise self.not_ready_error()
+
+        source = "request"
+        if pipeline_yaml is None:
+            args = {"pipeline_id": pipeline_identifier}
+            args["org_id"] = org_id or settings.harness_default_org_id
+            args["project_id"] = project_id or settings.harness_default_project_id
+            fetched = await self._call_mcp_tool(settings.pipeline_edit_fetch_tool, args, shape=False)
+            pipeline_yaml = extract_pipeline_yaml(fetched)
+            source = "mcp"
+        document = await parse_pipeline_yaml(pipeline_yaml)
+
+        messages: List[BaseMessage] = [
+            SystemMessage(content=EDIT_SYSTEM_PROMPT),
+            HumanMessage(content=EDIT_REQUEST_TEMPLATE.format(
+                pipeline_yaml=(await yaml_codec.adump(document)).rstrip(),
+                outline=outline(document),
+                instruction=instruction,
+            )),
+        ]
+        usage = {"prompt_tokens": 0, "completion_tokens": 0}
+        prompt_tokens = sum(len(str(message.content)) for message in messages) // 4
+        tier = model_router.route("edit", instruction, prompt_tokens=prompt_tokens)
+        while True:
+            started = time.perf_counter()
+            try:
+                patch, updated, attempt = await self._edit_on_tier(tier, list(messages), document, usage)
+            except Exception as e:
+                next_tier = model_router.next_tier(tier)
+                model_router.record_run(tier, time.perf_counter() - started, "escalated" if next_tier else "error")
+                if next_tier is None:
+                    raise
+                model_router.record_escalation(tier, next_tier, "error")
+                logger.info(f"Pipeline edit failed on model tier {tier}: {e}; escalating to {next_tier}")
+                tier = next_tier
+            else:
+                model_router.record_run(tier, time.perf_counter() - started, "ok")
+                break
 
-        result = await self.agent_executor.ainvoke({"input": user_request})
-        
-        # Parse intermediate steps for better readability
-        parsed_steps = self._parse_intermediate_steps(result.get("intermediate_steps", []))
-        
         return {
-            "output": result["output"],
-            "intermediate_steps": None,  # Don't send raw tuples (causes Pydantic errors)
-            "tool_calls": parsed_steps
+            "output": await yaml_codec.adump(updated),
+            "patch": patch,
+            "source": source,
+            "attempts": attempt,
+            "usage": usage,
+            "model_tier": tier,
+        }
+
+    async def _edit_on_tier(self, tier: str, messages: List[BaseMessage], document: Dict[str, Any],
+                            usage: Dict[str, int]) -> Tuple[List[Dict[str, Any]], Dict[str, Any], int]:
+        """Ask the model of ``tier`` for an applicable patch; returns it, the patched document and the attempts."""
+        error: Optional[PipelineEditError] = None
+        for attempt in range(1, max(1, settings.pipeline_edit_max_attempts) + 1):
+            reply = await self.llms[tier].ainvoke(messages, config=self._llm_config(tier))
+            metadata = getattr(reply, "usage_metadata", None) or {}
+            usage["prompt_tokens"] += metadata.get("input_tokens", 0)
+            usage["completion_tokens"] += metadata.get("output_tokens", 0)
+            try:
+                patch = parse_patch(str(reply.content))
+                return patch, apply_patch(document, patch), attempt
+            except PipelineEditError as e:
+                error = e
+                logger.info(f"Pipeline patch attempt {attempt} failed: {e}")
+                messages += [reply, HumanMessage(content=REPAIR_TEMPLATE.format(error=e))]
+        raise PipelineEditError(f"No applicable patch after {attempt} attempts: {error}")
+
+    def _agent_inputs(self, kind: str, user_request: str,
+                      chat_history: Optional[List[BaseMessage]] = None) -> Dict[str, Any]:
+        inputs: Dict[str, Any] = {"input": self._build_input(kind, user_request, follow_up=bool(chat_history))}
+        if chat_history:
+            inputs["chat_history"] = chat_history
+        return inputs
+
+    async def _structure(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Add the result's YAML as ``yaml`` (normalized), ``document`` and ``content_hash``.
+
+        The YAML (the submit_yaml argument, or the first fenced block of a
+        free-text answer) is parsed once here so clients need not strip
+        fences or re-parse it. The hash covers the document with sorted
+        keys, so it ignores formatting, comments and key order.
+        """
+        text, _ = extract_yaml(result["output"])
+        document = None
+        if text is not None:
+            try:
+                document = await yaml_codec.aload(text)
+            except yaml.YAMLError as e:
+                logger.warning(f"Structured output: YAML does not parse: {e}")
+        if not isinstance(document, dict):
+            return {**result, "yaml": None, "document": None, "content_hash": None}
+        canonical = json.dumps(document, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        return {
+            **result,
+            "yaml": await yaml_codec.adump(document),
+            "document": document,
+            "content_hash": "sha256:" + hashlib.sha256(canonical.encode("utf-8")).hexdigest(),
         }
 
+    async def generate_pipeline(self, user_request: str, use_cache: bool = True,
+                                session_id: Optional[str] = None, structured: bool = False,
+                                store_cache: bool = True) -> Dict[str, Any]:
+        """Generate a Harness pipeline based on user request."""
+        result = await self._execute("pipeline", user_request, use_cache, session_id, store_cache)
+        return await self._structure(result) if structured else result
+
+    async def generate_connector(self, user_request: str, use_cache: bool = True,
+                                 session_id: Optional[str] = None, structured: bool = False,
+                                 store_cache: bool = True) -> Dict[str, Any]:
+        """Generate a Harness connector based on user request."""
+        result = await self._execute("connector", user_request, use_cache, session_id, store_cache)
+        return await self._structure(result) if structured else result
+
+    async def process_request(self, user_request: str, use_cache: bool = True,
+                              session_id: Optional[str] = None, store_cache: bool = True) -> Dict[str, Any]:
+        """Process a general user request."""
+        return await self._execute("query", user_request, use_cache, session_id, store_cache)
+
+    async def stream_request(
+        self, kind: str, user_request: str, use_cache: bool = True, session_id: Optional[str] = None,
+        structured: bool = False, store_cache: bool = True
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run the agent and yield events as they happen.
+
+        Yields ``{"event": ..., "data": ...}`` dicts for LLM tokens
+        (``token``), tool calls (``tool_start`` / ``tool_end`` with
+        ``duration_ms``) and finally the ``result`` in the same shape the
+        non-streaming methods return.
+        """
+        async for item in self._stream_session(kind, user_request, use_cache, session_id, store_cache):
+            if structured and item["event"] == "result":
+                item = {"event": "result", "data": await self._structure(item["data"])}
+            yield item
+
+    async def _stream_session(
+        self, kind: str, user_request: str, use_cache: bool, session_id: Optional[str], store_cache: bool = True
+    ) -> AsyncIterator[Dict[str, Any]]:
+        if not (session_id and session_store.enabled):
+            async for item in self._stream_events(kind, user_request, use_cache, store_cache=store_cache):
+                yield item
+            return
+
+        async with session_store.lock(session_id):
+            history = session_store.history_messages(await session_store.get(session_id))
+            async for item in self._stream_events(kind, user_request, use_cache, history, store_cache):
+                if item["event"] == "result":
+                    await session_store.append(
+                        session_id, kind, user_request, item["data"]["output"], self._session_summarizer()
+                    )
+                    item = {"event": "result", "data": {**item["data"], "session_id": session_id}}
+                yield item
+
+    async def _stream_events(
+        self, kind: str, user_request: str, use_cache: bool,
+        chat_history: Optional[List[BaseMessage]] = None, store_cache: bool = True
+    ) -> AsyncIterator[Dict[str, Any]]:
+        # Follow-ups in a session depend on the history: no fast path or caches
+        if not chat_history:
+            rendered = fast_path.try_generate(kind, user_request)
+            if rendered is not None:
+                yield {"event": "result", "data": rendered}
+                return
+
+        if not self.agent_executor:
+            raise self.not_ready_error()
+
+        if not chat_history:
+            cached = await self._lookup_caches(kind, user_request, use_cache)
+            if cached is not None:
+                yield {"event": "result", "data": cached}
+                return
+
+        inputs = self._agent_inputs(kind, user_request, chat_history)
+        tier, offered = await self._plan(kind, user_request, inputs)
+        while True:
+            started = time.perf_counter()
+            emitted = False
+            try:
+                async for item in self._stream_run(tier, offered, kind, inputs):
+                    emitted = True
+                    if item["event"] == "result":
+                        model_router.record_run(tier, time.perf_counter() - started, "ok")
+                        if not chat_history and store_cache:
+                            await self._store_caches(kind, user_request, item["data"])
+                    yield item
+                return
+            except Exception as e:
+                # Once events reached the client the run cannot start over
+                next_tier = None if emitted else model_router.next_tier(tier)
+                model_router.record_run(tier, time.perf_counter() - started, "escalated" if next_tier else "error")
+                if next_tier is None:
+                    raise
+                model_router.record_escalation(tier, next_tier, "error")
+                logger.warning(f"Streamed {kind} request failed on model tier {tier}: {e}; escalating to {next_tier}")
+                tier = next_tier
+
+    async def _stream_run(
+        self, tier: str, offered: Optional[List[str]], kind: str, inputs: Dict[str, Any]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """One streamed agent run on a model tier."""
+        root_run_id = None
+        tool_started: Dict[str, float] = {}
+        # Tokens already reached the client, so a streamed run cannot fall back
+        # to the full toolset; the model sees the invalid-tool observation instead
+        executor = self._executor_for(tier, offered)
+
+        with _tool_concurrency(settings.agent_max_parallel_tools):
+            async for event in executor.astream_events(inputs, config=self._llm_config(tier), version="v2"):
+                kind_ = event["event"]
+                run_id = event.get("run_id")
+
+                if root_run_id is None and kind_ == "on_chain_start":
+                    root_run_id = run_id
+
+                elif kind_ == "on_chat_model_stream":
+                    chunk = event["data"].get("chunk")
+                    content = getattr(chunk, "content", None)
+                    if content:
+                        yield {"event": "token", "data": {"content": content}}
+
+                elif kind_ == "on_tool_start":
+                    tool_started[run_id] = time.time()
+                    yield {
+                        "event": "tool_start",
+                        "data": {"tool": event["name"], "tool_input": event["data"].get("input")}
+                    }
+
+                elif kind_ == "on_tool_end":
+                    started = tool_started.pop(run_id, None)
+                    duration = (time.time() - started) * 1000 if started else None
+                    observation = str(event["data"].get("output", ""))
+                    if len(observation) > 1000:
+                        observation = observation[:1000] + "... (truncated)"
+                    yield {
+                        "event": "tool_end",
+                        "data": {
+                            "tool": event["name"],
+                            "duration_ms": round(duration, 2) if duration is not None else None,
+                            "observation": observation
+                        }
+                    }
+
+                elif kind_ == "on_chain_end" and run_id == root_run_id:
+                    output = event["data"].get("output") or {}
+                    with instrumentation.span("parse_steps"):
+                        parsed_steps = self._parse_intermediate_steps(output.get("intermediate_steps", []))
+                    result = await self._validate({
+                        "output": output.get("output", ""),
+                        "intermediate_steps": None,
+                        "tool_calls": parsed_steps
+                    }, kind, inputs["input"], tier)
+                    yield {"event": "result", "data": {**result, "model_tier": tier}}
+
     async def cleanup(self):
         """Cleanup resources."""
+        if self._init_task and not self._init_task.done():
+            self._init_task.cancel()
+            try:
+                await self._init_task
+            except asyncio.CancelledError:
+                pass
         await mcp_client.disconnect()
+        await response_cache.close()
+        await llm_clients.aclose()
 
 
 # Global agent instance
@@ -0,0 +1,284 @@
+"""
+The real ``main:app`` wired to a deterministic chat model, for load tests.
+
+Serve it with ``uvicorn benchmarks.app:app``. The agent, tools, MCP pool,
+caches and admission control are the production code; only the chat model
+is replaced by ``ScriptedChatModel``, which calls a fixed sequence of MCP
+tools and then answers with a small pipeline YAML. Environment knobs:
+
+    BENCH_LLM_LATENCY_MS    simulated latency of each LLM call (default 300)
+    BENCH_LLM_TOOL_CALLS    JSON list of tool names the model calls before
+                            answering (default ["list_connector_catalogue", "list_pipelines"])
+    BENCH_LLM_PARALLEL      when the agent uses the tool-calling API, request
+                            all tools in a single turn (default true)
+    BENCH_LLM_MS_PER_OUTPUT_TOKEN
+                            extra latency per generated token (default 0), so
+                            long outputs cost time like a real model
+    BENCH_LLM_INVALID_YAML  answer with a stage that has no ``spec`` so schema
+                            validation fails and the repair loop runs (default false)
+    BENCH_LLM_TIER_LATENCY_MS
+                            JSON object of per-model-tier latencies overriding
+                            BENCH_LLM_LATENCY_MS, e.g. {"fast": 80} (default {})
+    BENCH_LLM_FAIL_TIERS    JSON list of model tiers whose calls raise, so
+                            requests escalate to the next tier (default [])
+
+Asked for a pipeline edit (``/api/v1/edit/pipeline``) the model answers with a
+JSON Patch that appends a stage; given a fenced pipeline YAML in a normal
+request it regenerates it in full with the stage appended. Sent schema errors
+to repair, it patches in an empty value for each missing required property.
+When the prompt asks for ``submit_yaml``, the final YAML goes through that
+tool instead of a fenced reply.
+
+The model reports token usage like OpenAI, including ``cached_tokens`` from
+a simulated provider prefix cache (prefixes of 1024 tokens and up, in
+128-token steps, seen in an earlier call), so prompt caching shows up in
+``/api/v1/debug/prompt-cache``.
+
+Every response carries an ``X-Bench-Stages`` header with the time the
+request spent in each stage (llm, tool, serialization, other) in ms.
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import re
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence
+
+import fastapi.routing
+import yaml
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, FunctionMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from starlette.responses import JSONResponse
+
+from agent import harness_agent
+from main import app as api_app
+from mcp_client import mcp_client
+
+LLM_LATENCY_MS = float(os.environ.get("BENCH_LLM_LATENCY_MS", "300"))
+LLM_TOOL_CALLS = json.loads(
+    os.environ.get("BENCH_LLM_TOOL_CALLS", '["list_connector_catalogue", "list_pipelines"]')
+)
+LLM_PARALLEL = os.environ.get("BENCH_LLM_PARALLEL", "true").lower() == "true"
+LLM_MS_PER_OUTPUT_TOKEN = float(os.environ.get("BENCH_LLM_MS_PER_OUTPUT_TOKEN", "0"))
+LLM_INVALID_YAML = os.environ.get("BENCH_LLM_INVALID_YAML", "false").lower() == "true"
+LLM_TIER_LATENCY_MS = json.loads(os.environ.get("BENCH_LLM_TIER_LATENCY_MS", "{}"))
+LLM_FAIL_TIERS = json.loads(os.environ.get("BENCH_LLM_FAIL_TIERS", "[]"))
+
+EDIT_STAGE = {"stage": {"name": "Approve", "identifier": "Approve", "type": "Approval", "spec": {}}}
+
+STAGES = ("llm", "tool", "serialization")
+
+# Simulated provider prompt cache: hashes of prompt prefixes seen so far
+_seen_prefixes = set()
+CACHE_MIN_CHARS = 1024 * 4
+CACHE_BLOCK_CHARS = 128 * 4
+
+# Per-request stage totals; the dict is shared with every task the request spawns
+_stage_times: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "bench_stage_times", default=None
+)
+
+
+@contextmanager
+def stage(name: str):
+    """Add the wall time of the block to the current request's ``name`` stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        times = _stage_times.get()
+        if times is not None:
+            times[name] += (time.perf_counter() - start) * 1000
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Deterministic stand-in for ChatOpenAI.
+
+    Requests each tool in ``tool_calls`` (counting the tool results already
+    in the conversation), then gives a final answer. Bound to tools with
+    ``bind_tools`` and ``parallel`` set, it requests all of them in one turn
+    like OpenAI parallel tool calls; otherwise one OpenAI function call per turn.
+    With ``fail`` set every call raises, like an unavailable model endpoint.
+    """
+
+    latency_ms: float = 300.0
+    tool_calls: List[str] = []
+    parallel: bool = True
+    fail: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-benchmark"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self.bind(tools=list(tools), **kwargs)
+
+    @staticmethod
+    def _output_tokens(message: AIMessage) -> int:
+        return (len(str(message.content)) + len(json.dumps(message.tool_calls)) + 3) // 4
+
+    @classmethod
+    def _usage(cls, messages: List[BaseMessage], kwargs: Dict[str, Any], output: AIMessage) -> Dict[str, Any]:
+        """Token usage at ~4 characters per token, with cached prompt prefix tokens."""
+        definitions = kwargs.get("tools") or kwargs.get("functions") or []
+        prompt = json.dumps(definitions, separators=(",", ":"), default=str)
+        prompt += "".join(f"{m.type}:{m.content}" for m in messages)
+        cached = 0
+        for end in range(CACHE_MIN_CHARS, len(prompt) + 1, CACHE_BLOCK_CHARS):
+            digest = hashlib.sha1(prompt[:end].encode()).digest()
+            if digest in _seen_prefixes:
+                cached = end // 4
+            else:
+                _seen_prefixes.add(digest)
+        prompt_tokens = len(prompt) // 4
+        output_tokens = cls._output_tokens(output)
+        return {
+            "input_tokens": prompt_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": prompt_tokens + output_tokens,
+            "input_token_details": {"cache_read": cached},
+        }
+
+    def _next_message(self, messages: List[BaseMessage], tools_bound: bool) -> AIMessage:
+        request = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        if "JSON Patch" in str(messages[0].content):
+            return AIMessage(content=json.dumps({"patch": [
+                {"op": "add", "path": "/pipeline/stages/-", "value": EDIT_STAGE}
+            ]}))
+        if "fails the Harness V0" in request:
+            # Schema repair: add a placeholder for every missing required property
+            return AIMessage(content=json.dumps({"patch": [
+                {"op": "add", "path": f"{path.rstrip('/')}/{prop}", "value": {}}
+                for path, prop in re.findall(r"^- (\S+): .*?'(\w+)' is a required property", request, re.M)
+            ]}))
+        done = sum(1 for m in messages if isinstance(m, (FunctionMessage, ToolMessage)))
+        if done < len(self.tool_calls) and tools_bound:
+            pending = self.tool_calls[done:] if self.parallel else self.tool_calls[done:done + 1]
+            return AIMessage(content="", tool_calls=[
+                {"name": name, "args": {"__arg1": "{}"}, "id": f"call_{done + i}"}
+                for i, name in enumerate(pending)
+            ])
+        if done < len(self.tool_calls):
+            return AIMessage(
+                content="",
+                # The agent's tools take one string argument, which OpenAI names __arg1
+                additional_kwargs={"function_call": {
+                    "name": self.tool_calls[done], "arguments": json.dumps({"__arg1": "{}"}),
+                }},
+            )
+        if "```yaml" in request:
+            document = yaml.safe_load(request.split("```yaml", 1)[1].split("```", 1)[0])
+            document["pipeline"].setdefault("stages", []).append(EDIT_STAGE)
+            answer = yaml.dump(document, sort_keys=False)
+        else:
+            name = f"bench_{zlib.crc32(request.encode()) % 100000}"
+            answer = (
+                "pipeline:\n"
+                f"  name: {name}\n"
+                f"  identifier: {name}\n"
+                "  stages:\n"
+                "    - stage:\n"
+                "        name: Build\n"
+                "        identifier: Build\n"
+                "        type: CI\n"
+                f"{'' if LLM_INVALID_YAML else '        spec: {}'}\n"
+            )
+        if "submit_yaml" in request and tools_bound:
+            return AIMessage(content="", tool_calls=[
+                {"name": "submit_yaml", "args": {"yaml": answer}, "id": f"call_{done}"}
+            ])
+        if "submit_yaml" in request:
+            return AIMessage(content="", additional_kwargs={"function_call": {
+                "name": "submit_yaml", "arguments": json.dumps({"yaml": answer}),
+            }})
+        return AIMessage(content="```yaml\n" + answer + "```")
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        with stage("llm"):
+            if self.fail:
+                raise RuntimeError("Scripted model endpoint unavailable")
+            message = self._next_message(messages, "tools" in kwargs)
+            time.sleep((self.latency_ms + LLM_MS_PER_OUTPUT_TOKEN * self._output_tokens(message)) / 1000)
+            message.usage_metadata = self._usage(messages, kwargs, message)
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                         **kwargs: Any) -> ChatResult:
+        with stage("llm"):
+            if self.fail:
+                await asyncio.sleep(self.latency_ms / 1000)
+                raise RuntimeError("Scripted model endpoint unavailable")
+            message = self._next_message(messages, "tools" in kwargs)
+            await asyncio.sleep((self.latency_ms + LLM_MS_PER_OUTPUT_TOKEN * self._output_tokens(message)) / 1000)
+            message.usage_metadata = self._usage(messages, kwargs, message)
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def _timed(name: str, func):
+    def wrapper(*args, **kwargs):
+        with stage(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def _timed_async(name: str, func):
+    async def wrapper(*args, **kwargs):
+        with stage(name):
+            return await func(*args, **kwargs)
+    return wrapper
+
+
+harness_agent._create_llm = lambda tier: ScriptedChatModel(
+    latency_ms=LLM_TIER_LATENCY_MS.get(tier.name, LLM_LATENCY_MS), tool_calls=LLM_TOOL_CALLS,
+    parallel=LLM_PARALLEL, fail=tier.name in LLM_FAIL_TIERS
+)
+mcp_client.call_tool = _timed_async("tool", mcp_client.call_tool)
+harness_agent._extract_mcp_result = _timed("serialization", harness_agent._extract_mcp_result)
+harness_agent._parse_intermediate_steps = _timed("serialization", harness_agent._parse_intermediate_steps)
+fastapi.routing.serialize_response = _timed_async("serialization", fastapi.routing.serialize_response)
+JSONResponse.render = _timed("serialization", JSONResponse.render)
+
+
+class StageTimingMiddleware:
+    """Collects stage times for each HTTP request and reports them in a response header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        times = {name: 0.0 for name in STAGES}
+        token = _stage_times.set(times)
+        start = time.perf_counter()
+
+        async def send_with_stages(message):
+            if message["type"] == "http.response.start":
+                total = (time.perf_counter() - start) * 1000
+                report = {name: round(value, 3) for name, value in times.items()}
+                report["other"] = round(max(0.0, total - sum(times.values())), 3)
+                report["total"] = round(total, 3)
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"x-bench-stages", json.dumps(report).encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stages)
+        finally:
+            _stage_times.reset(token)
+
+
+app = StageTimingMiddleware(api_app)
@@ -0,0 +1,243 @@
+"""
+Shared helpers for the offline benchmarks.
+
+Benchmarks start the real API with uvicorn against the stub MCP server in
+this directory, so they need no Harness account and no network access.
+Run them from the repository root, e.g. ``python -m benchmarks.worker_scaling``.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARKS_DIR)
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, "results")
+# Stable across runs so the tool catalog snapshot (keyed by MCP server path) is reused
+WORK_DIR = os.path.join(tempfile.gettempdir(), "harness-agent-bench")
+
+# Dummy credentials; nothing in an offline run talks to OpenAI or Harness
+BASE_ENV = {
+    "OPENAI_API_KEY": "sk-benchmark",
+    "HARNESS_ACCOUNT_ID": "benchmark",
+    "HARNESS_API_KEY": "benchmark",
+    "HARNESS_DEFAULT_ORG_ID": "default",
+    "HARNESS_DEFAULT_PROJECT_ID": "benchmark",
+    "LANGCHAIN_TRACING_V2": "false",
+}
+
+
+def stub_mcp_wrapper(env: Optional[Dict[str, str]] = None) -> str:
+    """
+    Write an executable that launches the stub MCP server.
+
+    The MCP client spawns the server with a minimal environment (no PATH,
+    only the HARNESS_* settings), so the wrapper calls the current
+    interpreter by absolute path and exports the ``STUB_MCP_*`` values of
+    ``env`` itself. Each set of values gets its own wrapper, named after
+    their hash so the tool catalog snapshot is still reused across runs.
+    """
+    stub_env = {k: v for k, v in sorted((env or {}).items()) if k.startswith("STUB_MCP_")}
+    name = "stub-harness-mcp"
+    if stub_env:
+        name += "-" + hashlib.sha256(json.dumps(stub_env).encode()).hexdigest()[:8]
+    os.makedirs(WORK_DIR, exist_ok=True)
+    path = os.path.join(WORK_DIR, name)
+    with open(path, "w") as f:
+        f.write("#!/bin/sh\n")
+        for key, value in stub_env.items():
+            f.write(f"export {key}={shlex.quote(str(value))}\n")
+        f.write(f'exec "{sys.executable}" "{os.path.join(BENCHMARKS_DIR, "stub_mcp_server.py")}" "$@"\n')
+    os.chmod(path, 0o755)
+    return path
+
+
+class APIServer:
+    """Runs ``uvicorn main:app`` in a subprocess for the duration of a ``with`` block."""
+
+    def __init__(self, port: int = 8765, workers: int = 1, env: Optional[Dict[str, str]] = None,
+                 app: str = "main:app", startup_timeout: float = 60.0, wait: bool = True):
+        self.app = app
+        self.wait = wait
+        self.port = port
+        self.workers = workers
+        self.env = env or {}
+        self.startup_timeout = startup_timeout
+        self.base_url = f"http://127.0.0.1:{port}"
+        self._process: Optional[subprocess.Popen] = None
+        self._tmpdir: Optional[tempfile.TemporaryDirectory] = None
+        self._log = None
+        self.log_path: Optional[str] = None
+
+    def __enter__(self) -> "APIServer":
+        self._tmpdir = tempfile.TemporaryDirectory(prefix="harness-bench-")
+        env = {
+            **os.environ,
+            **BASE_ENV,
+            "TOOL_CATALOG_PATH": os.path.join(WORK_DIR, "tool_catalog.json"),
+            "API_PORT": str(self.port),
+            "WORKER_STARTUP_STAGGER": "0",
+            **self.env,
+        }
+        if "MCP_SERVER_PATH" not in self.env:
+            env["MCP_SERVER_PATH"] = stub_mcp_wrapper(env)
+        self.log_path = os.path.join(self._tmpdir.name, "server.log")
+        self._log = open(self.log_path, "w")
+        self.started_at = time.perf_counter()
+        self._process = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", self.app,
+                "--host", "127.0.0.1", "--port", str(self.port),
+                "--workers", str(self.workers), "--log-level", "warning",
+            ],
+            cwd=REPO_ROOT,
+            env=env,
+            stdout=self._log,
+            stderr=subprocess.STDOUT,
+        )
+        if not self.wait:
+            return self
+        try:
+            self.wait_until("/health/ready")
+        except RuntimeError:
+            self.__exit__()
+            raise
+        return self
+
+    def wait_until(self, path: str, poll_interval: float = 0.2) -> float:
+        """Poll ``path`` until it returns 200; returns seconds since the process was spawned."""
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self._process.poll() is not None:
+                raise RuntimeError(
+                    f"API server exited with code {self._process.returncode}:\n{self._log_tail()}"
+                )
+            try:
+                if httpx.get(f"{self.base_url}{path}", timeout=1.0).status_code == 200:
+                    return time.perf_counter() - self.started_at
+            except httpx.HTTPError:
+                pass
+            time.sleep(poll_interval)
+        raise RuntimeError(f"{path} not ready after {self.startup_timeout}s:\n{self._log_tail()}")
+
+    def _log_tail(self, lines: int = 20) -> str:
+        with open(self.log_path) as f:
+            return "".join(f.readlines()[-lines:])
+
+    def __exit__(self, *exc):
+        if self._process and self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+        if self._log:
+            self._log.close()
+        if self._tmpdir:
+            self._tmpdir.cleanup()
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies_ms: List[float], elapsed_s: float, errors: int = 0,
+              stages: Optional[List[Dict[str, float]]] = None) -> Dict[str, Any]:
+    summary = {
+        "requests": len(latencies_ms) + errors,
+        "errors": errors,
+        "elapsed_s": round(elapsed_s, 3),
+        "rps": round(len(latencies_ms) / elapsed_s, 2) if elapsed_s else 0.0,
+        "p50_ms": round(percentile(latencies_ms, 50), 2),
+        "p95_ms": round(percentile(latencies_ms, 95), 2),
+        "p99_ms": round(percentile(latencies_ms, 99), 2),
+        "mean_ms": round(statistics.fmean(latencies_ms), 2) if latencies_ms else 0.0,
+    }
+    if stages:
+        # Server-side time per stage, from the X-Bench-Stages header of benchmarks.app
+        summary["stages"] = {
+            name: {
+                "mean_ms": round(statistics.fmean(s[name] for s in stages), 2),
+                "p95_ms": round(percentile([s[name] for s in stages], 95), 2),
+            }
+            for name in stages[0]
+        }
+    return summary
+
+
+async def run_load(base_url: str, path: str, payload: Callable[[int], Dict[str, Any]],
+                   total: int, concurrency: int, timeout: float = 120.0) -> Dict[str, Any]:
+    """
+    Send ``total`` POST requests to ``path`` with at most ``concurrency`` in flight.
+
+    ``payload(i)`` builds the JSON body of the i-th request.
+    """
+    latencies: List[float] = []
+    stages: List[Dict[str, float]] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                start = time.perf_counter()
+                try:
+                    response = await client.post(path, json=payload(i))
+                    response.raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - start) * 1000)
+                if "x-bench-stages" in response.headers:
+                    stages.append(json.loads(response.headers["x-bench-stages"]))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return summarize(latencies, elapsed, errors, stages)
+
+
+def git_revision() -> Optional[str]:
+    """Short hash of the checked-out commit, with ``-dirty`` if the tree has changes."""
+    try:
+        revision = subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=REPO_ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return revision or None
+
+
+def save_results(name: str, results: Dict[str, Any], path: Optional[str] = None) -> str:
+    """Write ``results`` to ``path`` (default ``benchmarks/results/<name>.json``) and return the path."""
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{name}.json")
+    with open(path, "w") as f:
+        json.dump({
+            "benchmark": name,
+            "timestamp": time.time(),
+            "git_revision": git_revision(),
+            "cpu_count": os.cpu_count(),
+            **results,
+        }, f, indent=2)
+    return path
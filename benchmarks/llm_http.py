@@ -0,0 +1,189 @@
+"""
+LLM call latency under load: shared pooled client vs. default and no keep-alive clients.
+
+Starts ``benchmarks.stub_openai_server`` (HTTPS with a throwaway
+self-signed certificate when ``openssl`` is available) and sends
+``--requests`` chat completions through ``ChatOpenAI.ainvoke`` at each
+``--concurrency`` level, starting every run with cold connections:
+
+    pooled         the shared client from ``llm_client.llm_clients`` with the
+                   LLM_HTTP_* settings (long keep-alive, HTTP/2 when the
+                   backend negotiates it)
+    default        a client with the OpenAI SDK's defaults (5 s keep-alive)
+    no_keepalive   a new connection, and TLS handshake, for every call
+
+``--connect-latency-ms`` delays every new connection at the stub, standing
+in for the TCP and TLS round trips to a remote backend; ``--think-ms``
+pauses between a worker's calls like tool calls between LLM turns (above
+5000 the default client's connections expire in between). Reports latency
+percentiles and the connections the stub accepted per run.
+
+    python -m benchmarks.llm_http [--concurrency 1,16,64] [--requests 200] \\
+        [--latency-ms 100] [--connect-latency-ms 30] [--think-ms 0]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks.common import BASE_ENV, REPO_ROOT, WORK_DIR, save_results, summarize
+
+
+def make_certificate() -> Optional[str]:
+    """Self-signed certificate for 127.0.0.1 in WORK_DIR; None without openssl."""
+    if shutil.which("openssl") is None:
+        return None
+    os.makedirs(WORK_DIR, exist_ok=True)
+    cert, key = os.path.join(WORK_DIR, "stub_openai_cert.pem"), os.path.join(WORK_DIR, "stub_openai_key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-keyout", key, "-out", cert, "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1"],
+        check=True, capture_output=True,
+    )
+    return cert
+
+
+def start_stub(port: int, latency_ms: float, connect_latency_ms: float,
+               cert: Optional[str]) -> subprocess.Popen:
+    command = [
+        sys.executable, "-m", "benchmarks.stub_openai_server", "--port", str(port),
+        "--latency-ms", str(latency_ms), "--connect-latency-ms", str(connect_latency_ms),
+    ]
+    if cert:
+        command += ["--certfile", cert, "--keyfile", cert.replace("_cert", "_key")]
+    return subprocess.Popen(command, cwd=REPO_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def stub_stats(url: str, verify) -> Dict[str, int]:
+    return httpx.get(f"{url}/stats", verify=verify, timeout=10.0).json()
+
+
+async def run_calls(client: httpx.AsyncClient, base_url: str, total: int, concurrency: int,
+                    think_ms: float) -> Dict[str, object]:
+    from langchain_openai import ChatOpenAI
+
+    llm = ChatOpenAI(model="stub", base_url=base_url, openai_api_key="sk-benchmark",
+                     http_async_client=client, max_retries=0)
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                await llm.ainvoke(f"Generate a CI pipeline (call {i})")
+            except Exception:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+            if think_ms:
+                await asyncio.sleep(think_ms / 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", default="1,16,64", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Calls per mode and concurrency level")
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="Stub response latency")
+    parser.add_argument("--connect-latency-ms", type=float, default=30.0, help="Stub delay per new connection")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Pause between a worker's calls")
+    parser.add_argument("--no-tls", action="store_true", help="Serve the stub over plain HTTP")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--output", help="Result file (default benchmarks/results/llm_http.json)")
+    args = parser.parse_args()
+
+    cert = None if args.no_tls else make_certificate()
+    scheme = "https" if cert else "http"
+    stub_url = f"{scheme}://127.0.0.1:{args.port}"
+    base_url = f"{stub_url}/v1"
+    verify = cert or True
+
+    os.environ.update(BASE_ENV)
+    if cert:
+        os.environ["LLM_HTTP_CA_BUNDLE"] = cert
+    from llm_client import llm_clients
+
+    modes: Dict[str, Callable[[], httpx.AsyncClient]] = {
+        "pooled": lambda: llm_clients.client_for(base_url),
+        # What the OpenAI SDK builds when given no client
+        "default": lambda: httpx.AsyncClient(
+            verify=verify, timeout=llm_clients.timeout,
+            limits=httpx.Limits(max_connections=1000, max_keepalive_connections=100),
+        ),
+        "no_keepalive": lambda: httpx.AsyncClient(
+            verify=verify, timeout=llm_clients.timeout,
+            limits=httpx.Limits(max_connections=1000, max_keepalive_connections=0),
+        ),
+    }
+
+    stub = start_stub(args.port, args.latency_ms, args.connect_latency_ms, cert)
+    results: Dict[str, Dict[str, object]] = {}
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                stub_stats(stub_url, verify)
+                break
+            except httpx.HTTPError:
+                if time.monotonic() > deadline or stub.poll() is not None:
+                    raise RuntimeError("Stub OpenAI server did not start")
+                time.sleep(0.2)
+
+        print(f"Stub at {base_url} (latency {args.latency_ms}ms, connect {args.connect_latency_ms}ms); "
+              f"pool http2={llm_clients.http2}")
+        for concurrency in [int(c) for c in args.concurrency.split(",")]:
+            level = {}
+            for mode, factory in modes.items():
+                before = stub_stats(stub_url, verify)["connections"]
+
+                async def run(mode=mode, factory=factory, concurrency=concurrency):
+                    client = factory()
+                    result = await run_calls(client, base_url, args.requests, concurrency, args.think_ms)
+                    if mode == "pooled":
+                        backend = llm_clients.get_metrics()["backends"].get(base_url.rstrip("/"), {})
+                        result["http_versions"] = backend.get("http_versions", {})
+                        # Drop the pool so the next run starts cold as well
+                        await llm_clients.aclose()
+                    else:
+                        await client.aclose()
+                    return result
+
+                result = asyncio.run(run())
+                # Minus the /stats connection of this measurement
+                result["connections"] = stub_stats(stub_url, verify)["connections"] - before - 1
+                level[mode] = result
+                print(f"concurrency {concurrency:>3} {mode:<12} p50={result['p50_ms']}ms "
+                      f"p95={result['p95_ms']}ms p99={result['p99_ms']}ms rps={result['rps']} "
+                      f"connections={result['connections']} errors={result['errors']}")
+            results[str(concurrency)] = level
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    output = save_results("llm_http", {
+        "requests": args.requests,
+        "latency_ms": args.latency_ms,
+        "connect_latency_ms": args.connect_latency_ms,
+        "think_ms": args.think_ms,
+        "tls": bool(cert),
+        "pool": {key: value for key, value in llm_clients.get_metrics().items() if key != "backends"},
+        "concurrency": results,
+    }, path=args.output)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Offline load test of the agent endpoints with a scripted LLM and stub MCP server.
+
+Starts ``benchmarks.app:app`` (the real API with ``ScriptedChatModel``) and
+drives one endpoint at each requested concurrency level. Reports client
+latency percentiles, throughput and the server-side split between LLM,
+MCP tool, serialization and everything else. Results are written as JSON;
+pass ``--baseline`` with an earlier result file to print the deltas.
+
+    python -m benchmarks.load_test --concurrency 1,8,32 --requests 200 \\
+        --llm-latency-ms 300 --tool-latency-ms 50 --output before.json
+    python -m benchmarks.load_test ... --baseline before.json
+"""
+
+import argparse
+import asyncio
+import json
+from typing import Any, Dict
+
+from benchmarks.common import APIServer, run_load, save_results
+
+ENDPOINTS = {
+    "pipeline": "/api/v1/generate/pipeline",
+    "connector": "/api/v1/generate/connector",
+    "query": "/api/v1/query",
+}
+
+
+def request_payload(i: int) -> dict:
+    # Unique text per request so neither caching nor coalescing kicks in
+    return {"request": f"Create a CI pipeline for service svc-{i} with build, test and deploy stages"}
+
+
+def print_run(run: Dict[str, Any]):
+    print(f"concurrency={run['concurrency']:<4} rps={run['rps']:<8} p50={run['p50_ms']}ms "
+          f"p95={run['p95_ms']}ms p99={run['p99_ms']}ms errors={run['errors']}")
+    for name, stats in run.get("stages", {}).items():
+        print(f"    {name:<14} mean={stats['mean_ms']}ms p95={stats['p95_ms']}ms")
+
+
+def print_comparison(runs, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = {r["concurrency"]: r for r in json.load(f)["runs"]}
+    print(f"\nCompared with {baseline_path}:")
+    for run in runs:
+        before = baseline.get(run["concurrency"])
+        if not before:
+            continue
+        deltas = []
+        for key in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+            if before[key]:
+                deltas.append(f"{key} {100 * (run[key] - before[key]) / before[key]:+.1f}%")
+        print(f"concurrency={run['concurrency']:<4} " + " ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="pipeline")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--tool-latency-ms", type=float, default=50.0)
+    parser.add_argument("--tool-latency", default="{}", help="JSON map of per-tool latency overrides in ms")
+    parser.add_argument("--tool-calls", default='["list_connector_catalogue", "list_pipelines"]',
+                        help="JSON list of tools the scripted LLM calls per request")
+    parser.add_argument("--agent-mode", choices=["tools", "functions"], default="tools",
+                        help="tools lets the scripted LLM request all tools in one turn")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="Result file (default benchmarks/results/load_test.json)")
+    parser.add_argument("--baseline", help="Earlier result file to compare against")
+    args = parser.parse_args()
+
+    levels = [int(c) for c in args.concurrency.split(",")]
+    env = {
+        "BENCH_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "BENCH_LLM_TOOL_CALLS": args.tool_calls,
+        "AGENT_MODE": args.agent_mode,
+        "STUB_MCP_LATENCY_MS": str(args.tool_latency_ms),
+        "STUB_MCP_TOOL_LATENCY": args.tool_latency,
+        # Measure the agent path itself, not the shortcuts in front of it
+        "FAST_PATH_ENABLED": "false",
+        "RESPONSE_CACHE_ENABLED": "false",
+        "SEMANTIC_CACHE_ENABLED": "false",
+        "TOOL_CACHE_ENABLED": "false",
+        "ADMISSION_MAX_CONCURRENCY": str(max(levels)),
+        "ADMISSION_MAX_QUEUE": str(max(levels) * 4),
+    }
+
+    path = ENDPOINTS[args.endpoint]
+    runs = []
+    with APIServer(port=args.port, workers=args.workers, env=env, app="benchmarks.app:app") as server:
+        asyncio.run(run_load(server.base_url, path, request_payload, total=5, concurrency=1))
+        for concurrency in levels:
+            result = asyncio.run(run_load(server.base_url, path, request_payload,
+                                          total=args.requests, concurrency=concurrency))
+            result["concurrency"] = concurrency
+            runs.append(result)
+            print_run(result)
+
+    output = save_results("load_test", {
+        "endpoint": args.endpoint,
+        "agent_mode": args.agent_mode,
+        "workers": args.workers,
+        "llm_latency_ms": args.llm_latency_ms,
+        "tool_latency_ms": args.tool_latency_ms,
+        "tool_latency_overrides": json.loads(args.tool_latency),
+        "tool_calls": json.loads(args.tool_calls),
+        "runs": runs,
+    }, path=args.output)
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        print_comparison(runs, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
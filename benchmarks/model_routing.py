@@ -0,0 +1,98 @@
+"""
+Latency and estimated cost of a request mix with and without model tier routing.
+
+Sends the same mix against ``benchmarks.app:app`` twice, once with
+``MODEL_ROUTING_ENABLED=false`` (everything on the default ``strong`` tier)
+and once with routing on:
+
+    query      POST /api/v1/query "List my pipelines"
+    simple     POST /api/v1/generate/pipeline for a plain CI build
+    complex    POST /api/v1/generate/pipeline for a canary deployment with
+               approval and rollback across multiple environments
+
+The scripted model answers after ``--fast-latency-ms`` on the fast tier and
+``--strong-latency-ms`` on the strong tier. Reports latency percentiles per
+request type and, from ``/api/v1/debug/model-routing``, the runs, LLM
+latency, escalations and estimated cost per tier.
+
+    python -m benchmarks.model_routing [--requests 20] [--concurrency 4] \\
+        [--fast-latency-ms 100] [--strong-latency-ms 400]
+"""
+
+import argparse
+import asyncio
+import json
+
+import httpx
+
+from benchmarks.common import APIServer, run_load, save_results
+
+MIX = {
+    "query": ("/api/v1/query", "List my pipelines"),
+    "simple": ("/api/v1/generate/pipeline", "CI pipeline that builds and tests a Go service"),
+    "complex": ("/api/v1/generate/pipeline",
+                "Canary deployment of the payments service with a manual approval, automatic "
+                "rollback on failure and helm charts across multiple environments"),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20, help="Requests per request type and mode")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--fast-latency-ms", type=float, default=100.0)
+    parser.add_argument("--strong-latency-ms", type=float, default=400.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="Result file (default benchmarks/results/model_routing.json)")
+    args = parser.parse_args()
+
+    env = {
+        "BENCH_LLM_TIER_LATENCY_MS": json.dumps({"fast": args.fast_latency_ms, "strong": args.strong_latency_ms}),
+        "FAST_PATH_ENABLED": "false",
+        "RESPONSE_CACHE_ENABLED": "false",
+        "SEMANTIC_CACHE_ENABLED": "false",
+        "COALESCE_ENABLED": "false",
+    }
+
+    results = {}
+    for mode, enabled in (("single_tier", "false"), ("routed", "true")):
+        runs = {}
+        with APIServer(port=args.port, env={**env, "MODEL_ROUTING_ENABLED": enabled},
+                       app="benchmarks.app:app") as server:
+            for name, (path, request) in MIX.items():
+                runs[name] = asyncio.run(run_load(
+                    server.base_url, path, lambda i, request=request: {"request": f"{request} (run {i})"},
+                    total=args.requests, concurrency=args.concurrency,
+                ))
+            routing = httpx.get(f"{server.base_url}/api/v1/debug/model-routing", timeout=10.0).json()
+
+        tiers = {
+            tier: {key: stats[key] for key in ("runs", "outcomes", "p50_llm_ms", "p95_run_ms", "cost_usd")}
+            for tier, stats in routing["tiers"].items() if stats["runs"]
+        }
+        results[mode] = {
+            "requests": runs,
+            "tiers": tiers,
+            "escalations": routing["escalations"],
+            "total_cost_usd": routing["total_cost_usd"],
+        }
+        print(f"{mode}:")
+        for name, run in runs.items():
+            print(f"  {name:<8} p50={run['p50_ms']}ms p95={run['p95_ms']}ms errors={run['errors']}")
+        for tier, stats in tiers.items():
+            print(f"  tier {tier:<7} runs={stats['runs']} llm p50={stats['p50_llm_ms']}ms "
+                  f"cost=${stats['cost_usd']}")
+        print(f"  total cost=${routing['total_cost_usd']} escalations={routing['escalations']}")
+
+    output = save_results("model_routing", {
+        "requests_per_type": args.requests,
+        "concurrency": args.concurrency,
+        "fast_latency_ms": args.fast_latency_ms,
+        "strong_latency_ms": args.strong_latency_ms,
+        "modes": results,
+    }, path=args.output)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Small change to a large pipeline: full regeneration vs. JSON Patch edit.
+
+Builds a pipeline with ``--stages`` CI stages and asks for the same small
+change ("add an approval stage") in two ways against ``benchmarks.app:app``:
+
+    regenerate   POST /api/v1/generate/pipeline with the YAML in the request;
+                 the scripted model writes the whole updated pipeline
+    patch        POST /api/v1/edit/pipeline; the model writes a JSON Patch
+
+The scripted model charges ``--ms-per-output-token`` per generated token,
+so latency follows output size as with a real model. Reports latency
+percentiles and prompt/completion tokens per request for each mode.
+
+    python -m benchmarks.pipeline_edit [--stages 30] [--requests 20] [--ms-per-output-token 20]
+"""
+
+import argparse
+import asyncio
+import re
+from typing import Dict
+
+import httpx
+import yaml
+
+from benchmarks.common import APIServer, run_load, save_results
+
+INSTRUCTION = "Add a manual approval stage named Approve at the end of the pipeline"
+
+
+def build_pipeline(stages: int) -> str:
+    document = {"pipeline": {
+        "name": "payments", "identifier": "payments",
+        "projectIdentifier": "default", "orgIdentifier": "default",
+        "stages": [
+            {"stage": {
+                "name": f"Build {i}", "identifier": f"Build_{i}", "type": "CI",
+                "spec": {
+                    "cloneCodebase": True,
+                    "platform": {"os": "Linux", "arch": "Amd64"},
+                    "runtime": {"type": "Cloud", "spec": {}},
+                    "execution": {"steps": [
+                        {"step": {"type": "Run", "name": name, "identifier": name.lower(),
+                                  "spec": {"shell": "Sh", "command": command}}}
+                        for name, command in (("Install", "pip install -r requirements.txt"),
+                                              ("Test", "pytest -q"),
+                                              ("Build", f"docker build -t payments-{i} ."))
+                    ]},
+                },
+            }}
+            for i in range(stages)
+        ],
+    }}
+    return yaml.dump(document, sort_keys=False)
+
+
+def token_totals(base_url: str) -> Dict[str, float]:
+    """Prompt and completion tokens so far, from /metrics."""
+    totals = {"prompt": 0.0, "completion": 0.0}
+    for line in httpx.get(f"{base_url}/metrics", timeout=10.0).text.splitlines():
+        match = re.match(r'harness_agent_llm_tokens_total\{.*type="(\w+)"\} ([\d.e+]+)', line)
+        if match and match.group(1) in totals:
+            totals[match.group(1)] += float(match.group(2))
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stages", type=int, default=30)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--ms-per-output-token", type=float, default=20.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="Result file (default benchmarks/results/pipeline_edit.json)")
+    args = parser.parse_args()
+
+    pipeline_yaml = build_pipeline(args.stages)
+    modes = {
+        "regenerate": ("/api/v1/generate/pipeline",
+                       lambda i: {"request": f"{INSTRUCTION} (run {i}):\n```yaml\n{pipeline_yaml}```"}),
+        "patch": ("/api/v1/edit/pipeline",
+                  lambda i: {"instruction": f"{INSTRUCTION} (run {i})", "pipeline_yaml": pipeline_yaml}),
+    }
+    env = {
+        "BENCH_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "BENCH_LLM_MS_PER_OUTPUT_TOKEN": str(args.ms_per_output_token),
+        "BENCH_LLM_TOOL_CALLS": "[]",
+        "FAST_PATH_ENABLED": "false",
+        "RESPONSE_CACHE_ENABLED": "false",
+        "SEMANTIC_CACHE_ENABLED": "false",
+    }
+
+    print(f"Pipeline: {args.stages} stages, {len(pipeline_yaml)} bytes of YAML")
+    results = {}
+    with APIServer(port=args.port, env=env, app="benchmarks.app:app") as server:
+        for mode, (path, payload) in modes.items():
+            before = token_totals(server.base_url)
+            run = asyncio.run(run_load(server.base_url, path, payload, total=args.requests, concurrency=1))
+            after = token_totals(server.base_url)
+            done = max(1, run["requests"] - run["errors"])
+            run["prompt_tokens_per_request"] = round((after["prompt"] - before["prompt"]) / done, 1)
+            run["completion_tokens_per_request"] = round((after["completion"] - before["completion"]) / done, 1)
+            results[mode] = run
+            print(f"{mode:<11} p50={run['p50_ms']}ms p95={run['p95_ms']}ms "
+                  f"prompt_tokens={run['prompt_tokens_per_request']} "
+                  f"completion_tokens={run['completion_tokens_per_request']} errors={run['errors']}")
+
+    output = save_results("pipeline_edit", {
+        "stages": args.stages,
+        "pipeline_bytes": len(pipeline_yaml),
+        "llm_latency_ms": args.llm_latency_ms,
+        "ms_per_output_token": args.ms_per_output_token,
+        "modes": results,
+    }, path=args.output)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
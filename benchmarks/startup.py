@@ -0,0 +1,88 @@
+"""
+Cold-start time of the API: imports, MCP spawn and tool discovery.
+
+For each run it measures, from a fresh interpreter:
+
+    import_s     time to ``import main`` (FastAPI, LangChain, our modules)
+    live_s       process spawn until ``/health/live`` answers
+    ready_s      process spawn until ``/health/ready`` answers
+
+plus the server's own breakdown from ``/api/v1/debug/startup`` (MCP
+subprocess spawn and handshake, ``list_tools``, tool wrapping, agent
+build). ``--mode blocking`` sets ``AGENT_BACKGROUND_INIT=false`` to compare
+with startup that waits for the agent before serving.
+
+    python -m benchmarks.startup [--runs 5] [--mode background,blocking] [--mcp-startup-ms 500]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+import httpx
+
+from benchmarks.common import BASE_ENV, REPO_ROOT, APIServer, save_results
+
+IMPORT_SNIPPET = "import time; s = time.perf_counter(); import main; print(time.perf_counter() - s)"
+
+
+def measure_import() -> float:
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=REPO_ROOT, env={**os.environ, **BASE_ENV},
+        capture_output=True, text=True, check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def measure_server(port: int, env: dict) -> dict:
+    with APIServer(port=port, env=env, wait=False) as server:
+        live = server.wait_until("/health/live", poll_interval=0.02)
+        ready = server.wait_until("/health/ready", poll_interval=0.02)
+        status = httpx.get(f"{server.base_url}/api/v1/debug/startup", timeout=5.0).json()
+    return {"live_s": round(live, 3), "ready_s": round(ready, 3), **status.get("startup_timings", {})}
+
+
+def median_of(runs, key):
+    values = [r[key] for r in runs if key in r]
+    return round(statistics.median(values), 3) if values else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--mode", default="background,blocking", help="Comma-separated: background, blocking")
+    parser.add_argument("--mcp-startup-ms", type=float, default=0.0,
+                        help="Simulated startup time of the MCP server binary")
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    print(f"import main: median {statistics.median(imports):.3f}s over {args.runs} runs")
+
+    results = {"import_s": {"median": round(statistics.median(imports), 3), "runs": imports}, "modes": {}}
+    for mode in args.mode.split(","):
+        env = {
+            "AGENT_BACKGROUND_INIT": "true" if mode == "background" else "false",
+            "STUB_MCP_STARTUP_MS": str(args.mcp_startup_ms),
+            "MCP_POOL_SIZE": str(args.pool_size),
+        }
+        runs = [measure_server(args.port, env) for _ in range(args.runs)]
+        summary = {key: median_of(runs, key) for key in runs[0]}
+        results["modes"][mode] = {"median": summary, "runs": runs}
+        print(f"{mode:<10} " + " ".join(f"{k}={v}" for k, v in summary.items()))
+
+    path = save_results("startup", {
+        "runs": args.runs,
+        "mcp_startup_ms": args.mcp_startup_ms,
+        "pool_size": args.pool_size,
+        **results,
+    })
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Stub Harness MCP server for offline benchmarks.
+
+Speaks MCP over stdio like ``harness-mcp stdio`` and exposes a handful of
+Harness-shaped tools that return canned JSON after a configurable delay:
+
+    STUB_MCP_LATENCY_MS       default latency for every tool (default 50)
+    STUB_MCP_TOOL_LATENCY     JSON object of per-tool latencies in ms,
+                              e.g. '{"list_pipelines": 200}'
+    STUB_MCP_LIST_SIZE        number of items returned by list tools (default 20)
+    STUB_MCP_STARTUP_MS       delay before the server starts answering (default 0)
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+
+import mcp.types as types
+from mcp.server import Server
+from mcp.server.stdio import stdio_server
+
+# Keep stderr quiet; the MCP server logs every request at INFO
+logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+
+DEFAULT_LATENCY_MS = float(os.environ.get("STUB_MCP_LATENCY_MS", "50"))
+TOOL_LATENCY_MS = json.loads(os.environ.get("STUB_MCP_TOOL_LATENCY", "{}"))
+LIST_SIZE = int(os.environ.get("STUB_MCP_LIST_SIZE", "20"))
+STARTUP_MS = float(os.environ.get("STUB_MCP_STARTUP_MS", "0"))
+
+SCOPE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "org_id": {"type": "string", "description": "Organization identifier"},
+        "project_id": {"type": "string", "description": "Project identifier"},
+        "page": {"type": "integer", "description": "Page number"},
+        "size": {"type": "integer", "description": "Page size"},
+    },
+}
+
+TOOLS = {
+    "list_pipelines": "List pipelines in a Harness project",
+    "get_pipeline": "Get the YAML and details of a Harness pipeline",
+    "list_connectors": "List connectors in a Harness project",
+    "get_connector_details": "Get details of a Harness connector",
+    "list_connector_catalogue": "List the connector types Harness supports",
+    "list_environments": "List environments in a Harness project",
+    "list_services": "List services in a Harness project",
+    "create_pipeline": "Create a pipeline in a Harness project from YAML",
+}
+
+server = Server("stub-harness-mcp")
+
+
+def _payload(name: str, arguments: dict) -> dict:
+    if name.startswith("list_"):
+        resource = name[len("list_"):].rstrip("s")
+        return {
+            "status": "SUCCESS",
+            "data": {
+                "content": [
+                    {
+                        "identifier": f"{resource}_{i}",
+                        "name": f"{resource.replace('_', ' ').title()} {i}",
+                        "orgIdentifier": arguments.get("org_id", "default"),
+                        "projectIdentifier": arguments.get("project_id", "default"),
+                        "tags": {"team": "platform", "tier": str(i % 3)},
+                        "description": f"Stub {resource} number {i}",
+                    }
+                    for i in range(LIST_SIZE)
+                ],
+                "pageIndex": arguments.get("page", 0),
+                "pageSize": LIST_SIZE,
+                "totalItems": LIST_SIZE,
+            },
+        }
+    if name == "get_pipeline":
+        return {
+            "status": "SUCCESS",
+            "data": {
+                "yamlPipeline": "pipeline:\n  name: Stub\n  identifier: Stub\n  stages: []\n",
+                "identifier": arguments.get("pipeline_id", "Stub"),
+            },
+        }
+    return {"status": "SUCCESS", "data": {"tool": name, "arguments": arguments}}
+
+
+@server.list_tools()
+async def list_tools() -> list[types.Tool]:
+    return [
+        types.Tool(name=name, description=description, inputSchema=SCOPE_SCHEMA)
+        for name, description in TOOLS.items()
+    ]
+
+
+@server.call_tool()
+async def call_tool(name: str, arguments: dict | None) -> list[types.TextContent]:
+    latency_ms = float(TOOL_LATENCY_MS.get(name, DEFAULT_LATENCY_MS))
+    await asyncio.sleep(latency_ms / 1000)
+    return [types.TextContent(type="text", text=json.dumps(_payload(name, arguments or {})))]
+
+
+async def main():
+    # Simulates the real binary's own startup (loading config, auth) before the handshake
+    await asyncio.sleep(STARTUP_MS / 1000)
+    async with stdio_server() as (read_stream, write_stream):
+        await server.run(read_stream, write_stream, server.create_initialization_options())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
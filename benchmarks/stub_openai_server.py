@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Stub OpenAI-compatible chat completions server for offline tests and benchmarks.
+
+Answers ``POST /v1/chat/completions`` (plain and ``stream=true``) after a
+fixed delay with a small pipeline YAML, as a ``submit_yaml`` tool call
+when that tool is offered and as a fenced reply otherwise. Point the API at
+it with ``OPENAI_BASE_URL=http://127.0.0.1:<port>/v1``:
+
+    python -m benchmarks.stub_openai_server --port 8790 [--latency-ms 200]
+        [--connect-latency-ms 0] [--error-rate 0] [--certfile cert.pem --keyfile key.pem]
+
+``--connect-latency-ms`` holds every new connection before its first
+request is read, standing in for the TCP and TLS round trips to a remote
+backend. ``--error-rate`` answers that share of requests with 503 and a
+``retry-after-ms`` header. ``GET /stats`` returns the connections and
+requests seen so far.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from uvicorn.protocols.http.h11_impl import H11Protocol
+
+STATS = {"connections": 0, "requests": 0, "errors": 0}
+OPTIONS = {"latency_ms": 200.0, "connect_latency_ms": 0.0, "error_rate": 0.0}
+
+ANSWER = """pipeline:
+  name: stub_pipeline
+  identifier: stub_pipeline
+  stages:
+    - stage:
+        name: Build
+        identifier: Build
+        type: CI
+        spec: {}
+"""
+
+
+class SlowConnectProtocol(H11Protocol):
+    """HTTP/1.1 protocol that counts connections and delays each one's first read."""
+
+    def connection_made(self, transport):
+        super().connection_made(transport)
+        STATS["connections"] += 1
+        if OPTIONS["connect_latency_ms"]:
+            transport.pause_reading()
+            asyncio.get_running_loop().call_later(OPTIONS["connect_latency_ms"] / 1000, transport.resume_reading)
+
+
+def _message(body: dict) -> dict:
+    """The assistant message for a request: a submit_yaml call if offered, else fenced YAML."""
+    tools = [tool.get("function", {}).get("name") for tool in body.get("tools") or []]
+    if "submit_yaml" in tools:
+        return {"role": "assistant", "content": None, "tool_calls": [{
+            "id": f"call_{uuid.uuid4().hex[:12]}", "type": "function",
+            "function": {"name": "submit_yaml", "arguments": json.dumps({"yaml": ANSWER})},
+        }]}
+    return {"role": "assistant", "content": f"```yaml\n{ANSWER}```"}
+
+
+def _usage(body: dict, message: dict) -> dict:
+    prompt = len(json.dumps(body.get("messages", []))) // 4
+    completion = len(json.dumps(message)) // 4
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+
+async def chat_completions(request: Request):
+    STATS["requests"] += 1
+    body = await request.json()
+    await asyncio.sleep(OPTIONS["latency_ms"] / 1000)
+    if random.random() < OPTIONS["error_rate"]:
+        STATS["errors"] += 1
+        return JSONResponse({"error": {"message": "Stub overloaded", "type": "server_error"}},
+                            status_code=503, headers={"retry-after-ms": "50"})
+
+    message = _message(body)
+    finish_reason = "tool_calls" if message.get("tool_calls") else "stop"
+    base = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "created": int(time.time()), "model": body.get("model")}
+    if not body.get("stream"):
+        return JSONResponse({
+            **base, "object": "chat.completion",
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": _usage(body, message),
+        })
+
+    async def events():
+        def chunk(delta: dict, finish=None) -> str:
+            data = {**base, "object": "chat.completion.chunk",
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+            return f"data: {json.dumps(data)}\n\n"
+
+        yield chunk({"role": "assistant", "content": "" if message["content"] else None})
+        if message.get("tool_calls"):
+            call = message["tool_calls"][0]
+            yield chunk({"tool_calls": [{"index": 0, **call}]})
+        else:
+            for line in message["content"].splitlines(keepends=True):
+                yield chunk({"content": line})
+        yield chunk({}, finish_reason)
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+async def stats(request: Request):
+    return JSONResponse(STATS)
+
+
+app = Starlette(routes=[
+    Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+    Route("/stats", stats),
+])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--connect-latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--certfile", help="Serve HTTPS with this certificate")
+    parser.add_argument("--keyfile")
+    args = parser.parse_args()
+
+    OPTIONS.update(latency_ms=args.latency_ms, connect_latency_ms=args.connect_latency_ms,
+                   error_rate=args.error_rate)
+    uvicorn.run(app, host=args.host, port=args.port, http=SlowConnectProtocol, log_level="warning",
+                ssl_certfile=args.certfile, ssl_keyfile=args.keyfile, timeout_keep_alive=120)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Cost of validating generated YAML against the V0 schemas, per document.
+
+Runs in-process (no server). For pipelines of each size in ``--stages``
+(CI stages of three steps each, as in ``benchmarks.pipeline_edit``) it
+times, per document:
+
+    compile_ms       compiling the pipeline schema with fastjsonschema and
+                     building its jsonschema validator (what startup pays once)
+    validate_ms      validating the parsed document with the cached validators
+    interpreted_ms   validating with the jsonschema validator alone, which
+                     resolves every ``$ref`` while walking the document
+    uncached_ms      compiling and validating, as a service without a
+                     validator cache would pay per request
+    parse_validate_ms
+                     ``yaml_codec.load`` of the YAML plus cached validation,
+                     the full cost of the validation stage on a response
+    invalid_ms       cached validation of the same document with a broken
+                     identifier in every stage, including error formatting
+
+    python -m benchmarks.validation [--stages 1,10,30,100] [--iterations 200]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+from typing import Callable, Dict
+
+import yaml
+
+from benchmarks.common import BASE_ENV, save_results
+from benchmarks.pipeline_edit import build_pipeline
+
+
+def time_ms(func: Callable[[], object], iterations: int) -> Dict[str, float]:
+    """Median and p95 wall time of ``func`` in milliseconds."""
+    func()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "p50": round(statistics.median(samples), 4),
+        "p95": round(samples[int(len(samples) * 0.95) - 1], 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stages", default="1,10,30,100", help="Comma-separated pipeline sizes")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--output", help="Result file (default benchmarks/results/validation.json)")
+    args = parser.parse_args()
+
+    os.environ.update(BASE_ENV)
+    import fastjsonschema
+    from jsonschema import Draft7Validator
+    from schema_validation import SCHEMA_FILES, schema_validator
+    from yaml_codec import yaml_codec
+
+    with open(os.path.join(schema_validator.schema_dir, SCHEMA_FILES["pipeline"]), encoding="utf-8") as f:
+        schema = json.load(f)
+    compile_ms = schema_validator.load()
+    print(f"Compiled {len(SCHEMA_FILES)} schemas at startup in {compile_ms:.1f}ms")
+
+    results = {}
+    for stages in [int(s) for s in args.stages.split(",")]:
+        text = build_pipeline(stages)
+        document = yaml.safe_load(text)
+        broken = yaml.safe_load(text)
+        for item in broken["pipeline"]["stages"]:
+            item["stage"]["identifier"] = "1-" + item["stage"]["identifier"]
+        assert not schema_validator.validate("pipeline", document)
+
+        def compile_schema():
+            return fastjsonschema.compile(schema, use_formats=False), Draft7Validator(schema)
+
+        def uncached():
+            compiled, _ = compile_schema()
+            return compiled(document)
+
+        interpreted = Draft7Validator(schema)
+
+        def parse_validate():
+            return schema_validator.validate("pipeline", yaml_codec.load(text))
+
+        run = {
+            "yaml_bytes": len(text),
+            "compile_ms": time_ms(compile_schema, max(1, args.iterations // 10)),
+            "validate_ms": time_ms(lambda: schema_validator.validate("pipeline", document), args.iterations),
+            "interpreted_ms": time_ms(lambda: list(interpreted.iter_errors(document)), args.iterations),
+            "uncached_ms": time_ms(uncached, max(1, args.iterations // 10)),
+            "parse_validate_ms": time_ms(parse_validate, args.iterations),
+            "invalid_ms": time_ms(lambda: schema_validator.validate("pipeline", broken), args.iterations),
+        }
+        run["validate_us_per_stage"] = round(run["validate_ms"]["p50"] * 1000 / stages, 2)
+        results[str(stages)] = run
+        print(f"{stages:>4} stages ({len(text):>6} bytes): validate p50={run['validate_ms']['p50']}ms "
+              f"interpreted p50={run['interpreted_ms']['p50']}ms uncached p50={run['uncached_ms']['p50']}ms "
+              f"parse+validate p50={run['parse_validate_ms']['p50']}ms "
+              f"invalid p50={run['invalid_ms']['p50']}ms")
+
+    output = save_results("validation", {
+        "iterations": args.iterations,
+        "startup_compile_ms": round(compile_ms, 2),
+        "sizes": results,
+    }, path=args.output)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Throughput of the API with 1, 2 and 4 uvicorn workers.
+
+Requests hit the template fast path, so each one is pure CPU work inside
+the worker (no LLM call) and the numbers show how far a single event loop
+is the bottleneck. Response caches are disabled so every request renders.
+
+    python -m benchmarks.worker_scaling [--requests 400] [--concurrency 32] [--workers 1,2,4]
+"""
+
+import argparse
+import asyncio
+import os
+
+from benchmarks.common import APIServer, run_load, save_results
+
+LANGUAGES = ["Python", "Node.js", "Java", "Go"]
+
+
+def pipeline_payload(i: int) -> dict:
+    language = LANGUAGES[i % len(LANGUAGES)]
+    # Vary the service name so no two requests are identical
+    return {"request": f"Create a CI pipeline for a {language} service svc-{i} with build and test stages"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    env = {
+        "RESPONSE_CACHE_ENABLED": "false",
+        "SEMANTIC_CACHE_ENABLED": "false",
+        "ADMISSION_MAX_CONCURRENCY": str(args.concurrency),
+        "ADMISSION_MAX_QUEUE": str(args.concurrency * 4),
+    }
+
+    runs = []
+    for workers in [int(w) for w in args.workers.split(",")]:
+        with APIServer(port=args.port, workers=workers, env=env) as server:
+            # Warm up every worker before measuring
+            asyncio.run(run_load(server.base_url, "/api/v1/generate/pipeline", pipeline_payload,
+                                 total=workers * 10, concurrency=workers * 2))
+            result = asyncio.run(run_load(server.base_url, "/api/v1/generate/pipeline", pipeline_payload,
+                                          total=args.requests, concurrency=args.concurrency))
+        result["workers"] = workers
+        runs.append(result)
+        print(f"workers={workers:<2} rps={result['rps']:<8} p50={result['p50_ms']}ms "
+              f"p95={result['p95_ms']}ms p99={result['p99_ms']}ms errors={result['errors']}")
+
+    path = save_results("worker_scaling", {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "runs": runs,
+    })
+    if os.cpu_count() and os.cpu_count() < max(r["workers"] for r in runs):
+        print(f"Note: only {os.cpu_count()} CPU(s) available; extra workers cannot add throughput here")
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+YAML load/dump cost across pipeline sizes: pure Python vs. libyaml, inline vs. offloaded.
+
+Runs in-process (no server). For pipelines of each size in ``--stages``
+(CI stages of three steps each, as in ``benchmarks.pipeline_edit``) it
+times, per document:
+
+    load_py_ms / dump_py_ms     ``yaml.SafeLoader`` / ``yaml.SafeDumper``
+    load_c_ms / dump_c_ms       the libyaml ``CSafeLoader`` / ``CSafeDumper``
+                                (skipped when PyYAML was built without libyaml)
+
+and how long the event loop is blocked while one document is dumped:
+``stall_inline_ms`` dumps on the loop with the pure-Python dumper (what
+``_generate_yaml_async`` used to do), ``stall_codec_ms`` goes through
+``yaml_codec.adump``, which uses libyaml and moves documents above
+``YAML_OFFLOAD_BYTES`` to a worker thread. The stall is the longest gap
+between ticks of a 1 ms heartbeat task running alongside.
+
+    python -m benchmarks.yaml_codec [--stages 1,10,30,100,300] [--iterations 50]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable
+
+import yaml
+
+from benchmarks.common import BASE_ENV, save_results
+from benchmarks.pipeline_edit import build_pipeline
+from benchmarks.validation import time_ms
+
+
+async def max_stall_ms(work: Callable[[], Awaitable[Any]]) -> float:
+    """Longest event loop stall, in ms, while ``work`` runs next to a 1 ms heartbeat."""
+    stalls = []
+    running = True
+
+    async def heartbeat():
+        last = time.perf_counter()
+        while running:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            stalls.append((now - last) * 1000)
+            last = now
+
+    task = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0.005)
+    await work()
+    await asyncio.sleep(0.005)
+    running = False
+    await task
+    return round(max(stalls), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stages", default="1,10,30,100,300", help="Comma-separated pipeline sizes")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--output", help="Result file (default benchmarks/results/yaml_codec.json)")
+    args = parser.parse_args()
+
+    os.environ.update(BASE_ENV)
+    from yaml_codec import LIBYAML, yaml_codec
+
+    def dump_inline(document):
+        return yaml.dump(document, Dumper=yaml.SafeDumper, default_flow_style=False, sort_keys=False)
+
+    print(f"libyaml available: {LIBYAML}; offload above {yaml_codec.offload_bytes} bytes")
+    results = {}
+    for stages in [int(s) for s in args.stages.split(",")]:
+        text = build_pipeline(stages)
+        document = yaml.safe_load(text)
+        run = {
+            "yaml_bytes": len(text),
+            "load_py_ms": time_ms(lambda: yaml.load(text, Loader=yaml.SafeLoader), args.iterations),
+            "dump_py_ms": time_ms(lambda: dump_inline(document), args.iterations),
+        }
+        if LIBYAML:
+            run["load_c_ms"] = time_ms(lambda: yaml.load(text, Loader=yaml.CSafeLoader), args.iterations)
+            run["dump_c_ms"] = time_ms(lambda: yaml.dump(
+                document, Dumper=yaml.CSafeDumper, default_flow_style=False, sort_keys=False
+            ), args.iterations)
+
+        async def inline():
+            dump_inline(document)
+
+        run["stall_inline_ms"] = asyncio.run(max_stall_ms(inline))
+        run["stall_codec_ms"] = asyncio.run(max_stall_ms(lambda: yaml_codec.adump(document)))
+        results[str(stages)] = run
+
+        line = (f"{stages:>4} stages ({len(text):>7} bytes): load py={run['load_py_ms']['p50']}ms "
+                f"dump py={run['dump_py_ms']['p50']}ms")
+        if LIBYAML:
+            line += f" load c={run['load_c_ms']['p50']}ms dump c={run['dump_c_ms']['p50']}ms"
+        print(line + f" stall inline={run['stall_inline_ms']}ms codec={run['stall_codec_ms']}ms")
+
+    output = save_results("yaml_codec", {
+        "iterations": args.iterations,
+        "libyaml": LIBYAML,
+        "offload_bytes": yaml_codec.offload_bytes,
+        "sizes": results,
+    }, path=args.output)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
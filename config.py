@@ -1,11 +1,15 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
 
     openai_api_key: str
+    openai_model: str = "gpt-4"
+    openai_base_url: Optional[str] = None  # OpenAI-compatible endpoint; None = api.openai.com
+    agent_mode: str = "tools"  # tools (parallel tool calls) | functions (one call per turn)
+    agent_max_parallel_tools: int = 4
     harness_account_id: str
     harness_api_key: str
     harness_api_url: str = "https://app.harness.io"
@@ -16,6 +20,165 @@ class Settings(BaseSettings):
     # API Settings
     api_host: str = "0.0.0.0"
     api_port: int = 8000
+    api_workers: int = 1
+    api_graceful_shutdown_timeout: float = 30.0
+    worker_startup_stagger: float = 2.0
+
+    # Agent Startup
+    agent_background_init: bool = True
+    agent_init_max_attempts: int = 0  # 0 = retry until shutdown
+    agent_init_retry_initial_delay: float = 1.0
+    agent_init_retry_max_delay: float = 30.0
+
+    # MCP Session Pool
+    mcp_pool_size: int = 2
+    mcp_max_concurrency_per_session: int = 4
+    mcp_pool_acquire_timeout: float = 30.0
+    mcp_health_check_interval: float = 30.0
+    mcp_max_consecutive_failures: int = 3
+
+    # MCP Tool Catalog Snapshot
+    tool_catalog_snapshot_enabled: bool = True
+    tool_catalog_path: str = ".cache/tool_catalog.json"
+
+    # Tool Routing (offer the LLM only the tools relevant to a request)
+    tool_routing_enabled: bool = True
+    tool_routing_strategy: str = "keyword"  # keyword | embedding (uses semantic_cache_embedder)
+    tool_routing_max_tools: int = 8
+    tool_routing_min_score: float = 0.15
+    tool_routing_executor_cache_size: int = 32
+
+    # Provider Prompt Caching (stable tool + system prompt prefix)
+    prompt_cache_min_tokens: int = 1024  # shortest prefix the provider caches
+    prompt_cache_discount: float = 0.5  # price reduction of cached prompt tokens
+
+    # Model Tiers and Routing (cheapest tier first; a tier without "model" uses OPENAI_MODEL)
+    model_routing_enabled: bool = False  # opt in: the fast tier runs on a different model than OPENAI_MODEL
+    model_tiers: Dict[str, Dict[str, Any]] = {
+        "fast": {
+            "model": "gpt-4o-mini", "context_tokens": 128000, "max_tokens": 4096, "max_tools": 12,
+            "prompt_cost_per_1k": 0.00015, "completion_cost_per_1k": 0.0006,
+        },
+        "strong": {
+            "context_tokens": 8192, "prompt_cost_per_1k": 0.03, "completion_cost_per_1k": 0.06,
+        },
+    }
+    model_routing_default_tier: str = "strong"  # used when routing is off
+    model_routing_max_complexity: Dict[str, float] = {"fast": 0.5}  # highest score a tier takes
+    model_routing_endpoint_complexity: Dict[str, float] = {
+        "query": 0.0, "summary": 0.0, "connector": 0.2, "edit": 0.2, "pipeline": 0.3,
+    }
+    model_escalation_enabled: bool = True  # rerun on the next tier after an error or invalid YAML
+
+    # LLM Backend HTTP Client (one shared connection pool per base URL)
+    llm_http_pool_enabled: bool = True
+    llm_http_max_connections: int = 100
+    llm_http_max_keepalive_connections: int = 50
+    llm_http_keepalive_expiry: float = 90.0  # idle seconds before a kept-alive connection is closed
+    llm_http2: bool = True  # needs the h2 package; falls back to HTTP/1.1
+    llm_http_connect_timeout: float = 5.0
+    llm_http_read_timeout: float = 120.0
+    llm_http_write_timeout: float = 30.0
+    llm_http_pool_timeout: float = 10.0  # wait for a free connection
+    llm_http_ca_bundle: Optional[str] = None  # CA file to verify the backend with, e.g. a local stub's
+    llm_max_retries: int = 2  # per call, for connection errors, 429 and 5xx
+    llm_retry_budget_ratio: float = 0.1  # retries allowed per request in the window
+    llm_retry_budget_min: int = 10  # retries always allowed per window
+    llm_retry_budget_window: float = 10.0
+
+    # MCP Tool Result Cache (read-only tools only)
+    tool_cache_enabled: bool = True
+    tool_cache_allowlist: List[str] = [
+        "list_pipelines",
+        "get_pipeline",
+        "list_connectors",
+        "get_connector_details",
+        "list_connector_catalogue",
+        "list_environments",
+        "get_environment",
+        "list_services",
+        "get_service",
+        "list_templates",
+    ]
+    tool_cache_default_ttl: float = 60.0
+    tool_cache_ttl_overrides: Dict[str, float] = {"list_connector_catalogue": 3600.0}
+    tool_cache_max_bytes: int = 16 * 1024 * 1024
+
+    # MCP Tool Output Budget (what the LLM sees of each tool result)
+    tool_output_max_bytes: int = 16 * 1024  # ~4 bytes per token; 0 disables shaping
+    tool_output_max_bytes_overrides: Dict[str, int] = {}
+    tool_output_item_fields: List[str] = [
+        "identifier", "name", "type", "description", "status", "orgIdentifier", "projectIdentifier",
+        "tags", "url", "connectorType", "storeType", "createdAt", "lastModifiedAt",
+    ]
+    tool_output_offload_bytes: int = 256 * 1024  # parse larger results in a worker thread
+
+    # Agent Response Cache (opt-in)
+    response_cache_enabled: bool = False
+    response_cache_backend: str = "memory"  # memory | sqlite | redis
+    response_cache_ttl: float = 3600.0
+    response_cache_max_entries: int = 1024
+    response_cache_sqlite_path: str = ".cache/responses.sqlite3"
+    response_cache_redis_url: str = "redis://localhost:6379/0"
+
+    # Semantic (embedding-similarity) Response Cache (opt-in)
+    semantic_cache_enabled: bool = False
+    semantic_cache_embedder: str = "hashing"  # hashing | openai
+    semantic_cache_threshold: float = 0.85
+    semantic_cache_max_entries: int = 2048
+    semantic_cache_ttl: float = 3600.0
+    semantic_cache_embedding_dim: int = 1024
+    semantic_cache_openai_model: str = "text-embedding-3-small"
+
+    # Conversation Sessions (chat_history for follow-up requests)
+    session_enabled: bool = True
+    session_backend: str = "memory"  # memory | sqlite
+    session_ttl: float = 3600.0  # idle time before a session expires
+    session_max_sessions: int = 1024
+    session_sqlite_path: str = ".cache/sessions.sqlite3"
+    session_max_history_tokens: int = 4000
+    session_max_summary_tokens: int = 300
+    session_summarizer: str = "extractive"  # extractive | llm
+
+    # Incremental Pipeline Edits (JSON Patch)
+    pipeline_edit_max_attempts: int = 2  # model replies tried before giving up on a patch
+    pipeline_edit_fetch_tool: str = "get_pipeline"
+
+    # YAML Schema Validation (generated pipelines and connectors)
+    schema_validation_enabled: bool = True
+    schema_dir: str = "schemas/v0"  # pipeline.json and connector.json
+    schema_validation_max_errors: int = 20
+    schema_repair_attempts: int = 1  # model repair rounds for invalid YAML; 0 only reports
+
+    # Structured Output (final YAML submitted through the submit_yaml tool)
+    structured_output_tool: bool = False  # changes every generate prompt, so opt in
+
+    # YAML Serialization
+    yaml_use_libyaml: bool = True  # C loader/dumper when PyYAML has them
+    yaml_offload_bytes: int = 64 * 1024  # parse/dump larger documents in a worker thread
+
+    # Deterministic Template Fast Path
+    fast_path_enabled: bool = True
+    fast_path_min_confidence: float = 0.8
+
+    # In-flight Request Coalescing
+    coalesce_enabled: bool = True
+    coalesce_max_wait: float = 60.0
+
+    # Admission Control (lower priority value is served first)
+    admission_enabled: bool = True
+    admission_max_concurrency: int = 16
+    admission_max_queue: int = 64
+    admission_queue_timeout: float = 30.0
+    admission_priorities: Dict[str, int] = {"interactive": 0, "generate": 1, "batch": 2}
+
+    # Batch Generation
+    batch_max_items: int = 100
+    batch_max_concurrency: int = 8
+
+    # Metrics and Instrumentation
+    metrics_enabled: bool = True
+    server_timing_enabled: bool = False
 
     # LangSmith Tracing (Optional)
     langchain_tracing_v2: str = "false"
@@ -25,6 +188,8 @@ class Settings(BaseSettings):
     class Config:
         env_file = ".env"
         case_sensitive = False
+        # model_tiers / model_routing_* are settings, not pydantic internals
+        protected_namespaces = ("settings_",)
 
 
 settings = Settings()
@@ -64,6 +64,7 @@ fi
 echo "🔧 Configuration:"
 echo "   API Host: $API_HOST"
 echo "   API Port: $API_PORT"
+echo "   API Workers: ${API_WORKERS:-1}"
 echo "   MCP Server: $MCP_SERVER_PATH"
 echo "   Harness URL: $HARNESS_API_URL"
 echo "   Harness Org: ${HARNESS_DEFAULT_ORG_ID:-default}"
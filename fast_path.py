@@ -0,0 +1,435 @@
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from config import settings
+from yaml_codec import yaml_codec
+
+logger = logging.getLogger(__name__)
+
+LANGUAGES: Dict[str, Dict[str, Any]] = {
+    "python": {
+        "label": "Python",
+        "keywords": {"python", "py", "django", "flask", "fastapi", "pytest", "pip"},
+        "image": "python:3.11",
+        "build": "pip install -r requirements.txt",
+        "test": "pytest",
+    },
+    "node": {
+        "label": "Node.js",
+        "keywords": {"node", "nodejs", "node.js", "javascript", "typescript", "js", "ts", "npm", "react", "express"},
+        "image": "node:20",
+        "build": "npm ci\nnpm run build --if-present",
+        "test": "npm test",
+    },
+    "java": {
+        "label": "Java",
+        "keywords": {"java", "maven", "mvn", "spring", "springboot"},
+        "image": "maven:3.9-eclipse-temurin-17",
+        "build": "mvn -B package -DskipTests",
+        "test": "mvn -B test",
+    },
+    "go": {
+        "label": "Go",
+        "keywords": {"golang"},
+        "image": "golang:1.22",
+        "build": "go build ./...",
+        "test": "go test ./...",
+    },
+}
+
+STAGE_KEYWORDS = {
+    "build": {"build", "builds", "building", "compile", "package"},
+    "test": {"test", "tests", "testing", "unit", "pytest"},
+    "deploy": {"deploy", "deploys", "deployment", "deploying", "release", "rollout", "cd"},
+}
+
+CONNECTOR_TYPES = {
+    "github": {"keywords": {"github"}, "type": "Github", "default_url": "https://github.com"},
+    "gitlab": {"keywords": {"gitlab"}, "type": "Gitlab", "default_url": "https://gitlab.com"},
+    "dockerhub": {"keywords": {"dockerhub", "docker"}, "type": "DockerRegistry", "default_url": "https://index.docker.io/v2/"},
+}
+
+# Anything in a request that the templates cannot express sends it to the agent
+UNSUPPORTED = {
+    "helm", "terraform", "ecs", "lambda", "serverless", "ssh", "winrm", "approval", "manual",
+    "matrix", "parallel", "canary", "blue", "green", "bluegreen", "sonar", "sonarqube", "scan",
+    "security", "notify", "notification", "slack", "email", "trigger", "cron", "schedule",
+    "secret", "artifact", "artifacts", "s3", "gcs", "ecr", "gcr", "acr", "push", "image",
+    "dockerfile", "multiple", "environments", "oauth", "anonymous", "ssh-key", "gpu",
+    "windows", "macos", "arm", "cache", "caching", "variable", "variables", "input", "inputs",
+    "existing", "update", "modify", "list", "show", "get",
+}
+
+# Words that are safe to ignore when judging whether a request is fully understood
+FILLER = {
+    "a", "an", "the", "and", "or", "for", "with", "to", "of", "in", "on", "my", "our", "me",
+    "i", "we", "please", "can", "you", "that", "this", "it", "is", "be", "using", "use",
+    "create", "generate", "make", "give", "want", "need", "new", "simple", "basic", "standard",
+    "harness", "harness.io", "yaml", "pipeline", "pipelines", "ci", "ci/cd", "cicd", "stage",
+    "stages", "step", "steps", "run", "runs", "application", "app", "service", "project",
+    "repo", "repository", "code", "codebase", "named", "called", "name", "connector", "then",
+    "kubernetes", "k8s", "cluster", "registry", "hub", "token", "pat", "personal", "access",
+    "authentication", "auth", "username", "password", "account", "org", "organization",
+    "from", "at", "which", "should", "will", "also", "all", "both",
+}
+
+# Negations and exclusions ("skip deploy", "without tests") change what the request
+# asks for in ways the keyword slots cannot express, so they always go to the agent
+NEGATIONS = {
+    "no", "not", "nor", "never", "don", "dont", "doesn", "skip", "skips", "skipping", "without",
+    "except", "excluding", "exclude", "omit", "only",
+}
+
+REPO_URL = re.compile(r"https?://(?:www\.)?(github\.com|gitlab\.com|bitbucket\.org)/([\w.\-]+)(?:/([\w.\-]+?))?(?:\.git)?/?(?=\s|$|[,;)])")
+NAMED = re.compile(r"\b(?:named|called)\s+[\"'`]?([A-Za-z][\w\-. ]{0,62}?)[\"'`]?(?=\s+(?:with|for|that|using|and|to)\b|[,.;]|$)", re.I)
+GO_LANGUAGE = re.compile(r"\bgo\s+(?:app|application|service|project|module|ci|binary|code)\b", re.I)
+
+
+@dataclass
+class FastPathMatch:
+    """Slots extracted from a request the templates can render."""
+    kind: str
+    confidence: float
+    slots: Dict[str, Any] = field(default_factory=dict)
+
+
+def _identifier(name: str) -> str:
+    identifier = re.sub(r"[^A-Za-z0-9_]", "_", name.strip())
+    identifier = re.sub(r"_+", "_", identifier).strip("_")
+    if not identifier or not identifier[0].isalpha():
+        identifier = f"p_{identifier}"
+    return identifier[:128]
+
+
+def _tokens(text: str) -> List[str]:
+    return [t.strip(".,;:!?()") for t in re.findall(r"[A-Za-z0-9][\w.\-/+]*", text.lower())]
+
+
+def _confidence(tokens: List[str], recognized: set) -> float:
+    """Share of request tokens the classifier understood."""
+    words = [t for t in tokens if t]
+    if not words:
+        return 0.0
+    known = sum(1 for t in words if t in recognized or t in FILLER)
+    return known / len(words)
+
+
+def _extract_common(text: str) -> Tuple[str, Dict[str, Any]]:
+    """Pull repo URL and explicit name out of the text before scoring the rest."""
+    slots: Dict[str, Any] = {}
+    remainder = text
+
+    url_match = REPO_URL.search(remainder)
+    if url_match:
+        slots["repo_url"] = url_match.group(0).rstrip("/")
+        slots["repo_host"] = url_match.group(1)
+        slots["repo_owner"] = url_match.group(2)
+        slots["repo_name"] = url_match.group(3)
+        remainder = remainder.replace(url_match.group(0), " ")
+
+    name_match = NAMED.search(remainder)
+    if name_match:
+        slots["name"] = name_match.group(1).strip()
+        remainder = remainder.replace(name_match.group(0), " ")
+
+    return remainder, slots
+
+
+def classify_pipeline_request(text: str) -> Optional[FastPathMatch]:
+    """Extract language, stages, repo and name from a pipeline request."""
+    remainder, slots = _extract_common(text)
+    tokens = _tokens(remainder)
+    token_set = set(tokens)
+
+    if token_set & (UNSUPPORTED | NEGATIONS):
+        return None
+
+    languages = [key for key, lang in LANGUAGES.items() if token_set & lang["keywords"]]
+    # A bare "go" next to another language ("Go and Python monorepo") is a second toolchain
+    if GO_LANGUAGE.search(remainder) or ("go" in token_set and languages):
+        languages.append("go")
+    if len(set(languages)) != 1:
+        return None
+    language = languages[0]
+
+    stages = [stage for stage, words in STAGE_KEYWORDS.items() if token_set & words]
+    if stages == ["deploy"]:
+        # The templates deploy what CI built; a deploy on its own is left to the agent
+        return None
+    if not stages:
+        stages = ["build", "test"]
+
+    recognized = set(LANGUAGES[language]["keywords"]) | ({"go", "golang"} if language == "go" else set())
+    for words in STAGE_KEYWORDS.values():
+        recognized |= words
+    confidence = _confidence(tokens, recognized)
+
+    slots.update({"language": language, "stages": stages})
+    return FastPathMatch(kind="pipeline", confidence=confidence, slots=slots)
+
+
+def classify_connector_request(text: str) -> Optional[FastPathMatch]:
+    """Extract connector type, URL and name from a connector request."""
+    remainder, slots = _extract_common(text)
+    tokens = _tokens(remainder)
+    token_set = set(tokens)
+
+    if token_set & (UNSUPPORTED | NEGATIONS):
+        return None
+
+    types = [key for key, conn in CONNECTOR_TYPES.items() if token_set & conn["keywords"]]
+    if slots.get("repo_host") == "github.com":
+        types.append("github")
+    elif slots.get("repo_host") == "gitlab.com":
+        types.append("gitlab")
+    elif slots.get("repo_host"):
+        return None
+    if len(set(types)) != 1:
+        return None
+    connector_type = types[0]
+
+    recognized = set(CONNECTOR_TYPES[connector_type]["keywords"])
+    confidence = _confidence(tokens, recognized)
+
+    slots["connector_type"] = connector_type
+    return FastPathMatch(kind="connector", confidence=confidence, slots=slots)
+
+
+def _run_step(name: str, image: str, command: str) -> Dict[str, Any]:
+    return {
+        "step": {
+            "type": "Run",
+            "name": name,
+            "identifier": _identifier(name),
+            "spec": {
+                "shell": "Sh",
+                "image": image,
+                "command": command,
+            },
+        }
+    }
+
+
+def render_pipeline(slots: Dict[str, Any]) -> Dict[str, Any]:
+    """Render a Harness V0 pipeline document from classifier slots."""
+    lang = LANGUAGES[slots["language"]]
+    stages = slots["stages"]
+    name = slots.get("name") or f"{lang['label']} {'CI/CD' if 'deploy' in stages else 'CI'}"
+
+    steps = []
+    if "build" in stages:
+        steps.append(_run_step("Build", lang["image"], lang["build"]))
+    if "test" in stages:
+        steps.append(_run_step("Test", lang["image"], lang["test"]))
+
+    pipeline_stages = []
+    if steps:
+        ci_name = " and ".join(s.capitalize() for s in stages if s != "deploy")
+        pipeline_stages.append({
+            "stage": {
+                "name": ci_name,
+                "identifier": _identifier(ci_name),
+                "type": "CI",
+                "spec": {
+                    "cloneCodebase": True,
+                    "platform": {"os": "Linux", "arch": "Amd64"},
+                    "runtime": {"type": "Cloud", "spec": {}},
+                    "execution": {"steps": steps},
+                },
+            }
+        })
+
+    if "deploy" in stages:
+        pipeline_stages.append({
+            "stage": {
+                "name": "Deploy",
+                "identifier": "Deploy",
+                "type": "Deployment",
+                "spec": {
+                    "deploymentType": "Kubernetes",
+                    "service": {"serviceRef": "<+input>"},
+                    "environment": {
+                        "environmentRef": "<+input>",
+                        "deployToAll": False,
+                        "infrastructureDefinitions": "<+input>",
+                    },
+                    "execution": {
+                        "steps": [{
+                            "step": {
+                                "name": "Rollout Deployment",
+                                "identifier": "rolloutDeployment",
+                                "type": "K8sRollingDeploy",
+                                "timeout": "10m",
+                                "spec": {"skipDryRun": False},
+                            }
+                        }],
+                        "rollbackSteps": [{
+                            "step": {
+                                "name": "Rollback Rollout Deployment",
+                                "identifier": "rollbackRolloutDeployment",
+                                "type": "K8sRollingRollback",
+                                "timeout": "10m",
+                                "spec": {},
+                            }
+                        }],
+                    },
+                },
+                "failureStrategies": [{
+                    "onFailure": {
+                        "errors": ["AllErrors"],
+                        "action": {"type": "StageRollback"},
+                    }
+                }],
+            }
+        })
+
+    pipeline: Dict[str, Any] = {
+        "name": name,
+        "identifier": _identifier(name),
+        "projectIdentifier": settings.harness_default_project_id,
+        "orgIdentifier": settings.harness_default_org_id,
+    }
+    if steps:
+        codebase: Dict[str, Any] = {"connectorRef": "<+input>", "build": "<+input>"}
+        if slots.get("repo_name"):
+            codebase["repoName"] = slots["repo_name"]
+        pipeline["properties"] = {"ci": {"codebase": codebase}}
+    pipeline["stages"] = pipeline_stages
+
+    return {"pipeline": pipeline}
+
+
+def render_connector(slots: Dict[str, Any]) -> Dict[str, Any]:
+    """Render a Harness V0 connector document from classifier slots."""
+    connector_type = slots["connector_type"]
+    spec_type = CONNECTOR_TYPES[connector_type]
+    name = slots.get("name") or f"{connector_type}-connector"
+
+    if connector_type == "dockerhub":
+        spec = {
+            "dockerRegistryUrl": spec_type["default_url"],
+            "providerType": "DockerHub",
+            "auth": {
+                "type": "UsernamePassword",
+                "spec": {"username": "<+input>", "passwordRef": "<+input>"},
+            },
+            "executeOnDelegate": False,
+        }
+    else:
+        repo_level = bool(slots.get("repo_name"))
+        if repo_level:
+            url = slots["repo_url"]
+        elif slots.get("repo_owner"):
+            url = f"https://{slots['repo_host']}/{slots['repo_owner']}"
+        else:
+            url = spec_type["default_url"]
+        spec = {
+            "url": url,
+            "authentication": {
+                "type": "Http",
+                "spec": {
+                    "type": "UsernameToken",
+                    "spec": {"username": "<+input>", "tokenRef": "<+input>"},
+                },
+            },
+            "apiAccess": {"type": "Token", "spec": {"tokenRef": "<+input>"}},
+            "executeOnDelegate": False,
+            "type": "Repo" if repo_level else "Account",
+        }
+        if not repo_level:
+            spec["validationRepo"] = "<+input>"
+
+    return {
+        "connector": {
+            "name": name,
+            "identifier": _identifier(name),
+            "orgIdentifier": settings.harness_default_org_id,
+            "projectIdentifier": settings.harness_default_project_id,
+            "type": spec_type["type"],
+            "spec": spec,
+        }
+    }
+
+
+class FastPathEngine:
+    """
+    Deterministic YAML generation for template-matchable requests.
+
+    A keyword classifier extracts slots from pipeline and connector
+    requests; if it recognizes at least ``min_confidence`` of the request
+    the matching Harness V0 template is rendered without calling the LLM.
+    Anything else returns None and falls through to the agent.
+    """
+
+    def __init__(self, enabled: bool, min_confidence: float):
+        self.enabled = enabled
+        self.min_confidence = min_confidence
+
+        self.hits: Dict[str, int] = {"pipeline": 0, "connector": 0}
+        self.fallthroughs: Dict[str, int] = {"pipeline": 0, "connector": 0}
+        self.render_ms_total = 0.0
+
+    def classify(self, kind: str, user_request: str) -> Optional[FastPathMatch]:
+        if kind == "pipeline":
+            return classify_pipeline_request(user_request)
+        if kind == "connector":
+            return classify_connector_request(user_request)
+        return None
+
+    def matches(self, kind: str, user_request: str) -> bool:
+        """Whether ``try_generate`` would render this request (no metrics recorded)."""
+        if not self.enabled or kind not in self.hits:
+            return False
+        match = self.classify(kind, user_request)
+        return match is not None and match.confidence >= self.min_confidence
+
+    def try_generate(self, kind: str, user_request: str) -> Optional[Dict[str, Any]]:
+        """Return a rendered agent-style result, or None to fall through."""
+        if not self.enabled or kind not in self.hits:
+            return None
+
+        start = time.perf_counter()
+        match = self.classify(kind, user_request)
+        if match is None or match.confidence < self.min_confidence:
+            self.fallthroughs[kind] += 1
+            if match is not None:
+                logger.info(f"Fast path skipped for {kind} request (confidence {match.confidence:.2f})")
+            return None
+
+        document = render_pipeline(match.slots) if kind == "pipeline" else render_connector(match.slots)
+        output = yaml_codec.dump(document)
+
+        duration = (time.perf_counter() - start) * 1000
+        self.hits[kind] += 1
+        self.render_ms_total += duration
+        logger.info(f"⚡ Fast path rendered {kind} in {duration:.2f}ms (confidence {match.confidence:.2f}, slots {match.slots})")
+
+        return {
+            "output": output,
+            "intermediate_steps": None,
+            "tool_calls": [],
+            "fast_path": True,
+        }
+
+    def get_metrics(self) -> Dict[str, Any]:
+        total_hits = sum(self.hits.values())
+        total = total_hits + sum(self.fallthroughs.values())
+        return {
+            "enabled": self.enabled,
+            "min_confidence": self.min_confidence,
+            "hits": dict(self.hits),
+            "fallthroughs": dict(self.fallthroughs),
+            "hit_rate": round(total_hits / total, 4) if total else 0.0,
+            # Each hit avoids at least one LLM round trip and the generate_yaml tool hop
+            "llm_calls_saved": total_hits,
+            "avg_render_ms": round(self.render_ms_total / total_hits, 3) if total_hits else 0.0,
+        }
+
+
+# Global fast path engine instance
+fast_path = FastPathEngine(
+    enabled=settings.fast_path_enabled,
+    min_confidence=settings.fast_path_min_confidence,
+)
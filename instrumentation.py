@@ -0,0 +1,400 @@
+import bisect
+import contextvars
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+from fastapi.routing import APIRoute
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.outputs import LLMResult
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from in-process work up to long agent runs
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Prompt tokens per request, from a single short call up to long multi-step runs
+TOKEN_BUCKETS = (256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter with labels, rendered in Prometheus text format."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def values(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self) -> Iterator[str]:
+        for values, total in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labels, values)} {total}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels, rendered in Prometheus text format."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0.0] * (len(self.buckets) + 2)
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def samples(self) -> Iterator[str]:
+        for values, series in sorted(self._series.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _format_labels(self.labels, values, f'le="{bound}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            cumulative += series[len(self.buckets)]
+            labels = _format_labels(self.labels, values, 'le="+Inf"')
+            yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, values)} {series[-1]}"
+            yield f"{self.name}_count{_format_labels(self.labels, values)} {cumulative}"
+
+
+class Gauge:
+    """Gauge whose value is read from a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], float]):
+        self.name = name
+        self.help = help_text
+        self.read = read
+
+    def samples(self) -> Iterator[str]:
+        try:
+            yield f"{self.name} {float(self.read())}"
+        except Exception as e:
+            logger.debug(f"Gauge {self.name} unavailable: {e}")
+
+
+class RequestTrace:
+    """Stage durations accumulated over one HTTP request."""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.handler_done_at: Optional[float] = None
+        self.stages: Dict[str, float] = {}
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def server_timing(self, total: float) -> str:
+        parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in self.stages.items()]
+        parts.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(parts)
+
+
+# Trace of the request being handled; shared with every task the request spawns
+_current_trace: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar(
+    "request_trace", default=None
+)
+
+
+class Instrumentation:
+    """
+    Hot-path timings for the API and the agent.
+
+    Code records into it through ``span()`` / ``observe_*``; each recording
+    lands in an aggregate histogram and, when called inside an HTTP request,
+    in that request's ``RequestTrace`` (used for the ``Server-Timing``
+    header). ``render_prometheus`` serves the aggregates on ``/metrics``.
+    """
+
+    def __init__(self, enabled: bool, server_timing: bool):
+        self.enabled = enabled
+        self.server_timing = server_timing
+        self._metrics: List[Any] = []
+
+        self.requests = self._register(Counter(
+            "harness_agent_http_requests_total", "HTTP requests by endpoint and status code",
+            ("method", "endpoint", "status"),
+        ))
+        self.request_duration = self._register(Histogram(
+            "harness_agent_http_request_duration_seconds", "HTTP request latency until response start",
+            ("method", "endpoint"),
+        ))
+        self.stage_duration = self._register(Histogram(
+            "harness_agent_stage_duration_seconds",
+            "Time spent per hot-path stage (queue, llm, tool, mcp_call, extract_result, parse_steps, serialize)",
+            ("stage",),
+        ))
+        self.tool_duration = self._register(Histogram(
+            "harness_agent_tool_duration_seconds", "Agent tool latency, including cache hits",
+            ("tool", "outcome"),
+        ))
+        self.llm_duration = self._register(Histogram(
+            "harness_agent_llm_duration_seconds", "Latency of each chat model call", ("model",),
+        ))
+        self.llm_tokens = self._register(Counter(
+            "harness_agent_llm_tokens_total",
+            "Tokens reported by the chat model (prompt, cached_prompt, completion)", ("model", "type"),
+        ))
+        self.request_prompt_tokens = self._register(Histogram(
+            "harness_agent_request_prompt_tokens", "Prompt tokens per HTTP request, provider-cached or not",
+            ("type",), buckets=TOKEN_BUCKETS,
+        ))
+        self.tool_routing = self._register(Counter(
+            "harness_agent_tool_routing_total", "Tool routing decisions (routed, no_match, invalid_tool)",
+            ("outcome",),
+        ))
+        self.tool_schema_tokens_saved = self._register(Counter(
+            "harness_agent_tool_schema_tokens_saved_total",
+            "Estimated function-schema prompt tokens not sent thanks to tool routing (per routed request)",
+        ))
+        self.model_escalations = self._register(Counter(
+            "harness_agent_model_escalations_total", "Agent runs retried on a stronger model tier",
+            ("from_tier", "to_tier", "reason"),
+        ))
+        self.llm_cost = self._register(Counter(
+            "harness_agent_llm_cost_usd_total", "Estimated chat model spend per model tier", ("tier",),
+        ))
+        self.llm_http_events = self._register(Counter(
+            "harness_agent_llm_http_events_total",
+            "LLM backend connections opened, TLS handshakes and retries", ("backend", "event"),
+        ))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_gauge(self, name: str, help_text: str, read: Callable[[], float]):
+        """Expose a value owned by another component (read on every scrape)."""
+        self._register(Gauge(name, help_text, read))
+
+    def observe_stage(self, stage: str, seconds: float):
+        if not self.enabled:
+            return
+        self.stage_duration.observe(seconds, stage)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(stage, seconds)
+
+    @contextmanager
+    def span(self, stage: str):
+        """Record the wall time of the block as ``stage``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, time.perf_counter() - start)
+
+    def observe_tool(self, tool: str, seconds: float, outcome: str):
+        if self.enabled:
+            self.tool_duration.observe(seconds, tool, outcome)
+            self.observe_stage("tool", seconds)
+
+    def observe_llm(self, model: str, seconds: float, prompt_tokens: int, completion_tokens: int,
+                    cached_prompt_tokens: int = 0):
+        if not self.enabled:
+            return
+        self.llm_duration.observe(seconds, model)
+        self.observe_stage("llm", seconds)
+        if prompt_tokens:
+            self.llm_tokens.inc(model, "prompt", amount=prompt_tokens)
+        if cached_prompt_tokens:
+            self.llm_tokens.inc(model, "cached_prompt", amount=cached_prompt_tokens)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.prompt_tokens += prompt_tokens
+            trace.cached_prompt_tokens += cached_prompt_tokens
+        if completion_tokens:
+            self.llm_tokens.inc(model, "completion", amount=completion_tokens)
+
+    def token_totals(self) -> Dict[str, float]:
+        """LLM token counts summed over models, by type."""
+        totals: Dict[str, float] = {}
+        for (_, token_type), value in self.llm_tokens.values().items():
+            totals[token_type] = totals.get(token_type, 0.0) + value
+        return totals
+
+    def observe_tool_routing(self, outcome: str, tokens_saved: int = 0):
+        if not self.enabled:
+            return
+        self.tool_routing.inc(outcome)
+        if tokens_saved:
+            self.tool_schema_tokens_saved.inc(amount=tokens_saved)
+
+    def observe_model_escalation(self, from_tier: str, to_tier: str, reason: str):
+        if self.enabled:
+            self.model_escalations.inc(from_tier, to_tier, reason)
+
+    def observe_llm_cost(self, tier: str, cost: float):
+        if self.enabled and cost:
+            self.llm_cost.inc(tier, amount=cost)
+
+    def observe_llm_connection(self, backend: str, event: str):
+        if self.enabled:
+            self.llm_http_events.inc(backend, event)
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+class LLMTimingCallback(AsyncCallbackHandler):
+    """
+    LangChain callback that records chat model latency and token usage.
+
+    ``on_usage``, if given, also receives every call's (seconds,
+    prompt_tokens, completion_tokens, cached_prompt_tokens).
+    """
+
+    def __init__(self, instrumentation: "Instrumentation",
+                 on_usage: Optional[Callable[[float, int, int, int], None]] = None):
+        self.instrumentation = instrumentation
+        self.on_usage = on_usage
+        self._started: Dict[UUID, Tuple[float, str]] = {}
+
+    async def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *,
+                                  run_id: UUID, **kwargs: Any) -> None:
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or params.get("_type") or "unknown"
+        self._started[run_id] = (time.perf_counter(), str(model))
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._started.pop(run_id, None)
+        if started is None:
+            return
+        start, model = started
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+        if not usage and response.generations and response.generations[0]:
+            message = getattr(response.generations[0][0], "message", None)
+            metadata = getattr(message, "usage_metadata", None) or {}
+            usage = {
+                "prompt_tokens": metadata.get("input_tokens", 0),
+                "completion_tokens": metadata.get("output_tokens", 0),
+            }
+            cached = (metadata.get("input_token_details") or {}).get("cache_read") or 0
+        seconds = time.perf_counter() - start
+        prompt_tokens = usage.get("prompt_tokens", 0) or 0
+        completion_tokens = usage.get("completion_tokens", 0) or 0
+        self.instrumentation.observe_llm(model, seconds, prompt_tokens, completion_tokens, cached)
+        if self.on_usage is not None:
+            self.on_usage(seconds, prompt_tokens, completion_tokens, cached)
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started.pop(run_id, None)
+
+
+class InstrumentedRoute(APIRoute):
+    """
+    APIRoute that marks when the endpoint function returns.
+
+    The gap between that mark and the response start is FastAPI's response
+    validation and serialization, reported as the ``serialize`` stage.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        @functools.wraps(endpoint)
+        async def timed_endpoint(*args, **kw):
+            try:
+                return await endpoint(*args, **kw)
+            finally:
+                trace = _current_trace.get()
+                if trace is not None:
+                    trace.handler_done_at = time.perf_counter()
+
+        super().__init__(path, timed_endpoint, **kwargs)
+
+
+class InstrumentationMiddleware:
+    """ASGI middleware that opens a RequestTrace per HTTP request and records its latency."""
+
+    def __init__(self, app, instrumentation: "Instrumentation"):
+        self.app = app
+        self.instrumentation = instrumentation
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.instrumentation.enabled:
+            return await self.app(scope, receive, send)
+
+        trace = RequestTrace()
+        token = _current_trace.set(trace)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                now = time.perf_counter()
+                if trace.handler_done_at is not None:
+                    self.instrumentation.observe_stage("serialize", now - trace.handler_done_at)
+
+                total = now - trace.started_at
+                route = scope.get("route")
+                endpoint = getattr(route, "path", None) or "unmatched"
+                self.instrumentation.request_duration.observe(total, scope["method"], endpoint)
+                self.instrumentation.requests.inc(scope["method"], endpoint, str(message["status"]))
+
+                if self.instrumentation.server_timing:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", trace.server_timing(total).encode())
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_trace.reset(token)
+            # After the body, so streamed agent runs are counted in full
+            if trace.prompt_tokens:
+                cached = trace.cached_prompt_tokens
+                self.instrumentation.request_prompt_tokens.observe(cached, "cached")
+                self.instrumentation.request_prompt_tokens.observe(trace.prompt_tokens - cached, "uncached")
+
+
+# Global instrumentation instance
+instrumentation = Instrumentation(
+    enabled=settings.metrics_enabled,
+    server_timing=settings.server_timing_enabled,
+)
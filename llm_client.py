@@ -0,0 +1,315 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Deque, Dict, List, Optional
+import httpx
+from instrumentation import instrumentation
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the h2 package (httpx[http2]); without it connections use HTTP/1.1
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+# Responses worth another attempt, as the OpenAI client retries them
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+# Failures before the backend saw the request, or of a kept-alive connection it had closed
+RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError, httpx.ReadError)
+BACKOFF_INITIAL = 0.5
+BACKOFF_MAX = 8.0
+RETRY_AFTER_MAX = 60.0  # longer Retry-After values fall back to the backoff
+
+# Latency samples kept per backend for percentiles
+LATENCY_WINDOW = 1024
+
+
+class RetryBudget:
+    """
+    Caps retries at a fraction of recent traffic.
+
+    Within a sliding ``window`` of seconds, a retry is allowed while the
+    retries made number fewer than ``min_retries`` plus ``ratio`` times the
+    requests sent. When the backend is down, calls then fail fast instead
+    of every caller multiplying the load with its own retries.
+    """
+
+    def __init__(self, ratio: float, min_retries: int, window: float):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        self._requests: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+        self.denied = 0
+
+    def _trim(self, now: float):
+        for events in (self._requests, self._retries):
+            while events and events[0] < now - self.window:
+                events.popleft()
+
+    def record_request(self):
+        self._requests.append(time.monotonic())
+
+    def try_spend(self) -> bool:
+        """Take one retry from the budget; False if it is used up."""
+        now = time.monotonic()
+        self._trim(now)
+        if len(self._retries) >= self.min_retries + self.ratio * len(self._requests):
+            self.denied += 1
+            return False
+        self._retries.append(now)
+        return True
+
+    def get_metrics(self) -> Dict[str, Any]:
+        self._trim(time.monotonic())
+        return {
+            "window_seconds": self.window,
+            "requests_in_window": len(self._requests),
+            "retries_in_window": len(self._retries),
+            "allowed_in_window": int(self.min_retries + self.ratio * len(self._requests)),
+            "denied": self.denied,
+        }
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds the backend asked us to wait, from ``retry-after-ms`` or ``Retry-After``."""
+    value = response.headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+class _Backend:
+    """Transport, counters and latency samples for one base URL."""
+
+    def __init__(self, base_url: str, transport: httpx.AsyncHTTPTransport):
+        self.base_url = base_url
+        self.transport = transport
+        self.requests = 0
+        self.retries = 0
+        self.transport_errors = 0
+        self.statuses: Dict[str, int] = {}
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+        self.http_versions: Dict[str, int] = {}
+        self.latency_ms: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+
+class _PooledTransport(httpx.AsyncBaseTransport):
+    """
+    The shared connection pool of one backend, with counters and budgeted retries.
+
+    Sits under the OpenAI client (whose own retries are turned off) so
+    every attempt, new connection and TLS handshake is seen here.
+    """
+
+    def __init__(self, pool: "LLMClientPool", backend: _Backend):
+        self.pool = pool
+        self.backend = backend
+
+    async def _trace(self, event: str, info: Dict[str, Any]):
+        if event == "connection.connect_tcp.complete":
+            self.backend.connections_opened += 1
+            instrumentation.observe_llm_connection(self.backend.base_url, "opened")
+        elif event == "connection.start_tls.complete":
+            self.backend.tls_handshakes += 1
+            instrumentation.observe_llm_connection(self.backend.base_url, "tls_handshake")
+        elif event.endswith("send_request_headers.started"):
+            version = "HTTP/2" if event.startswith("http2") else "HTTP/1.1"
+            self.backend.http_versions[version] = self.backend.http_versions.get(version, 0) + 1
+
+    def _may_retry(self, attempt: int) -> bool:
+        return attempt < self.pool.max_retries and self.pool.retry_budget.try_spend()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        backend = self.backend
+        request.extensions = {**request.extensions, "trace": self._trace}
+        self.pool.retry_budget.record_request()
+        backend.requests += 1
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = await backend.transport.handle_async_request(request)
+            except RETRY_ERRORS as e:
+                if not self._may_retry(attempt):
+                    backend.transport_errors += 1
+                    raise
+                delay = None
+                logger.info(f"LLM request to {backend.base_url} failed ({type(e).__name__}: {e}); retrying")
+            except httpx.HTTPError:
+                backend.transport_errors += 1
+                raise
+            else:
+                backend.latency_ms.append((time.perf_counter() - started) * 1000)
+                status = str(response.status_code)
+                backend.statuses[status] = backend.statuses.get(status, 0) + 1
+                if response.status_code not in RETRY_STATUSES or not self._may_retry(attempt):
+                    return response
+                delay = _retry_after(response)
+                await response.aclose()
+                logger.info(f"LLM request to {backend.base_url} returned {status}; retrying")
+
+            backend.retries += 1
+            instrumentation.observe_llm_connection(backend.base_url, "retry")
+            if delay is None or not 0 <= delay <= RETRY_AFTER_MAX:
+                delay = min(BACKOFF_INITIAL * 2 ** attempt, BACKOFF_MAX) * random.uniform(0.75, 1.0)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def aclose(self):
+        await self.backend.transport.aclose()
+
+
+class LLMClientPool:
+    """
+    Shared async HTTP clients for the LLM backends, one per base URL.
+
+    Every chat model (and the OpenAI embedder) talking to the same backend
+    gets the same ``httpx.AsyncClient``, so connections, and the TLS
+    sessions on them, are reused across model tiers and requests instead
+    of each model client opening its own. Connections stay open for
+    ``keepalive_expiry`` seconds between calls (httpx's default is 5, less
+    than a typical tool call) and use HTTP/2 when enabled, multiplexing
+    concurrent calls over one connection. Retries
+    happen here, within ``max_retries`` per call and the shared
+    ``RetryBudget``; the OpenAI client's own retries are turned off.
+    """
+
+    def __init__(self, enabled: bool, max_connections: int, max_keepalive_connections: int,
+                 keepalive_expiry: float, http2: bool, timeout: httpx.Timeout, max_retries: int,
+                 retry_budget: RetryBudget, ca_bundle: Optional[str] = None):
+        self.enabled = enabled
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning("LLM_HTTP2 is set but the h2 package is not installed; using HTTP/1.1")
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_budget = retry_budget
+        self.verify = ca_bundle or True
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._backends: Dict[str, _Backend] = {}
+
+    @property
+    def client_max_retries(self) -> int:
+        """``max_retries`` for the OpenAI client: 0 when the pool retries for it."""
+        return 0 if self.enabled else self.max_retries
+
+    def client_for(self, base_url: Optional[str] = None) -> Optional[httpx.AsyncClient]:
+        """The shared client for ``base_url`` (OpenAI if None), or None when pooling is off."""
+        if not self.enabled:
+            return None
+        key = (base_url or DEFAULT_BASE_URL).rstrip("/")
+        client = self._clients.get(key)
+        if client is None:
+            backend = _Backend(key, httpx.AsyncHTTPTransport(
+                verify=self.verify, http2=self.http2, limits=self.limits
+            ))
+            self._backends[key] = backend
+            client = httpx.AsyncClient(
+                transport=_PooledTransport(self, backend), timeout=self.timeout, follow_redirects=True
+            )
+            self._clients[key] = client
+            logger.info(f"Created LLM HTTP client pool for {key} (http2={self.http2}, "
+                        f"max_connections={self.limits.max_connections})")
+        return client
+
+    @staticmethod
+    def _connections(backend: _Backend) -> List[Any]:
+        # httpx keeps its httpcore pool private; read it for the gauges only
+        pool = getattr(backend.transport, "_pool", None)
+        return list(getattr(pool, "connections", []))
+
+    def open_connections(self) -> int:
+        return sum(len(self._connections(b)) for b in self._backends.values())
+
+    def idle_connections(self) -> int:
+        return sum(1 for b in self._backends.values() for c in self._connections(b) if c.is_idle())
+
+    async def aclose(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+        self._backends.clear()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        backends = {}
+        for key, backend in self._backends.items():
+            connections = self._connections(backend)
+            samples = sorted(backend.latency_ms)
+            backends[key] = {
+                "requests": backend.requests,
+                "retries": backend.retries,
+                "transport_errors": backend.transport_errors,
+                "statuses": backend.statuses,
+                "http_versions": backend.http_versions,
+                "connections_open": len(connections),
+                "connections_idle": sum(1 for c in connections if c.is_idle()),
+                "connections_opened": backend.connections_opened,
+                "tls_handshakes": backend.tls_handshakes,
+                "requests_per_connection": (
+                    round(backend.requests / backend.connections_opened, 1) if backend.connections_opened else None
+                ),
+                "p50_ms": round(samples[len(samples) // 2], 1) if samples else 0.0,
+                "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 1) if samples else 0.0,
+            }
+        return {
+            "enabled": self.enabled,
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+            "timeouts": {
+                "connect": self.timeout.connect, "read": self.timeout.read,
+                "write": self.timeout.write, "pool": self.timeout.pool,
+            },
+            "max_retries": self.max_retries,
+            "retry_budget": self.retry_budget.get_metrics(),
+            "backends": backends,
+        }
+
+
+# Global LLM client pool instance
+llm_clients = LLMClientPool(
+    enabled=settings.llm_http_pool_enabled,
+    max_connections=settings.llm_http_max_connections,
+    max_keepalive_connections=settings.llm_http_max_keepalive_connections,
+    keepalive_expiry=settings.llm_http_keepalive_expiry,
+    http2=settings.llm_http2,
+    timeout=httpx.Timeout(
+        connect=settings.llm_http_connect_timeout,
+        read=settings.llm_http_read_timeout,
+        write=settings.llm_http_write_timeout,
+        pool=settings.llm_http_pool_timeout,
+    ),
+    max_retries=settings.llm_max_retries,
+    retry_budget=RetryBudget(
+        settings.llm_retry_budget_ratio, settings.llm_retry_budget_min, settings.llm_retry_budget_window
+    ),
+    ca_bundle=settings.llm_http_ca_bundle,
+)
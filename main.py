@@ -4,18 +4,50 @@ from dotenv import load_dotenv
 # This ensures LangChain can detect LANGCHAIN_TRACING_V2 and related vars
 load_dotenv()
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Path, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from contextlib import asynccontextmanager
+from typing import Optional, Tuple
+import asyncio
+import json
 import logging
-
-from agent import harness_agent
+import os
+import time
+import uuid
+
+from agent import AgentNotReady, harness_agent
+from pipeline_edit import PipelineEditError
+from mcp_client import mcp_client
+from tool_cache import tool_cache
+from tool_output import tool_output
+from schema_validation import schema_validator
+from yaml_codec import yaml_codec
+from tool_catalog import tool_catalog
+from tool_router import tool_router
+from model_router import PromptTooLarge, model_router
+from llm_client import llm_clients
+from prompt_cache import prompt_prefix
+from sessions import session_store
+from response_cache import response_cache
+from semantic_cache import semantic_cache
+from fast_path import fast_path
+from admission import AdmissionRejected, admission_controller
+from workers import claim_worker_slot, staggered_start, startup_delay
+from instrumentation import InstrumentationMiddleware, InstrumentedRoute, instrumentation
 from models import (
     PipelineRequest,
+    PipelineEditRequest,
+    PipelineEditResponse,
     ConnectorRequest,
     GeneralRequest,
+    BatchRequest,
+    BatchItem,
     AgentResponse,
-    HealthResponse
+    HealthResponse,
+    SessionResponse,
+    SESSION_ID_PATTERN
 )
 from config import settings
 
@@ -31,17 +63,25 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events."""
     # Startup
-    logger.info("Starting Harness Pipeline Agent API...")
-    try:
-        await harness_agent.initialize()
-        logger.info("Agent initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize agent: {e}")
-        raise
+    worker_index = claim_worker_slot()
+    logger.info(f"Starting Harness Pipeline Agent API (worker {worker_index}, pid {os.getpid()})...")
+    if settings.agent_background_init:
+        # Serve right away (liveness, fast path) while MCP and the agent come up
+        harness_agent.start_background_initialize(delay=startup_delay(worker_index))
+        logger.info("Agent initialization started in the background")
+    else:
+        try:
+            await staggered_start(worker_index)
+            await harness_agent.initialize()
+            logger.info("Agent initialized successfully")
+        except Exception as e:
+            logger.error(f"Failed to initialize agent: {e}")
+            raise
 
     yield
 
-    # Shutdown
+    # Shutdown (uvicorn has already let in-flight requests finish, within
+    # API_GRACEFUL_SHUTDOWN_TIMEOUT, before the lifespan exits)
     logger.info("Shutting down Harness Pipeline Agent API...")
     try:
         await harness_agent.cleanup()
@@ -58,6 +98,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Mark when each endpoint returns so response serialization can be timed
+app.router.route_class = InstrumentedRoute
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -67,6 +110,123 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request stage timings, /metrics histograms and Server-Timing headers
+app.add_middleware(InstrumentationMiddleware, instrumentation=instrumentation)
+
+instrumentation.register_gauge(
+    "harness_agent_admission_active", "Requests holding an admission slot",
+    lambda: admission_controller.active
+)
+instrumentation.register_gauge(
+    "harness_agent_admission_queue_depth", "Requests waiting in the admission queue",
+    lambda: admission_controller.queue_depth
+)
+instrumentation.register_gauge(
+    "harness_agent_mcp_sessions_healthy", "Healthy MCP sessions in the pool",
+    lambda: sum(1 for c in mcp_client.connections if c.healthy)
+)
+instrumentation.register_gauge(
+    "harness_agent_mcp_in_flight", "MCP tool calls in flight across the pool",
+    lambda: sum(c.in_flight for c in mcp_client.connections)
+)
+instrumentation.register_gauge(
+    "harness_agent_llm_http_connections_open", "Connections open in the LLM backend client pools",
+    llm_clients.open_connections
+)
+instrumentation.register_gauge(
+    "harness_agent_llm_http_connections_idle", "Kept-alive idle connections in the LLM backend client pools",
+    llm_clients.idle_connections
+)
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """Return 429/503 with Retry-After when the admission queue turns a request away."""
+    logger.warning(f"Rejected {request.url.path}: {exc.detail} (retry after {exc.retry_after}s)")
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+@app.exception_handler(AgentNotReady)
+async def agent_not_ready_handler(request: Request, exc: AgentNotReady):
+    """Return 503 with Retry-After while the agent is still starting up."""
+    logger.warning(f"Rejected {request.url.path}: {exc.detail}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+def _sse_event(event: str, data: dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _cache_flags(cache_control: Optional[str]) -> Tuple[bool, bool]:
+    """
+    Whether to look up and whether to store the response, from ``Cache-Control``.
+
+    ``no-cache`` skips the lookup but stores the fresh answer; ``no-store``
+    skips both.
+    """
+    if not cache_control:
+        return True, True
+    directives = {d.strip().lower() for d in cache_control.split(",")}
+    no_store = "no-store" in directives
+    return not (no_store or "no-cache" in directives), not no_store
+
+
+async def _stream_agent(
+    kind: str, user_request: str, use_cache: bool, priority_class: str, session_id: Optional[str] = None,
+    structured: bool = False, store_cache: bool = True
+) -> StreamingResponse:
+    """
+    Stream an agent run as server-sent events.
+
+    Emits ``token``, ``tool_start``, ``tool_end`` and ``result`` events as
+    the agent produces them, or a single ``error`` event on failure. The
+    admission slot is taken before the response starts and released once
+    the stream has been sent (or the client went away).
+    """
+    if not harness_agent.is_ready and not fast_path.matches(kind, user_request):
+        raise harness_agent.not_ready_error()
+    await admission_controller.acquire(priority_class)
+    start = time.perf_counter()
+
+    def release():
+        admission_controller.release((time.perf_counter() - start) * 1000)
+
+    async def event_source():
+        try:
+            async for item in harness_agent.stream_request(
+                kind, user_request, use_cache, session_id, structured, store_cache
+            ):
+                yield _sse_event(item["event"], item["data"])
+        except Exception as e:
+            logger.error(f"Error streaming {kind} request: {e}")
+            yield _sse_event("error", {"error": str(e)})
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(release)
+    )
+
+
+STREAM_QUERY = Query(default=False, description="Stream tokens, tool events and the result as server-sent events")
+CACHE_CONTROL_HEADER = Header(
+    default=None, description="'no-cache' skips the response cache lookup; 'no-store' also does not store the answer"
+)
+SESSION_HEADER = Header(
+    default=None, alias="X-Session-ID", pattern=SESSION_ID_PATTERN,
+    description="Conversation to continue (the body's session_id takes precedence)"
+)
+
 
 @app.get("/", tags=["Health"])
 async def root():
@@ -78,21 +238,58 @@ async def root():
     }
 
 
-@app.get("/health", response_model=HealthResponse, tags=["Health"])
-async def health_check():
-    """Health check endpoint."""
-    agent_initialized = harness_agent.agent_executor is not None
-    mcp_connected = harness_agent.llm is not None
+def _health() -> HealthResponse:
+    agent_initialized = harness_agent.is_ready
+    healthy_sessions = sum(1 for c in mcp_client.connections if c.healthy)
+    mcp_connected = healthy_sessions > 0
 
     return HealthResponse(
         status="healthy" if agent_initialized and mcp_connected else "degraded",
         agent_initialized=agent_initialized,
-        mcp_connected=mcp_connected
+        mcp_connected=mcp_connected,
+        initialization=harness_agent.status,
+        healthy_mcp_sessions=healthy_sessions,
+        last_error=harness_agent.last_init_error
+    )
+
+
+@app.get("/health", response_model=HealthResponse, tags=["Health"])
+async def health_check():
+    """Health check endpoint."""
+    return _health()
+
+
+@app.get("/health/live", tags=["Health"])
+async def liveness():
+    """Liveness probe: the process is up and serving requests."""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready", response_model=HealthResponse, tags=["Health"])
+async def readiness():
+    """Readiness probe: 503 until the agent is initialized and an MCP session is healthy."""
+    health = _health()
+    if health.status != "healthy":
+        return JSONResponse(status_code=503, content=health.model_dump())
+    return health
+
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Health"])
+async def metrics():
+    """Prometheus metrics for this worker process."""
+    return PlainTextResponse(
+        instrumentation.render_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
     )
 
 
 @app.post("/api/v1/generate/pipeline", response_model=AgentResponse, tags=["Pipeline"])
-async def generate_pipeline(request: PipelineRequest):
+async def generate_pipeline(
+    request: PipelineRequest,
+    stream: bool = STREAM_QUERY,
+    cache_control: Optional[str] = CACHE_CONTROL_HEADER,
+    x_session_id: Optional[str] = SESSION_HEADER
+):
     """
     Generate a Harness.io pipeline YAML based on the user request.
 
@@ -100,26 +297,94 @@ async def generate_pipeline(request: PipelineRequest):
         request: PipelineRequest containing the user's pipeline requirements
 
     Returns:
-        AgentResponse with the generated pipeline YAML
+        AgentResponse with the generated pipeline YAML, or a
+        text/event-stream of agent events when ``stream=true``
     """
+    session_id = request.session_id or x_session_id
+    use_cache, store_cache = _cache_flags(cache_control)
     try:
         logger.info(f"Generating pipeline for request: {request.request[:100]}...")
-        result = await harness_agent.generate_pipeline(request.request)
+        if stream:
+            return await _stream_agent(
+                "pipeline", request.request, use_cache, "generate", session_id, request.structured, store_cache
+            )
+        async with admission_controller.admit("generate"):
+            result = await harness_agent.generate_pipeline(
+                request.request, use_cache=use_cache, session_id=session_id,
+                structured=request.structured, store_cache=store_cache
+            )
 
         return AgentResponse(
             success=True,
             output=result["output"],
             intermediate_steps=result.get("intermediate_steps"),
             tool_calls=result.get("tool_calls"),
-            error=None
+            error=None,
+            cached=result.get("cached", False),
+            fast_path=result.get("fast_path", False),
+            validation=result.get("validation"),
+            session_id=result.get("session_id"),
+            yaml=result.get("yaml"),
+            document=result.get("document"),
+            content_hash=result.get("content_hash"),
+            model_tier=result.get("model_tier")
         )
+    except (AdmissionRejected, AgentNotReady):
+        raise
+    except PromptTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.error(f"Error generating pipeline: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/v1/edit/pipeline", response_model=PipelineEditResponse, tags=["Pipeline"])
+async def edit_pipeline(request: PipelineEditRequest):
+    """
+    Edit an existing pipeline with a JSON Patch instead of regenerating it.
+
+    The model returns only the operations for the requested change; the
+    server applies them to the parsed pipeline and returns the full YAML,
+    so output tokens and latency scale with the size of the change rather
+    than of the pipeline. YAML comments are not preserved.
+
+    Args:
+        request: PipelineEditRequest with the instruction and the pipeline
+            YAML or the identifier of a pipeline to fetch from Harness
+
+    Returns:
+        PipelineEditResponse with the updated YAML and the applied patch,
+        or 422 when no applicable patch was produced
+    """
+    try:
+        logger.info(f"Editing pipeline: {request.instruction[:100]}...")
+        async with admission_controller.admit("generate"):
+            result = await harness_agent.edit_pipeline(
+                request.instruction,
+                pipeline_yaml=request.pipeline_yaml,
+                pipeline_identifier=request.pipeline_identifier,
+                org_id=request.org_identifier,
+                project_id=request.project_identifier,
+            )
+        return PipelineEditResponse(success=True, **result)
+    except (AdmissionRejected, AgentNotReady):
+        raise
+    except PromptTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except PipelineEditError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error editing pipeline: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/api/v1/generate/connector", response_model=AgentResponse, tags=["Connector"])
-async def generate_connector(request: ConnectorRequest):
+async def generate_connector(
+    request: ConnectorRequest,
+    stream: bool = STREAM_QUERY,
+    cache_control: Optional[str] = CACHE_CONTROL_HEADER,
+    x_session_id: Optional[str] = SESSION_HEADER
+):
     """
     Generate a Harness.io connector YAML based on the user request.
 
@@ -127,26 +392,54 @@ async def generate_connector(request: ConnectorRequest):
         request: ConnectorRequest containing the user's connector requirements
 
     Returns:
-        AgentResponse with the generated connector YAML
+        AgentResponse with the generated connector YAML, or a
+        text/event-stream of agent events when ``stream=true``
     """
+    session_id = request.session_id or x_session_id
+    use_cache, store_cache = _cache_flags(cache_control)
     try:
         logger.info(f"Generating connector for request: {request.request[:100]}...")
-        result = await harness_agent.generate_connector(request.request)
+        if stream:
+            return await _stream_agent(
+                "connector", request.request, use_cache, "generate", session_id, request.structured, store_cache
+            )
+        async with admission_controller.admit("generate"):
+            result = await harness_agent.generate_connector(
+                request.request, use_cache=use_cache, session_id=session_id,
+                structured=request.structured, store_cache=store_cache
+            )
 
         return AgentResponse(
             success=True,
             output=result["output"],
             intermediate_steps=result.get("intermediate_steps"),
             tool_calls=result.get("tool_calls"),
-            error=None
+            error=None,
+            cached=result.get("cached", False),
+            fast_path=result.get("fast_path", False),
+            validation=result.get("validation"),
+            session_id=result.get("session_id"),
+            yaml=result.get("yaml"),
+            document=result.get("document"),
+            content_hash=result.get("content_hash"),
+            model_tier=result.get("model_tier")
         )
+    except (AdmissionRejected, AgentNotReady):
+        raise
+    except PromptTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.error(f"Error generating connector: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/api/v1/query", response_model=AgentResponse, tags=["General"])
-async def process_query(request: GeneralRequest):
+async def process_query(
+    request: GeneralRequest,
+    stream: bool = STREAM_QUERY,
+    cache_control: Optional[str] = CACHE_CONTROL_HEADER,
+    x_session_id: Optional[str] = SESSION_HEADER
+):
     """
     Process a general query or request using the Harness agent.
 
@@ -160,24 +453,186 @@ async def process_query(request: GeneralRequest):
         request: GeneralRequest containing the user's query
 
     Returns:
-        AgentResponse with the agent's response
+        AgentResponse with the agent's response, or a
+        text/event-stream of agent events when ``stream=true``
     """
+    session_id = request.session_id or x_session_id
+    use_cache, store_cache = _cache_flags(cache_control)
     try:
         logger.info(f"Processing query: {request.request[:100]}...")
-        result = await harness_agent.process_request(request.request)
+        if stream:
+            return await _stream_agent(
+                "query", request.request, use_cache, "interactive", session_id, store_cache=store_cache
+            )
+        async with admission_controller.admit("interactive"):
+            result = await harness_agent.process_request(
+                request.request, use_cache=use_cache, session_id=session_id, store_cache=store_cache
+            )
 
         return AgentResponse(
             success=True,
             output=result["output"],
             intermediate_steps=result.get("intermediate_steps"),
             tool_calls=result.get("tool_calls"),
-            error=None
+            error=None,
+            cached=result.get("cached", False),
+            fast_path=result.get("fast_path", False),
+            validation=result.get("validation"),
+            session_id=result.get("session_id"),
+            yaml=result.get("yaml"),
+            document=result.get("document"),
+            content_hash=result.get("content_hash"),
+            model_tier=result.get("model_tier")
         )
+    except (AdmissionRejected, AgentNotReady):
+        raise
+    except PromptTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing query: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _require_sessions():
+    if not session_store.enabled:
+        raise HTTPException(status_code=404, detail="Sessions are disabled (SESSION_ENABLED=false)")
+
+
+@app.post("/api/v1/sessions", status_code=201, tags=["Sessions"])
+async def create_session():
+    """
+    Start a conversation session.
+
+    Pass the returned id as ``session_id`` (or the ``X-Session-ID`` header)
+    on generate and query requests; follow-up requests then see the earlier
+    turns as chat history, so "add a deploy stage" edits the last pipeline.
+    Any client-chosen id matching the allowed pattern works as well.
+
+    Returns:
+        Dictionary with the new session_id
+    """
+    _require_sessions()
+    return {"session_id": uuid.uuid4().hex}
+
+
+@app.get("/api/v1/sessions/{session_id}", response_model=SessionResponse, tags=["Sessions"])
+async def get_session(session_id: str = Path(..., pattern=SESSION_ID_PATTERN)):
+    """
+    Show a session's summary and the turns sent as chat history.
+
+    Returns:
+        SessionResponse, or 404 if the session does not exist or expired
+    """
+    _require_sessions()
+    session = await session_store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Session '{session_id}' not found")
+    return SessionResponse(
+        session_id=session_id,
+        summary=session.get("summary", ""),
+        turns=session["turns"],
+        total_turns=session.get("total_turns", len(session["turns"])),
+        created_at=session.get("created_at"),
+        updated_at=session.get("updated_at"),
+    )
+
+
+@app.delete("/api/v1/sessions/{session_id}", status_code=204, tags=["Sessions"])
+async def delete_session(session_id: str = Path(..., pattern=SESSION_ID_PATTERN)):
+    """End a session and drop its history."""
+    _require_sessions()
+    if not await session_store.delete(session_id):
+        raise HTTPException(status_code=404, detail=f"Session '{session_id}' not found")
+
+
+@app.post("/api/v1/generate/batch", tags=["Batch"])
+async def generate_batch(
+    request: BatchRequest,
+    cache_control: Optional[str] = CACHE_CONTROL_HEADER
+):
+    """
+    Generate many pipelines and connectors in one call.
+
+    Items run concurrently on a bounded number of workers, each admitted
+    with the ``batch`` priority class so interactive traffic is served
+    first. Items share the MCP tool result cache, so e.g. connector
+    listings are fetched once for the whole batch. Results are streamed
+    as NDJSON, one line per item in completion order, followed by a
+    summary line. A failed item is reported in its line and does not
+    abort the batch.
+
+    Args:
+        request: BatchRequest with the items to generate
+
+    Returns:
+        application/x-ndjson stream of per-item results and a summary
+    """
+    if len(request.items) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch has {len(request.items)} items; the limit is {settings.batch_max_items}"
+        )
+
+    workers = min(request.max_concurrency or settings.batch_max_concurrency, settings.batch_max_concurrency)
+    use_cache, store_cache = _cache_flags(cache_control)
+    logger.info(f"Processing batch of {len(request.items)} items with {workers} workers...")
+
+    async def run_item(index: int, item: BatchItem, semaphore: asyncio.Semaphore) -> dict:
+        async with semaphore:
+            start = time.perf_counter()
+            line = {"index": index, "id": item.id, "type": item.type}
+            try:
+                async with admission_controller.admit("batch"):
+                    if item.type == "pipeline":
+                        result = await harness_agent.generate_pipeline(
+                            item.request, use_cache=use_cache, store_cache=store_cache
+                        )
+                    else:
+                        result = await harness_agent.generate_connector(
+                            item.request, use_cache=use_cache, store_cache=store_cache
+                        )
+                line.update({
+                    "success": True,
+                    "output": result["output"],
+                    "tool_calls": result.get("tool_calls"),
+                    "cached": result.get("cached", False),
+                    "fast_path": result.get("fast_path", False),
+                    "error": None,
+                })
+            except (AdmissionRejected, AgentNotReady) as e:
+                line.update({"success": False, "output": None, "error": e.detail, "status_code": e.status_code})
+            except Exception as e:
+                logger.error(f"Error generating batch item {index}: {e}")
+                line.update({"success": False, "output": None, "error": str(e)})
+            line["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            return line
+
+    async def ndjson_lines():
+        semaphore = asyncio.Semaphore(workers)
+        start = time.perf_counter()
+        tasks = [asyncio.create_task(run_item(i, item, semaphore)) for i, item in enumerate(request.items)]
+        succeeded = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                line = await next_done
+                succeeded += 1 if line["success"] else 0
+                yield json.dumps(line, default=str) + "\n"
+            yield json.dumps({
+                "summary": {
+                    "total": len(tasks),
+                    "succeeded": succeeded,
+                    "failed": len(tasks) - succeeded,
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                }
+            }) + "\n"
+        finally:
+            # Client went away: stop the remaining items
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
 @app.get("/api/v1/debug/tools", tags=["Debug"])
 async def list_available_tools():
     """
@@ -215,11 +670,236 @@ async def list_available_tools():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/v1/debug/mcp-pool", tags=["Debug"])
+async def mcp_pool_metrics():
+    """
+    Report MCP session pool utilization.
+
+    Use in-flight calls, queue depth and checkout wait times to size
+    MCP_POOL_SIZE and MCP_MAX_CONCURRENCY_PER_SESSION against real traffic.
+
+    Returns:
+        Dictionary with pool-level and per-session metrics
+    """
+    return mcp_client.get_pool_metrics()
+
+
+@app.get("/api/v1/debug/tool-catalog", tags=["Debug"])
+async def tool_catalog_metrics():
+    """
+    Report the MCP tool catalog snapshot.
+
+    Returns:
+        Dictionary with the active catalog hash and whether it came from
+        the snapshot or the server, plus snapshot load/save and function
+        schema reuse counts
+    """
+    return {
+        "catalog_hash": mcp_client.catalog_hash,
+        "source": mcp_client.catalog_source,
+        **tool_catalog.get_metrics(),
+    }
+
+
+@app.get("/api/v1/debug/tool-routing", tags=["Debug"])
+async def tool_routing_metrics():
+    """
+    Report tool routing decisions and schema token savings.
+
+    Returns:
+        Dictionary with routed/fallback counts, the average number of tools
+        offered and the estimated function-schema prompt tokens saved
+    """
+    return {
+        **tool_router.get_metrics(),
+        "subset_executors": len(harness_agent._subset_executors),
+    }
+
+
+@app.get("/api/v1/debug/model-routing", tags=["Debug"])
+async def model_routing_metrics():
+    """
+    Report model tier routing, escalations and per-tier latency and cost.
+
+    Returns:
+        Dictionary with each tier's model, limits, routed requests by
+        endpoint, run outcomes, p50/p95 run and LLM call latency, tokens
+        and estimated cost, plus escalation counts
+    """
+    return model_router.get_metrics()
+
+
+@app.get("/api/v1/debug/llm-http", tags=["Debug"])
+async def llm_http_metrics():
+    """
+    Report the shared HTTP client pools of the LLM backends.
+
+    Returns:
+        Dictionary with the pool limits, timeouts and retry budget, and per
+        backend the requests, retries, statuses, HTTP versions, open and
+        idle connections, connections opened, TLS handshakes and latency
+    """
+    return llm_clients.get_metrics()
+
+
+@app.get("/api/v1/debug/prompt-cache", tags=["Debug"])
+async def prompt_cache_metrics():
+    """
+    Report provider prompt caching of the stable tool/system prompt prefix.
+
+    Returns:
+        Dictionary with cached vs. uncached prompt tokens, the estimated
+        tokens saved and the fingerprint and size of each prefix in use
+    """
+    return prompt_prefix.get_metrics()
+
+
+@app.get("/api/v1/debug/sessions", tags=["Debug"])
+async def session_metrics():
+    """
+    Report conversation session statistics.
+
+    Returns:
+        Dictionary with active sessions, turns, follow-ups, compacted turns
+        and the average chat history tokens sent per follow-up
+    """
+    return await session_store.get_metrics()
+
+
+@app.get("/api/v1/debug/tool-output", tags=["Debug"])
+async def tool_output_metrics():
+    """
+    Report how MCP tool results were fitted into the LLM output budget.
+
+    Returns:
+        Dictionary with shaped/projected/truncated counts, bytes before and
+        after, offloaded parses and per-tool totals
+    """
+    return tool_output.get_metrics()
+
+
+@app.get("/api/v1/debug/schema-validation", tags=["Debug"])
+async def schema_validation_metrics():
+    """
+    Report YAML schema validation of generated pipelines and connectors.
+
+    Returns:
+        Dictionary with the loaded schemas, compile time, valid/invalid
+        counts, average validation time and repair outcomes
+    """
+    return schema_validator.get_metrics()
+
+
+@app.get("/api/v1/debug/yaml", tags=["Debug"])
+async def yaml_codec_metrics():
+    """
+    Report YAML parse and dump activity.
+
+    Returns:
+        Dictionary with whether libyaml is in use, load/dump counts and
+        average times, and how many documents were offloaded to a thread
+    """
+    return yaml_codec.get_metrics()
+
+
+@app.get("/api/v1/debug/tool-cache", tags=["Debug"])
+async def tool_cache_metrics():
+    """
+    Report MCP tool result cache statistics.
+
+    Returns:
+        Dictionary with hit/miss/coalesced counts, size and evictions
+    """
+    return tool_cache.get_metrics()
+
+
+@app.get("/api/v1/debug/response-cache", tags=["Debug"])
+async def response_cache_metrics():
+    """
+    Report agent response cache statistics.
+
+    Returns:
+        Dictionary with backend, hit/miss/bypass counters and errors
+    """
+    return response_cache.get_metrics()
+
+
+@app.get("/api/v1/debug/semantic-cache", tags=["Debug"])
+async def semantic_cache_metrics():
+    """
+    Report semantic cache statistics.
+
+    ``hit_rate_by_threshold`` shows the hit rate each similarity threshold
+    would have produced for the lookups so far, to help tune
+    SEMANTIC_CACHE_THRESHOLD between precision and hit rate.
+
+    Returns:
+        Dictionary with hit/miss counters, index size and threshold sweep
+    """
+    return semantic_cache.get_metrics()
+
+
+@app.get("/api/v1/debug/fast-path", tags=["Debug"])
+async def fast_path_metrics():
+    """
+    Report template fast path usage.
+
+    Returns:
+        Dictionary with hits and fall-throughs per endpoint and LLM calls saved
+    """
+    return fast_path.get_metrics()
+
+
+@app.get("/api/v1/debug/coalescing", tags=["Debug"])
+async def coalescing_metrics():
+    """
+    Report in-flight request coalescing.
+
+    Returns:
+        Dictionary with execution/coalesced counters and per-key waiter counts
+    """
+    return harness_agent.get_coalescing_metrics()
+
+
+@app.get("/api/v1/debug/admission", tags=["Debug"])
+async def admission_metrics():
+    """
+    Report admission control state.
+
+    Returns:
+        Dictionary with active requests, queue depth, per-priority-class
+        wait times and rejection counts
+    """
+    return admission_controller.get_metrics()
+
+
+@app.get("/api/v1/debug/startup", tags=["Debug"])
+async def startup_status():
+    """
+    Report agent initialization progress.
+
+    Returns:
+        Dictionary with the initialization status, attempt count, last
+        error and a per-phase breakdown of the last successful startup
+    """
+    return harness_agent.get_startup_status()
+
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(
-        "main:app",
-        host=settings.api_host,
-        port=settings.api_port,
-        reload=True
-    )
+    if settings.api_workers > 1:
+        # Each worker process gets its own agent and MCP session pool
+        uvicorn.run(
+            "main:app",
+            host=settings.api_host,
+            port=settings.api_port,
+            workers=settings.api_workers,
+            timeout_graceful_shutdown=int(settings.api_graceful_shutdown_timeout)
+        )
+    else:
+        uvicorn.run(
+            "main:app",
+            host=settings.api_host,
+            port=settings.api_port,
+            reload=True
+        )
@@ -1,32 +1,159 @@
 import asyncio
 import json
 import logging
-from typing import Any, Dict, List, Optional
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
+import mcp.types as types
+from tool_catalog import catalog_hash, tool_catalog, tool_to_dict
 from config import settings
 
 logger = logging.getLogger(__name__)
 
 
+class MCPConnection:
+    """
+    A single Harness MCP server subprocess and its client session.
+
+    The stdio transport and session are entered and exited inside one
+    long-lived task, so a connection can be started and stopped from any
+    task (startup, background respawn, shutdown) without tripping anyio's
+    cancel scope checks.
+    """
+
+    def __init__(self, index: int, server_params: StdioServerParameters):
+        self.index = index
+        self.server_params = server_params
+        self.session: Optional[ClientSession] = None
+        self.healthy = False
+        self.in_flight = 0
+        self.total_calls = 0
+        self.total_failures = 0
+        self.consecutive_failures = 0
+        self.started_at: Optional[float] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._error: Optional[BaseException] = None
+
+    async def start(self):
+        """Spawn the MCP server and wait until its session is initialized."""
+        logger.info(f"[mcp-{self.index}] Starting MCP server subprocess...")
+        self._runner = asyncio.create_task(self._run())
+        await self._ready.wait()
+        if self._error:
+            raise self._error
+        self.started_at = time.time()
+        logger.info(f"[mcp-{self.index}] Session ready")
+        return self
+
+    async def _run(self):
+        try:
+            async with stdio_client(self.server_params) as (read_stream, write_stream):
+                async with ClientSession(read_stream, write_stream) as session:
+                    try:
+                        await asyncio.wait_for(session.initialize(), timeout=30.0)
+                    except asyncio.TimeoutError:
+                        logger.error(f"[mcp-{self.index}] Session initialization timed out after 30 seconds")
+                        raise RuntimeError("MCP server session initialization timed out. The server may not be responding correctly.")
+
+                    self.session = session
+                    self.healthy = True
+                    self._ready.set()
+                    await self._stop.wait()
+        except Exception as e:
+            self._error = e
+            logger.error(f"[mcp-{self.index}] MCP session terminated: {e}")
+        finally:
+            self.session = None
+            self.healthy = False
+            self._ready.set()
+
+    async def stop(self):
+        """Close the session and terminate the subprocess."""
+        self.healthy = False
+        self._stop.set()
+        if self._runner:
+            try:
+                await asyncio.wait_for(self._runner, timeout=10.0)
+            except asyncio.TimeoutError:
+                logger.warning(f"[mcp-{self.index}] Session did not close in time, cancelling")
+                self._runner.cancel()
+            except Exception as e:
+                logger.error(f"[mcp-{self.index}] Error closing session: {e}")
+            self._runner = None
+        logger.info(f"[mcp-{self.index}] Session closed")
+
+    async def ping(self, timeout: float = 5.0) -> bool:
+        """Return True if the server answers a ping within the timeout."""
+        if not self.session:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout=timeout)
+            return True
+        except Exception as e:
+            logger.warning(f"[mcp-{self.index}] Ping failed: {e}")
+            return False
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "index": self.index,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "total_calls": self.total_calls,
+            "total_failures": self.total_failures,
+            "consecutive_failures": self.consecutive_failures,
+            "uptime_seconds": round(time.time() - self.started_at, 1) if self.started_at else None,
+        }
+
+
 class HarnessMCPClient:
-    """Client for interacting with Harness.io MCP server."""
+    """
+    Client for interacting with Harness.io MCP server.
+
+    Tool calls are routed over a pool of ``MCP_POOL_SIZE`` server
+    subprocesses. Each call checks out the least-busy healthy session,
+    waiting in a queue when every session is at
+    ``MCP_MAX_CONCURRENCY_PER_SESSION``. Sessions that fail repeatedly or
+    stop answering pings are evicted and respawned in the background.
+    """
 
     def __init__(self):
-        self.session: Optional[ClientSession] = None
         self.tools: Dict[str, Any] = {}
-        self._stdio_context = None
-        self._session_context = None
+        self.connections: List[MCPConnection] = []
+        self._server_params: Optional[StdioServerParameters] = None
+        self._condition: Optional[asyncio.Condition] = None
+        self._health_task: Optional[asyncio.Task] = None
+        self._respawn_tasks: Dict[int, asyncio.Task] = {}
+        self.startup_timings: Dict[str, float] = {}
 
-    async def connect(self):
-        """Connect to the Harness MCP server."""
-        logger.info("Starting MCP client connection...")
-        
-        if not settings.mcp_server_path:
-            raise ValueError("MCP_SERVER_PATH not configured")
-        
-        logger.info(f"MCP server path: {settings.mcp_server_path}")
+        # Tool catalog: hash of the current tool set and where it came from
+        self.catalog_hash: Optional[str] = None
+        self.catalog_source: Optional[str] = None  # snapshot | server
+        self._catalog_listeners: List[Callable[[], Awaitable[None]]] = []
+        self._revalidate_task: Optional[asyncio.Task] = None
+
+        # Pool metrics
+        self._queue_depth = 0
+        self._max_queue_depth = 0
+        self._checkouts = 0
+        self._wait_total_ms = 0.0
+        self._wait_max_ms = 0.0
+        self._acquire_timeouts = 0
+        self._evictions = 0
+        self._respawns = 0
 
+    @property
+    def session(self) -> Optional[ClientSession]:
+        """Session of the first healthy pooled connection, if any."""
+        for conn in self.connections:
+            if conn.healthy:
+                return conn.session
+        return None
+
+    def _build_server_params(self) -> StdioServerParameters:
         # Prepare environment variables for MCP server
         mcp_env = {
             "HARNESS_ACCOUNT_ID": settings.harness_account_id,
@@ -38,80 +165,268 @@ class HarnessMCPClient:
         logger.info(f"MCP environment: HARNESS_ACCOUNT_ID={settings.harness_account_id}, HARNESS_API_URL={settings.harness_api_url}")
 
         # The Harness MCP server requires the 'stdio' subcommand
-        server_params = StdioServerParameters(
+        return StdioServerParameters(
             command=settings.mcp_server_path,
             args=["stdio"],  # Add stdio subcommand
             env=mcp_env
         )
 
-        logger.info("Creating stdio client...")
-        # Initialize the stdio client connection using context manager properly
-        self._stdio_context = stdio_client(server_params)
-        
-        logger.info("Entering stdio context...")
-        stdio, write = await self._stdio_context.__aenter__()
-        
-        logger.info("Creating client session...")
-        # Create and initialize session
-        self.session = ClientSession(stdio, write)
-        self._session_context = self.session
-        
-        logger.info("Entering session context...")
-        await self._session_context.__aenter__()
-
-        logger.info("Initializing session...")
-        # Initialize the connection with timeout
-        try:
-            await asyncio.wait_for(self.session.initialize(), timeout=30.0)
-        except asyncio.TimeoutError:
-            logger.error("Session initialization timed out after 30 seconds")
-            raise RuntimeError("MCP server session initialization timed out. The server may not be responding correctly.")
+    async def connect(self):
+        """Connect to the Harness MCP server."""
+        logger.info("Starting MCP client connection...")
+
+        if not settings.mcp_server_path:
+            raise ValueError("MCP_SERVER_PATH not configured")
+
+        logger.info(f"MCP server path: {settings.mcp_server_path}")
+
+        self._server_params = self._build_server_params()
+        self._condition = asyncio.Condition()
 
-        logger.info("Listing available tools...")
-        # List available tools
+        pool_size = max(1, settings.mcp_pool_size)
+        logger.info(f"Starting MCP session pool with {pool_size} session(s)...")
+        self.connections = [MCPConnection(i, self._server_params) for i in range(pool_size)]
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(conn.start() for conn in self.connections),
+            return_exceptions=True
+        )
+
+        errors = [r for r in results if isinstance(r, BaseException)]
+        healthy = [conn for conn in self.connections if conn.healthy]
+        if not healthy:
+            raise errors[0] if errors else RuntimeError("No MCP session could be started")
+        if errors:
+            logger.warning(f"{len(errors)} of {pool_size} MCP session(s) failed to start; they will be respawned")
+
+        self.startup_timings["spawn_ms"] = (time.perf_counter() - started) * 1000
+
+        snapshot = tool_catalog.load()
+        if snapshot is not None:
+            # Serve from the snapshot now and check it against the server in the background
+            self.tools = {t["name"]: types.Tool(**t) for t in snapshot["tools"]}
+            self.catalog_hash = snapshot["hash"]
+            self.catalog_source = "snapshot"
+            self.startup_timings["list_tools_ms"] = 0.0
+            logger.info(f"Loaded {len(self.tools)} tools from catalog snapshot {self.catalog_hash}")
+            self._revalidate_task = asyncio.create_task(self._revalidate_catalog())
+        else:
+            logger.info("Listing available tools...")
+            started = time.perf_counter()
+            tools = await self._list_tools(healthy[0].session)
+            self.startup_timings["list_tools_ms"] = (time.perf_counter() - started) * 1000
+            self.tools = {tool.name: tool for tool in tools}
+            self.catalog_hash = tool_catalog.save([tool_to_dict(t) for t in tools])
+            self.catalog_source = "server"
+
+        logger.info(f"Connected to MCP server. Available tools: {list(self.tools.keys())}")
+
+        self._health_task = asyncio.create_task(self._health_loop())
+
+        return self
+
+    async def _list_tools(self, session: ClientSession) -> List[types.Tool]:
         try:
-            response = await asyncio.wait_for(self.session.list_tools(), timeout=10.0)
-            self.tools = {tool.name: tool for tool in response.tools}
+            response = await asyncio.wait_for(session.list_tools(), timeout=10.0)
         except asyncio.TimeoutError:
             logger.error("Listing tools timed out after 10 seconds")
             raise RuntimeError("MCP server list_tools timed out. The server may not be responding correctly.")
-        
-        logger.info(f"Connected to MCP server. Available tools: {list(self.tools.keys())}")
+        return list(response.tools)
 
-        return self
+    def add_catalog_listener(self, listener: Callable[[], Awaitable[None]]):
+        """Register a coroutine to run after the tool catalog changes."""
+        self._catalog_listeners.append(listener)
+
+    async def _revalidate_catalog(self):
+        """Compare the snapshot catalog with the server's and reload tools if it changed."""
+        try:
+            async with self.checkout() as conn:
+                tools = await self._list_tools(conn.session)
+        except Exception as e:
+            logger.warning(f"Tool catalog revalidation failed, keeping snapshot: {e}")
+            return
+
+        digest = catalog_hash([tool_to_dict(t) for t in tools])
+        if digest == self.catalog_hash:
+            self.catalog_source = "server"
+            logger.info(f"Tool catalog snapshot {digest} matches the MCP server")
+            return
+
+        logger.info(f"Tool catalog changed ({self.catalog_hash} -> {digest}); reloading {len(tools)} tools")
+        self.tools = {tool.name: tool for tool in tools}
+        self.catalog_hash = tool_catalog.save([tool_to_dict(t) for t in tools])
+        self.catalog_source = "server"
+        for listener in self._catalog_listeners:
+            try:
+                await listener()
+            except Exception as e:
+                logger.error(f"Tool catalog listener failed: {e}", exc_info=True)
 
     async def disconnect(self):
         """Disconnect from the MCP server."""
         logger.info("Disconnecting from MCP server...")
-        try:
-            if self._session_context:
-                await self._session_context.__aexit__(None, None, None)
-                self._session_context = None
-                logger.info("Session closed")
-        except Exception as e:
-            logger.error(f"Error closing session: {e}")
-        
-        try:
-            if self._stdio_context:
-                await self._stdio_context.__aexit__(None, None, None)
-                self._stdio_context = None
-                logger.info("Stdio closed")
-        except Exception as e:
-            logger.error(f"Error closing stdio: {e}")
-        
-        self.session = None
+        if self._health_task:
+            self._health_task.cancel()
+            self._health_task = None
+        if self._revalidate_task:
+            self._revalidate_task.cancel()
+            self._revalidate_task = None
+
+        for task in list(self._respawn_tasks.values()):
+            task.cancel()
+        self._respawn_tasks.clear()
+
+        await asyncio.gather(
+            *(conn.stop() for conn in self.connections),
+            return_exceptions=True
+        )
+        self.connections = []
         logger.info("MCP client disconnected")
 
+    def _pick_connection(self) -> Optional[MCPConnection]:
+        """Least-busy healthy connection with spare capacity, or None."""
+        cap = max(1, settings.mcp_max_concurrency_per_session)
+        candidates = [c for c in self.connections if c.healthy and c.in_flight < cap]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda c: (c.in_flight, c.total_calls))
+
+    @asynccontextmanager
+    async def checkout(self) -> AsyncIterator[MCPConnection]:
+        """Check out a pooled connection for the duration of one call."""
+        if self._condition is None:
+            raise RuntimeError("Not connected to MCP server")
+
+        start = time.perf_counter()
+        async with self._condition:
+            conn = self._pick_connection()
+            if conn is None:
+                self._queue_depth += 1
+                self._max_queue_depth = max(self._max_queue_depth, self._queue_depth)
+                try:
+                    conn = await asyncio.wait_for(
+                        self._condition.wait_for(self._pick_connection),
+                        timeout=settings.mcp_pool_acquire_timeout
+                    )
+                except asyncio.TimeoutError:
+                    self._acquire_timeouts += 1
+                    raise RuntimeError(
+                        f"No MCP session available after {settings.mcp_pool_acquire_timeout}s "
+                        f"(pool size {len(self.connections)})"
+                    )
+                finally:
+                    self._queue_depth -= 1
+            conn.in_flight += 1
+
+        wait_ms = (time.perf_counter() - start) * 1000
+        self._checkouts += 1
+        self._wait_total_ms += wait_ms
+        self._wait_max_ms = max(self._wait_max_ms, wait_ms)
+
+        try:
+            yield conn
+        finally:
+            async with self._condition:
+                conn.in_flight -= 1
+                self._condition.notify_all()
+
     async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
         """Call a tool on the MCP server."""
-        if not self.session:
+        if not self.connections:
             raise RuntimeError("Not connected to MCP server")
 
         if tool_name not in self.tools:
             raise ValueError(f"Tool '{tool_name}' not found. Available tools: {list(self.tools.keys())}")
 
-        result = await self.session.call_tool(tool_name, arguments)
-        return result
+        async with self.checkout() as conn:
+            conn.total_calls += 1
+            try:
+                result = await conn.session.call_tool(tool_name, arguments)
+            except Exception:
+                conn.total_failures += 1
+                conn.consecutive_failures += 1
+                if conn.consecutive_failures >= settings.mcp_max_consecutive_failures:
+                    logger.warning(
+                        f"[mcp-{conn.index}] {conn.consecutive_failures} consecutive failures, evicting session"
+                    )
+                    self._evict(conn)
+                raise
+            conn.consecutive_failures = 0
+            return result
+
+    def _evict(self, conn: MCPConnection):
+        """Take a connection out of rotation and respawn it in the background."""
+        if conn.index in self._respawn_tasks:
+            return
+        conn.healthy = False
+        self._evictions += 1
+        self._respawn_tasks[conn.index] = asyncio.create_task(self._respawn(conn))
+
+    async def _respawn(self, old: MCPConnection):
+        try:
+            # Out of rotation already; let calls still running on it finish before closing it
+            if old.in_flight:
+                try:
+                    async with self._condition:
+                        await asyncio.wait_for(
+                            self._condition.wait_for(lambda: old.in_flight == 0),
+                            timeout=settings.mcp_pool_acquire_timeout
+                        )
+                except asyncio.TimeoutError:
+                    logger.warning(
+                        f"[mcp-{old.index}] {old.in_flight} call(s) still running after "
+                        f"{settings.mcp_pool_acquire_timeout}s, closing session anyway"
+                    )
+            await old.stop()
+            delay = 1.0
+            while True:
+                conn = MCPConnection(old.index, self._server_params)
+                try:
+                    await conn.start()
+                    break
+                except Exception as e:
+                    logger.error(f"[mcp-{old.index}] Respawn failed: {e}; retrying in {delay:.0f}s")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 30.0)
+
+            self.connections[self.connections.index(old)] = conn
+            self._respawns += 1
+            logger.info(f"[mcp-{conn.index}] Session respawned")
+            async with self._condition:
+                self._condition.notify_all()
+        finally:
+            self._respawn_tasks.pop(old.index, None)
+
+    async def _health_loop(self):
+        """Periodically ping idle sessions and evict dead ones."""
+        while True:
+            await asyncio.sleep(settings.mcp_health_check_interval)
+            for conn in list(self.connections):
+                if conn.index in self._respawn_tasks:
+                    continue
+                if not conn.healthy:
+                    self._evict(conn)
+                elif conn.in_flight == 0 and not await conn.ping():
+                    logger.warning(f"[mcp-{conn.index}] Health check failed, evicting session")
+                    self._evict(conn)
+
+    def get_pool_metrics(self) -> Dict[str, Any]:
+        """Pool utilization metrics for sizing ``MCP_POOL_SIZE``."""
+        return {
+            "pool_size": len(self.connections),
+            "healthy_sessions": sum(1 for c in self.connections if c.healthy),
+            "max_concurrency_per_session": settings.mcp_max_concurrency_per_session,
+            "in_flight": sum(c.in_flight for c in self.connections),
+            "queue_depth": self._queue_depth,
+            "max_queue_depth": self._max_queue_depth,
+            "checkouts": self._checkouts,
+            "avg_wait_ms": round(self._wait_total_ms / self._checkouts, 3) if self._checkouts else 0.0,
+            "max_wait_ms": round(self._wait_max_ms, 3),
+            "acquire_timeouts": self._acquire_timeouts,
+            "evictions": self._evictions,
+            "respawns": self._respawns,
+            "sessions": [c.metrics() for c in self.connections],
+        }
 
     def get_available_tools(self) -> List[str]:
         """Get list of available tools."""
@@ -0,0 +1,267 @@
+import hashlib
+import json
+import logging
+import re
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Deque, Dict, List, Optional
+from instrumentation import instrumentation
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Request features that call for the stronger model, each adding 0.1 to the score
+COMPLEX_TERMS = (
+    "canary", "blue green", "blue-green", "rolling", "matrix", "parallel", "approval", "rollback",
+    "terraform", "helm", "strategy", "conditional", "failure", "multiple", "multi", "environments",
+    "loop", "looping", "security", "compliance", "template", "migrate", "convert",
+)
+COMPLEX_PATTERN = re.compile(r"\b(" + "|".join(re.escape(term) for term in COMPLEX_TERMS) + r")\b")
+
+# Score added per word of the request, and its cap
+WORD_WEIGHT = 1 / 200
+MAX_LENGTH_SCORE = 0.3
+MAX_TERMS_SCORE = 0.4
+FOLLOW_UP_SCORE = 0.2
+
+# Latency samples kept per tier for percentiles
+LATENCY_WINDOW = 1024
+
+
+class PromptTooLarge(ValueError):
+    """Raised when a prompt does not fit the context window of any model tier."""
+
+
+@dataclass
+class ModelTier:
+    """One model the agent can run on, with its endpoint, limits and price."""
+    name: str
+    model: str
+    base_url: Optional[str] = None
+    api_key: Optional[str] = None
+    context_tokens: Optional[int] = None
+    max_tokens: Optional[int] = None
+    max_tools: Optional[int] = None
+    prompt_cost_per_1k: float = 0.0
+    completion_cost_per_1k: float = 0.0
+
+    def cost(self, prompt_tokens: int, completion_tokens: int, cached_prompt_tokens: int = 0) -> float:
+        """Estimated price in USD, with cached prompt tokens at the provider discount."""
+        prompt = prompt_tokens - cached_prompt_tokens * settings.prompt_cache_discount
+        return (prompt * self.prompt_cost_per_1k + completion_tokens * self.completion_cost_per_1k) / 1000
+
+
+def _percentile(samples: Deque[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class _TierStats:
+    def __init__(self):
+        self.runs = 0
+        self.outcomes: Dict[str, int] = {"ok": 0, "escalated": 0, "error": 0}
+        self.run_ms: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.llm_calls = 0
+        self.llm_ms: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+
+
+class ModelRouter:
+    """
+    Picks the model tier that serves each request.
+
+    Tiers are ordered cheapest first. A request goes to the first tier
+    that can hold its prompt (``context_tokens``), the tools it is offered
+    (``max_tools``) and its complexity score (``MODEL_ROUTING_MAX_COMPLEXITY``,
+    no entry = any score). The score starts at the endpoint's base
+    complexity and adds the request length, features like canary or
+    approval stages, and whether it is a follow-up. If nothing fits, the
+    tier with the largest context that holds the prompt is used, and a
+    prompt no tier can hold raises ``PromptTooLarge``. After an error or
+    invalid YAML the caller can escalate to the next tier.
+    """
+
+    def __init__(self, enabled: bool, tiers: Dict[str, Dict[str, Any]], default_tier: str,
+                 max_complexity: Dict[str, float], endpoint_complexity: Dict[str, float], escalate: bool):
+        self.enabled = enabled
+        self.tiers: Dict[str, ModelTier] = {}
+        for name, spec in tiers.items():
+            spec = {**spec, "model": spec.get("model") or settings.openai_model}
+            self.tiers[name] = ModelTier(name=name, **spec)
+        if default_tier not in self.tiers:
+            self.tiers[default_tier] = ModelTier(name=default_tier, model=settings.openai_model)
+        self.default_tier = default_tier
+        self.max_complexity = max_complexity
+        self.endpoint_complexity = endpoint_complexity
+        self.escalate = escalate
+
+        self.model_key = self._model_key()
+
+        self.routed: Dict[str, Dict[str, int]] = {}
+        self.escalations: Dict[str, int] = {}
+        self._stats: Dict[str, _TierStats] = {name: _TierStats() for name in self.tiers}
+
+    def _model_key(self) -> str:
+        """
+        Identifies the models that can answer a request, for response cache keys.
+
+        The default tier's model when routing is off; otherwise a hash of the
+        tiers (without keys and prices) and the routing policy, so changing
+        a tier's model or which requests reach it invalidates cached answers.
+        """
+        if not self.enabled:
+            return self.tiers[self.default_tier].model
+        policy = {
+            "tiers": [
+                {k: v for k, v in asdict(tier).items() if k not in ("api_key", "prompt_cost_per_1k",
+                                                                    "completion_cost_per_1k")}
+                for tier in self.tiers.values()
+            ],
+            "default_tier": self.default_tier,
+            "max_complexity": self.max_complexity,
+            "endpoint_complexity": self.endpoint_complexity,
+            "escalate": self.escalate,
+        }
+        digest = hashlib.sha256(json.dumps(policy, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+        return f"tiers:{digest}"
+
+    @property
+    def active_tiers(self) -> List[str]:
+        """Tiers that need a model: all of them, or only the default when routing is off."""
+        return list(self.tiers) if self.enabled else [self.default_tier]
+
+    def complexity(self, kind: str, user_request: str, follow_up: bool = False) -> float:
+        """Heuristic difficulty of a request, from 0 (a lookup) upwards."""
+        score = self.endpoint_complexity.get(kind, 0.3)
+        score += min(MAX_LENGTH_SCORE, len(user_request.split()) * WORD_WEIGHT)
+        terms = set(COMPLEX_PATTERN.findall(user_request.lower()))
+        score += min(MAX_TERMS_SCORE, 0.1 * len(terms))
+        if follow_up:
+            score += FOLLOW_UP_SCORE
+        return round(score, 3)
+
+    def route(self, kind: str, user_request: str, follow_up: bool = False,
+              prompt_tokens: int = 0, tools: int = 0) -> str:
+        """Name of the tier to run a request on."""
+        if not self.enabled:
+            return self.default_tier
+        score = self.complexity(kind, user_request, follow_up)
+        for name, spec in self.tiers.items():
+            if spec.context_tokens and prompt_tokens > spec.context_tokens:
+                continue
+            if spec.max_tools and tools > spec.max_tools:
+                continue
+            if score > self.max_complexity.get(name, float("inf")):
+                continue
+            tier, reason = name, "fit"
+            break
+        else:
+            tier, reason = self._largest_context(prompt_tokens), "no_fit"
+        counts = self.routed.setdefault(tier, {})
+        counts[kind] = counts.get(kind, 0) + 1
+        logger.debug(f"Routed {kind} request (complexity {score}, {prompt_tokens} tokens, {tools} tools) "
+                     f"to tier {tier} ({reason})")
+        return tier
+
+    def _largest_context(self, prompt_tokens: int) -> str:
+        """The tier with the most context (no limit counts as most) that can hold ``prompt_tokens``."""
+        fits = [name for name, spec in self.tiers.items()
+                if not spec.context_tokens or prompt_tokens <= spec.context_tokens]
+        if not fits:
+            largest = max(spec.context_tokens for spec in self.tiers.values())
+            raise PromptTooLarge(f"Prompt of about {prompt_tokens} tokens exceeds the largest model "
+                                 f"context window ({largest} tokens); shorten the request or history")
+        return max(fits, key=lambda name: self.tiers[name].context_tokens or float("inf"))
+
+    def for_tools(self, tier: str, tools: int) -> str:
+        """``tier``, or the first stronger tier that can be offered ``tools`` tools."""
+        names = self.active_tiers
+        for name in names[names.index(tier):]:
+            limit = self.tiers[name].max_tools
+            if not limit or tools <= limit:
+                return name
+        return names[-1]
+
+    def next_tier(self, tier: str) -> Optional[str]:
+        """The tier to escalate to from ``tier``, or None at the top or when escalation is off."""
+        names = self.active_tiers
+        if not self.escalate or tier not in names or names.index(tier) == len(names) - 1:
+            return None
+        return names[names.index(tier) + 1]
+
+    def record_escalation(self, from_tier: str, to_tier: str, reason: str):
+        key = f"{from_tier}->{to_tier}:{reason}"
+        self.escalations[key] = self.escalations.get(key, 0) + 1
+        instrumentation.observe_model_escalation(from_tier, to_tier, reason)
+
+    def record_run(self, tier: str, seconds: float, outcome: str):
+        """One agent run (all of its LLM and tool calls) on ``tier``; outcome ok | escalated | error."""
+        stats = self._stats[tier]
+        stats.runs += 1
+        stats.outcomes[outcome] = stats.outcomes.get(outcome, 0) + 1
+        stats.run_ms.append(seconds * 1000)
+
+    def observe(self, tier: str, seconds: float, prompt_tokens: int, completion_tokens: int,
+                cached_prompt_tokens: int = 0):
+        """One LLM call made on ``tier``."""
+        stats = self._stats[tier]
+        cost = self.tiers[tier].cost(prompt_tokens, completion_tokens, cached_prompt_tokens)
+        stats.llm_calls += 1
+        stats.llm_ms.append(seconds * 1000)
+        stats.prompt_tokens += prompt_tokens
+        stats.cached_prompt_tokens += cached_prompt_tokens
+        stats.completion_tokens += completion_tokens
+        stats.cost += cost
+        instrumentation.observe_llm_cost(tier, cost)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        tiers = {}
+        for name, spec in self.tiers.items():
+            stats = self._stats[name]
+            tiers[name] = {
+                "model": spec.model,
+                "base_url": spec.base_url,
+                "active": name in self.active_tiers,
+                "max_complexity": self.max_complexity.get(name),
+                "context_tokens": spec.context_tokens,
+                "max_tokens": spec.max_tokens,
+                "max_tools": spec.max_tools,
+                "routed": self.routed.get(name, {}),
+                "runs": stats.runs,
+                "outcomes": stats.outcomes,
+                "p50_run_ms": round(_percentile(stats.run_ms, 0.5), 1),
+                "p95_run_ms": round(_percentile(stats.run_ms, 0.95), 1),
+                "llm_calls": stats.llm_calls,
+                "p50_llm_ms": round(_percentile(stats.llm_ms, 0.5), 1),
+                "p95_llm_ms": round(_percentile(stats.llm_ms, 0.95), 1),
+                "prompt_tokens": stats.prompt_tokens,
+                "cached_prompt_tokens": stats.cached_prompt_tokens,
+                "completion_tokens": stats.completion_tokens,
+                "cost_usd": round(stats.cost, 6),
+                "cost_per_run_usd": round(stats.cost / stats.runs, 6) if stats.runs else 0.0,
+            }
+        return {
+            "enabled": self.enabled,
+            "default_tier": self.default_tier,
+            "escalation_enabled": self.escalate,
+            "model_key": self.model_key,
+            "escalations": self.escalations,
+            "total_cost_usd": round(sum(s.cost for s in self._stats.values()), 6),
+            "tiers": tiers,
+        }
+
+
+# Global model router instance
+model_router = ModelRouter(
+    enabled=settings.model_routing_enabled,
+    tiers=settings.model_tiers,
+    default_tier=settings.model_routing_default_tier,
+    max_complexity=settings.model_routing_max_complexity,
+    endpoint_complexity=settings.model_routing_endpoint_complexity,
+    escalate=settings.model_escalation_enabled,
+)
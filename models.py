@@ -1,10 +1,26 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, Field, model_validator
+from typing import Optional, List, Dict, Any, Literal
+
+SESSION_ID_PATTERN = r"^[A-Za-z0-9_.:-]{1,128}$"
+
+SESSION_ID_FIELD = Field(
+    default=None,
+    pattern=SESSION_ID_PATTERN,
+    description="Conversation to continue (or start); also accepted as the X-Session-ID header"
+)
+
+
+STRUCTURED_FIELD = Field(
+    default=False,
+    description="Also return the extracted YAML, its parsed document and a content hash"
+)
 
 
 class PipelineRequest(BaseModel):
     """Request model for pipeline generation."""
     request: str = Field(..., description="User request describing the pipeline to generate")
+    session_id: Optional[str] = SESSION_ID_FIELD
+    structured: bool = STRUCTURED_FIELD
 
     class Config:
         json_schema_extra = {
@@ -17,6 +33,8 @@ class PipelineRequest(BaseModel):
 class ConnectorRequest(BaseModel):
     """Request model for connector generation."""
     request: str = Field(..., description="User request describing the connector to generate")
+    session_id: Optional[str] = SESSION_ID_FIELD
+    structured: bool = STRUCTURED_FIELD
 
     class Config:
         json_schema_extra = {
@@ -29,6 +47,7 @@ class ConnectorRequest(BaseModel):
 class GeneralRequest(BaseModel):
     """Request model for general agent queries."""
     request: str = Field(..., description="User request or question")
+    session_id: Optional[str] = SESSION_ID_FIELD
 
     class Config:
         json_schema_extra = {
@@ -38,6 +57,59 @@ class GeneralRequest(BaseModel):
         }
 
 
+class PipelineEditRequest(BaseModel):
+    """Request model for editing an existing pipeline."""
+    instruction: str = Field(..., description="Change to make, e.g. 'add a manual approval before Deploy'")
+    pipeline_yaml: Optional[str] = Field(default=None, description="Current pipeline YAML")
+    pipeline_identifier: Optional[str] = Field(
+        default=None,
+        description="Identifier of a pipeline to fetch from Harness instead of sending pipeline_yaml"
+    )
+    org_identifier: Optional[str] = Field(default=None, description="Organization of pipeline_identifier (default from settings)")
+    project_identifier: Optional[str] = Field(default=None, description="Project of pipeline_identifier (default from settings)")
+
+    @model_validator(mode="after")
+    def check_source(self):
+        if (self.pipeline_yaml is None) == (self.pipeline_identifier is None):
+            raise ValueError("Provide exactly one of pipeline_yaml or pipeline_identifier")
+        return self
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "instruction": "Add a stage that deploys to the staging environment after Build",
+                "pipeline_yaml": "pipeline:\n  name: payments\n  identifier: payments\n  stages:\n    - stage:\n        name: Build\n        identifier: Build\n        type: CI\n"
+            }
+        }
+
+
+class BatchItem(BaseModel):
+    """A single pipeline or connector request within a batch."""
+    type: Literal["pipeline", "connector"] = Field(..., description="What to generate")
+    request: str = Field(..., description="User request describing the pipeline or connector")
+    id: Optional[str] = Field(default=None, description="Client-supplied identifier echoed back in the result")
+
+
+class BatchRequest(BaseModel):
+    """Request model for batch generation."""
+    items: List[BatchItem] = Field(..., min_length=1, description="Pipeline and connector requests to generate")
+    max_concurrency: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Upper bound on items processed in parallel (capped by the server limit)"
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [
+                    {"id": "payments", "type": "pipeline", "request": "Python CI pipeline with build and test"},
+                    {"id": "payments-repo", "type": "connector", "request": "GitHub connector for https://github.com/myorg/payments"}
+                ]
+            }
+        }
+
+
 class ToolCall(BaseModel):
     """Model for a single tool call in the agent execution."""
     step: int = Field(..., description="Step number in the execution")
@@ -60,10 +132,26 @@ class AgentResponse(BaseModel):
         description="Structured information about tools called during execution"
     )
     error: Optional[str] = Field(default=None, description="Error message if request failed")
+    cached: bool = Field(default=False, description="Whether the response was served from the response cache")
+    fast_path: bool = Field(default=False, description="Whether the YAML was rendered from a template without calling the LLM")
+    validation: Optional[Dict[str, Any]] = Field(
+        default=None,
+        description="Schema validation of the generated YAML: valid, schema, errors (path, message, rule) and repair_attempts"
+    )
+    session_id: Optional[str] = Field(default=None, description="Conversation this response was recorded in")
+    yaml: Optional[str] = Field(default=None, description="Structured mode: the generated YAML, normalized")
+    document: Optional[Dict[str, Any]] = Field(default=None, description="Structured mode: the YAML parsed")
+    content_hash: Optional[str] = Field(
+        default=None,
+        description="Structured mode: sha256 of the document with sorted keys, for dedup and caching"
+    )
+    model_tier: Optional[str] = Field(default=None, description="Model tier that produced the output (after any escalation)")
 
     class Config:
         # Allow arbitrary types for intermediate_steps (to handle tuples from LangChain)
         arbitrary_types_allowed = True
+        # model_tier is a response field, not a pydantic internal
+        protected_namespaces = ()
         json_schema_extra = {
             "example": {
                 "success": True,
@@ -78,13 +166,54 @@ class AgentResponse(BaseModel):
                         "log": None
                     }
                 ],
-                "error": None
+                "error": None,
+                "cached": False,
+                "fast_path": False
             }
         }
 
 
+class PipelineEditResponse(BaseModel):
+    """Response model for pipeline edits."""
+    success: bool = Field(..., description="Whether the edit was applied")
+    output: str = Field(..., description="The updated pipeline YAML")
+    patch: List[Dict[str, Any]] = Field(..., description="JSON Patch (RFC 6902) operations the model returned")
+    source: Literal["request", "mcp"] = Field(..., description="Whether the pipeline came from the request or from Harness")
+    attempts: int = Field(..., description="Model replies needed to get an applicable patch")
+    usage: Dict[str, int] = Field(default_factory=dict, description="Prompt and completion tokens used")
+    model_tier: Optional[str] = Field(default=None, description="Model tier that produced the patch")
+
+    class Config:
+        # model_tier is a response field, not a pydantic internal
+        protected_namespaces = ()
+
+
+class SessionTurn(BaseModel):
+    """One request and the agent's output within a session."""
+    kind: str = Field(..., description="Endpoint kind: pipeline, connector or query")
+    request: str = Field(..., description="User request")
+    output: str = Field(..., description="Agent output for the request")
+    at: float = Field(..., description="Unix time of the turn")
+
+
+class SessionResponse(BaseModel):
+    """A conversation session and the history the agent sees."""
+    session_id: str = Field(..., description="Session identifier")
+    summary: str = Field(default="", description="Summary of turns that no longer fit the history budget")
+    turns: List[SessionTurn] = Field(default_factory=list, description="Turns sent as chat history, oldest first")
+    total_turns: int = Field(default=0, description="Turns recorded since the session started, including summarized ones")
+    created_at: Optional[float] = Field(default=None, description="Unix time the session started")
+    updated_at: Optional[float] = Field(default=None, description="Unix time of the last turn")
+
+
 class HealthResponse(BaseModel):
     """Health check response."""
     status: str = Field(..., description="Service status")
     agent_initialized: bool = Field(..., description="Whether the agent is initialized")
     mcp_connected: bool = Field(..., description="Whether MCP server is connected")
+    initialization: Optional[str] = Field(
+        default=None,
+        description="Agent initialization status: pending, initializing, retrying, ready or failed"
+    )
+    healthy_mcp_sessions: int = Field(default=0, description="Pooled MCP sessions currently healthy")
+    last_error: Optional[str] = Field(default=None, description="Error from the last failed initialization attempt")
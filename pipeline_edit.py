@@ -0,0 +1,115 @@
+import json
+import re
+from typing import Any, Dict, List
+import jsonpatch
+import yaml
+from yaml_codec import yaml_codec
+
+ALLOWED_OPS = {"add", "remove", "replace", "move", "copy", "test"}
+
+EDIT_SYSTEM_PROMPT = """You edit Harness.io pipeline YAML (V0 format) by returning a JSON Patch (RFC 6902).
+
+You receive the current pipeline as YAML, an outline with the JSON Pointer of every
+stage and step, and an instruction. Reply with a JSON object of the form
+{"patch": [<operations>]} and nothing else. Operations are add, remove, replace,
+move, copy and test; paths are JSON Pointers into the parsed document, for example
+/pipeline/stages/1 or /pipeline/stages/-. Change only what the instruction asks
+for, keep identifiers unique and valid (letters, digits and underscores), and never
+return the whole pipeline."""
+
+EDIT_REQUEST_TEMPLATE = """Current pipeline:
+```yaml
+{pipeline_yaml}
+```
+
+Outline:
+{outline}
+
+Instruction: {instruction}"""
+
+REPAIR_TEMPLATE = """That patch could not be applied: {error}
+Reply with a corrected {{"patch": [...]}} for the same instruction."""
+
+
+class PipelineEditError(ValueError):
+    """The source pipeline or the model's patch could not be used."""
+
+
+def strip_fences(text: str) -> str:
+    """Drop a surrounding Markdown code fence, if any."""
+    match = re.search(r"```[a-zA-Z]*\n(.*?)```", text, re.DOTALL)
+    return match.group(1) if match else text
+
+
+async def parse_pipeline_yaml(text: str) -> Dict[str, Any]:
+    """Parse pipeline YAML into a document with a top-level ``pipeline`` mapping."""
+    try:
+        document = await yaml_codec.aload(strip_fences(text))
+    except yaml.YAMLError as e:
+        raise PipelineEditError(f"Pipeline YAML does not parse: {e}")
+    if not isinstance(document, dict) or not isinstance(document.get("pipeline"), dict):
+        raise PipelineEditError("Pipeline YAML must have a top-level 'pipeline' mapping")
+    return document
+
+
+def extract_pipeline_yaml(tool_output: str) -> str:
+    """Pipeline YAML from a ``get_pipeline`` MCP result (JSON envelope or raw YAML)."""
+    try:
+        payload = json.loads(tool_output)
+    except ValueError:
+        return tool_output
+    data = payload.get("data", payload) if isinstance(payload, dict) else {}
+    for key in ("yamlPipeline", "yaml_pipeline", "yaml"):
+        if isinstance(data, dict) and isinstance(data.get(key), str):
+            return data[key]
+    raise PipelineEditError("get_pipeline result has no pipeline YAML")
+
+
+def outline(document: Dict[str, Any]) -> str:
+    """One line per stage and step with its JSON Pointer, so the model can address them."""
+    lines = []
+    stages = document["pipeline"].get("stages") or []
+    for i, item in enumerate(stages):
+        stage = (item or {}).get("stage") or {}
+        base = f"/pipeline/stages/{i}"
+        if not stage:
+            lines.append(f"{base}  {next(iter(item or {'?': None}))}")
+            continue
+        lines.append(f"{base}/stage  stage {stage.get('identifier', '?')} ({stage.get('type', '?')})")
+        steps = ((stage.get("spec") or {}).get("execution") or {}).get("steps") or []
+        for j, step_item in enumerate(steps):
+            step = (step_item or {}).get("step") or {}
+            if step:
+                lines.append(
+                    f"{base}/stage/spec/execution/steps/{j}/step  "
+                    f"step {step.get('identifier', '?')} ({step.get('type', '?')})"
+                )
+    if not lines:
+        lines.append("/pipeline/stages  (no stages)")
+    return "\n".join(lines)
+
+
+def parse_patch(content: str) -> List[Dict[str, Any]]:
+    """The JSON Patch operations in a model reply."""
+    try:
+        payload = json.loads(strip_fences(content).strip())
+    except ValueError as e:
+        raise PipelineEditError(f"Reply is not JSON: {e}")
+    ops = payload.get("patch") if isinstance(payload, dict) else payload
+    if not isinstance(ops, list) or not ops:
+        raise PipelineEditError("Reply has no 'patch' list of operations")
+    for op in ops:
+        if not isinstance(op, dict) or op.get("op") not in ALLOWED_OPS or not isinstance(op.get("path"), str):
+            raise PipelineEditError(f"Invalid patch operation: {json.dumps(op)[:200]}")
+    return ops
+
+
+def apply_patch(document: Dict[str, Any], ops: List[Dict[str, Any]], root: str = "pipeline") -> Dict[str, Any]:
+    """Apply ``ops`` to a copy of ``document`` and check the ``root`` mapping survived."""
+    try:
+        updated = jsonpatch.apply_patch(document, ops, in_place=False)
+    except (jsonpatch.JsonPatchException, jsonpatch.JsonPointerException) as e:
+        raise PipelineEditError(str(e))
+    if not isinstance(updated, dict) or not isinstance(updated.get(root), dict):
+        raise PipelineEditError(f"Patch removed the top-level '{root}' mapping")
+    return updated
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from instrumentation import instrumentation
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def canonical_schema(value: Any) -> Any:
+    """Copy of a JSON schema with every object's keys in sorted order."""
+    if isinstance(value, dict):
+        return {key: canonical_schema(value[key]) for key in sorted(value)}
+    if isinstance(value, list):
+        return [canonical_schema(item) for item in value]
+    return value
+
+
+class PromptPrefix:
+    """
+    Keeps the start of every LLM call byte-identical so the provider can cache it.
+
+    OpenAI (and similar providers) bill and serve a repeated prompt prefix of
+    at least ~1024 tokens from cache. For the agent that prefix is the tool
+    definitions followed by the system prompt; only the human message and
+    scratchpad vary per request. Tool schemas are therefore sorted by name
+    and have their keys sorted, so the same tool set always serializes to
+    the same bytes whatever order the MCP server or the router produced.
+    Each built prefix is fingerprinted; a different fingerprint for the
+    same catalog and tool set means something upstream made the prefix
+    unstable and is logged as drift.
+    """
+
+    def __init__(self, min_cacheable_tokens: int, cached_token_discount: float):
+        self.min_cacheable_tokens = min_cacheable_tokens
+        self.cached_token_discount = cached_token_discount
+        # (catalog hash, tool names) -> prefix fingerprint and size
+        self._prefixes: Dict[Tuple[str, Tuple[str, ...]], Dict[str, Any]] = {}
+        self.drift = 0
+
+    def tool_block(self, schemas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Function schemas in the stable order and key layout sent to the LLM."""
+        return [canonical_schema(schema) for schema in sorted(schemas, key=lambda s: s["name"])]
+
+    def register(self, system_prompt: str, tool_block: List[Dict[str, Any]],
+                 catalog_hash: Optional[str]) -> str:
+        """Fingerprint the prefix of an executor being built and check it for drift."""
+        serialized = json.dumps(tool_block, separators=(",", ":"), ensure_ascii=False) + system_prompt
+        fingerprint = hashlib.sha256(serialized.encode("utf-8")).hexdigest()[:16]
+        key = (catalog_hash or "", tuple(schema["name"] for schema in tool_block))
+
+        previous = self._prefixes.get(key)
+        if previous is not None and previous["fingerprint"] != fingerprint:
+            self.drift += 1
+            logger.warning(
+                f"Prompt prefix for {len(tool_block)} tools changed from {previous['fingerprint']} "
+                f"to {fingerprint} without a catalog change; provider prompt caching will miss"
+            )
+
+        # About 4 characters per token
+        tokens = len(serialized) // 4
+        if previous is None and tokens < self.min_cacheable_tokens:
+            logger.info(
+                f"Prompt prefix {fingerprint} is ~{tokens} tokens, below the "
+                f"{self.min_cacheable_tokens}-token minimum for provider caching"
+            )
+        self._prefixes[key] = {"fingerprint": fingerprint, "tools": len(tool_block), "prefix_tokens": tokens}
+        return fingerprint
+
+    def get_metrics(self) -> Dict[str, Any]:
+        totals = instrumentation.token_totals()
+        prompt = totals.get("prompt", 0.0)
+        cached = totals.get("cached_prompt", 0.0)
+        return {
+            "prompt_tokens": int(prompt),
+            "cached_prompt_tokens": int(cached),
+            "uncached_prompt_tokens": int(prompt - cached),
+            "cache_hit_ratio": round(cached / prompt, 4) if prompt else 0.0,
+            # Cached tokens are billed at a discount; this is the uncached-token equivalent saved
+            "estimated_tokens_saved": int(cached * self.cached_token_discount),
+            "min_cacheable_tokens": self.min_cacheable_tokens,
+            "prefix_drift": self.drift,
+            "prefixes": [
+                {**entry, "cacheable": entry["prefix_tokens"] >= self.min_cacheable_tokens}
+                for entry in self._prefixes.values()
+            ],
+        }
+
+
+# Global prompt prefix instance
+prompt_prefix = PromptPrefix(
+    min_cacheable_tokens=settings.prompt_cache_min_tokens,
+    cached_token_discount=settings.prompt_cache_discount,
+)
@@ -0,0 +1,284 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_request(text: str) -> str:
+    """Normalize request text so trivially different prompts share a key."""
+    text = text.strip().lower()
+    text = re.sub(r"\s+", " ", text)
+    return text.rstrip(" .!?")
+
+
+class ResponseCacheBackend(ABC):
+    """Storage interface for cached agent responses."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Dict[str, Any], ttl: float):
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    async def clear(self):
+        ...
+
+    async def close(self):
+        pass
+
+
+class MemoryBackend(ResponseCacheBackend):
+    """In-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: float):
+        self._entries[key] = (time.time() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    async def clear(self):
+        self._entries.clear()
+
+
+class SQLiteBackend(ResponseCacheBackend):
+    """On-disk store shared by every worker on the host."""
+
+    def __init__(self, path: str, max_entries: int = 1024):
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def _set(self, key: str, value: Dict[str, Any], ttl: float):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, default=str), now + ttl, now)
+            )
+            conn.execute("DELETE FROM responses WHERE expires_at < ?", (now,))
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def _delete(self, key: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def _clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: float):
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self._delete, key)
+
+    async def clear(self):
+        await asyncio.to_thread(self._clear)
+
+
+class RedisBackend(ResponseCacheBackend):
+    """
+    Store backed by any Redis-protocol server (Redis, Valkey, KeyDB, ...).
+
+    Requires the optional ``redis`` package.
+    """
+
+    def __init__(self, url: str, prefix: str = "harness-agent:response:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise ValueError("RESPONSE_CACHE_BACKEND=redis requires the 'redis' package (pip install redis)")
+        self.prefix = prefix
+        self._client = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = await self._client.get(self.prefix + key)
+        return json.loads(raw) if raw else None
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: float):
+        await self._client.set(self.prefix + key, json.dumps(value, default=str), ex=max(1, int(ttl)))
+
+    async def delete(self, key: str):
+        await self._client.delete(self.prefix + key)
+
+    async def clear(self):
+        async for key in self._client.scan_iter(match=self.prefix + "*"):
+            await self._client.delete(key)
+
+    async def close(self):
+        await self._client.aclose()
+
+
+def create_backend(name: str) -> ResponseCacheBackend:
+    """Build the backend selected by ``RESPONSE_CACHE_BACKEND``."""
+    if name == "memory":
+        return MemoryBackend(max_entries=settings.response_cache_max_entries)
+    if name == "sqlite":
+        return SQLiteBackend(settings.response_cache_sqlite_path, max_entries=settings.response_cache_max_entries)
+    if name == "redis":
+        return RedisBackend(settings.response_cache_redis_url)
+    raise ValueError(f"Unknown response cache backend '{name}'. Use memory, sqlite or redis.")
+
+
+class ResponseCache:
+    """
+    Opt-in cache of whole agent responses.
+
+    Keys combine the endpoint kind, model, prompt version and the
+    normalized request text. Backend errors are logged and treated as
+    misses so a broken cache never fails a request.
+    """
+
+    def __init__(self, enabled: bool, backend_name: str, ttl: float):
+        self.enabled = enabled
+        self.backend_name = backend_name
+        self.ttl = ttl
+        self._backend: Optional[ResponseCacheBackend] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.stores = 0
+        self.errors = 0
+
+    @property
+    def backend(self) -> ResponseCacheBackend:
+        if self._backend is None:
+            self._backend = create_backend(self.backend_name)
+        return self._backend
+
+    @staticmethod
+    def make_key(kind: str, user_request: str, model: str, prompt_version: str) -> str:
+        payload = json.dumps(
+            [kind, model, prompt_version, normalize_request(user_request)],
+            separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Response cache lookup failed: {e}")
+            value = None
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any]):
+        try:
+            await self.backend.set(key, value, self.ttl)
+            self.stores += 1
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Response cache store failed: {e}")
+
+    def record_bypass(self):
+        self.bypasses += 1
+
+    async def clear(self):
+        await self.backend.clear()
+
+    async def close(self):
+        if self._backend is not None:
+            await self._backend.close()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend_name,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "bypasses": self.bypasses,
+            "stores": self.stores,
+            "errors": self.errors,
+        }
+
+
+# Global response cache instance
+response_cache = ResponseCache(
+    enabled=settings.response_cache_enabled,
+    backend_name=settings.response_cache_backend,
+    ttl=settings.response_cache_ttl,
+)
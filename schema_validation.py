@@ -0,0 +1,229 @@
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import fastjsonschema
+import yaml
+from jsonschema import Draft7Validator
+from jsonschema.exceptions import SchemaError, ValidationError, best_match
+from config import settings
+from yaml_codec import yaml_codec
+
+logger = logging.getLogger(__name__)
+
+# Endpoint kind -> schema file in SCHEMA_DIR
+SCHEMA_FILES = {
+    "pipeline": "pipeline.json",
+    "connector": "connector.json",
+}
+
+# Longest error message kept; jsonschema quotes the whole failing instance
+MAX_MESSAGE_CHARS = 200
+
+FENCED_YAML = re.compile(r"```(?:ya?ml)?[ \t]*\n(.*?)```", re.DOTALL)
+
+REPAIR_TEMPLATE = """The {kind} YAML you returned fails the Harness V0 {kind} schema:
+{errors}
+
+Reply with a JSON object {{"patch": [<operations>]}} holding a JSON Patch (RFC 6902)
+against that YAML, parsed, that fixes only these errors. Do not return the YAML."""
+
+
+def json_pointer(path: Any) -> str:
+    """Render a jsonschema error path (deque of keys and indexes) as a JSON Pointer."""
+    return "".join("/" + str(part).replace("~", "~0").replace("/", "~1") for part in path)
+
+
+def extract_yaml(output: str) -> Tuple[Optional[str], Optional[Tuple[int, int]]]:
+    """The YAML in an agent answer and its span, preferring a fenced block."""
+    match = FENCED_YAML.search(output)
+    if match:
+        return match.group(1), match.span(1)
+    stripped = output.strip()
+    if stripped and ":" in stripped.splitlines()[0]:
+        return output, (0, len(output))
+    return None, None
+
+
+def replace_yaml(output: str, span: Tuple[int, int], yaml_text: str) -> str:
+    """Put repaired YAML back where the original was, keeping any prose around it."""
+    start, end = span
+    return output[:start] + yaml_text + output[end:]
+
+
+def _path_order(error: ValidationError) -> List[Tuple[int, int, str]]:
+    # Indexes sort numerically and before keys, so errors follow the document
+    return [(0, part, "") if isinstance(part, int) else (1, 0, str(part)) for part in error.absolute_path]
+
+
+class SchemaValidator:
+    """
+    Validates generated pipeline and connector YAML against local V0 schemas.
+
+    Schemas are read from ``schema_dir`` once (at agent startup, or on
+    first use) and compiled to Python code with fastjsonschema, which
+    accepts a valid document in a single pass without resolving any
+    ``$ref`` at run time. Only a document it rejects goes through the
+    (cached) jsonschema Draft 7 validator, which collects every error as
+    ``{"path", "message", "rule"}`` with a JSON Pointer path, capped at
+    ``max_errors`` per document.
+    """
+
+    def __init__(self, enabled: bool, schema_dir: str, max_errors: int, repair_attempts: int):
+        self.enabled = enabled
+        self.schema_dir = schema_dir
+        self.max_errors = max_errors
+        self.repair_attempts = repair_attempts
+        self._compiled: Dict[str, Callable[[Any], Any]] = {}
+        self._validators: Dict[str, Draft7Validator] = {}
+        self._schema_ids: Dict[str, str] = {}
+        self.compile_ms = 0.0
+
+        self.validated = 0
+        self.valid = 0
+        self.invalid = 0
+        self.no_yaml = 0
+        self.documents = 0
+        self.slow_path = 0
+        self.validate_seconds = 0.0
+        self.repairs = 0
+        self.repaired = 0
+        self._per_kind: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self._validators)
+
+    def load(self) -> float:
+        """
+        Read and compile every schema; returns the time taken in milliseconds.
+
+        A missing or malformed schema disables validation rather than
+        failing startup.
+        """
+        started = time.perf_counter()
+        compiled, validators = {}, {}
+        try:
+            for kind, filename in SCHEMA_FILES.items():
+                path = os.path.join(self.schema_dir, filename)
+                with open(path, encoding="utf-8") as f:
+                    schema = json.load(f)
+                Draft7Validator.check_schema(schema)
+                compiled[kind] = fastjsonschema.compile(schema, use_formats=False)
+                validators[kind] = Draft7Validator(schema)
+                self._schema_ids[kind] = schema.get("$id", path)
+        except (OSError, ValueError, SchemaError, fastjsonschema.JsonSchemaDefinitionException) as e:
+            logger.error(f"Could not load YAML schemas from {self.schema_dir}, disabling validation: {e}")
+            self.enabled = False
+            return 0.0
+        self._compiled = compiled
+        self._validators = validators
+        self.compile_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"Compiled {len(validators)} YAML schemas from {self.schema_dir} in {self.compile_ms:.1f}ms")
+        return self.compile_ms
+
+    def handles(self, kind: str) -> bool:
+        if self.enabled and not self.loaded:
+            self.load()
+        return self.enabled and kind in SCHEMA_FILES
+
+    def validate(self, kind: str, document: Any) -> List[Dict[str, str]]:
+        """Schema errors in a parsed document, first ``max_errors`` by path."""
+        if not self.loaded:
+            self.load()
+        started = time.perf_counter()
+        try:
+            self._compiled[kind](document)
+            errors = []
+        except fastjsonschema.JsonSchemaValueException:
+            errors = sorted(self._validators[kind].iter_errors(document), key=_path_order)
+            self.slow_path += 1
+        self.documents += 1
+        self.validate_seconds += time.perf_counter() - started
+        return [self._describe(error) for error in errors[:self.max_errors]]
+
+    @staticmethod
+    def _describe(error: ValidationError) -> Dict[str, str]:
+        # oneOf/anyOf failures carry the branch errors: report the deepest one,
+        # or what each branch wanted when they all fail at the same level
+        if error.context:
+            deeper = best_match([error])
+            if deeper is not error:
+                error = deeper
+                message = error.message
+            else:
+                branches = dict.fromkeys(e.message for e in error.context if not e.relative_path)
+                message = f"Matches none of the allowed forms: {'; or '.join(branches) or error.message}"
+        else:
+            message = error.message
+        if len(message) > MAX_MESSAGE_CHARS:
+            message = message[:MAX_MESSAGE_CHARS] + "..."
+        return {"path": json_pointer(error.absolute_path), "message": message, "rule": str(error.validator)}
+
+    async def check_output(self, kind: str, output: str) -> Tuple[Dict[str, Any], Any]:
+        """
+        Validate the YAML in an agent answer.
+
+        Returns the report ``{"valid", "schema", "errors"}`` and the parsed
+        document. When there is no YAML or it does not parse, the document
+        is None and the report has a single error at the root.
+        """
+        text, _ = extract_yaml(output)
+        if text is None:
+            self.no_yaml += 1
+            return self._record(kind, [{"path": "", "message": "No YAML document found in the output", "rule": "yaml"}]), None
+        try:
+            document = await yaml_codec.aload(text)
+        except yaml.YAMLError as e:
+            message = " ".join(str(e).split())[:MAX_MESSAGE_CHARS]
+            return self._record(kind, [{"path": "", "message": f"YAML does not parse: {message}", "rule": "yaml"}]), None
+        return self._record(kind, self.validate(kind, document)), document
+
+    def _record(self, kind: str, errors: List[Dict[str, str]]) -> Dict[str, Any]:
+        self.validated += 1
+        stats = self._per_kind.setdefault(kind, {"validated": 0, "invalid": 0})
+        stats["validated"] += 1
+        if errors:
+            self.invalid += 1
+            stats["invalid"] += 1
+        else:
+            self.valid += 1
+        return {"valid": not errors, "schema": self._schema_ids.get(kind, kind), "errors": errors}
+
+    def repair_prompt(self, kind: str, errors: List[Dict[str, str]]) -> str:
+        """The follow-up message for a repair: the error list and nothing else."""
+        rendered = "\n".join(f"- {e['path'] or '/'}: {e['message']}" for e in errors)
+        return REPAIR_TEMPLATE.format(kind=kind, errors=rendered)
+
+    def record_repair(self, succeeded: bool):
+        self.repairs += 1
+        self.repaired += succeeded
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "schema_dir": self.schema_dir,
+            "schemas": self._schema_ids,
+            "compile_ms": round(self.compile_ms, 2),
+            "validated": self.validated,
+            "valid": self.valid,
+            "invalid": self.invalid,
+            "no_yaml": self.no_yaml,
+            "error_collections": self.slow_path,
+            "avg_validate_ms": round(self.validate_seconds * 1000 / self.documents, 3) if self.documents else 0.0,
+            "repair_attempts": self.repair_attempts,
+            "repairs": self.repairs,
+            "repaired": self.repaired,
+            "per_kind": self._per_kind,
+        }
+
+
+# Global schema validator instance
+schema_validator = SchemaValidator(
+    enabled=settings.schema_validation_enabled,
+    schema_dir=settings.schema_dir,
+    max_errors=settings.schema_validation_max_errors,
+    repair_attempts=settings.schema_repair_attempts,
+)
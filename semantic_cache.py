@@ -0,0 +1,323 @@
+import hashlib
+import logging
+import re
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+import numpy as np
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Words that carry no signal for telling pipeline/connector requests apart
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "for", "with", "to", "of", "in", "on", "my", "our",
+    "me", "i", "we", "please", "can", "you", "that", "this", "it", "is", "be", "using",
+    "create", "generate", "make", "give", "want", "need", "new",
+    "pipeline", "pipelines", "connector", "connectors", "harness", "yaml",
+    "app", "application", "stage", "stages", "step", "steps",
+}
+
+# Thresholds reported in metrics so the configured one can be tuned offline
+THRESHOLD_BUCKETS = (0.70, 0.75, 0.80, 0.85, 0.90, 0.95, 0.99)
+
+
+def _normalize(word: str) -> str:
+    """Strip one common suffix so "builds", "building" and "build" compare equal."""
+    for suffix in ("ing", "ed", "es", "s") if word.isalpha() else ():
+        if len(word) > len(suffix) + 2 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+# Stages, features, languages, targets and negations. Requests only share a cached
+# response when they name exactly the same set of these; similarity alone cannot
+# tell "build and test" from "build, test and deploy" or "without deploy"
+REQUIREMENT_TERMS = {_normalize(word) for word in (
+    "build", "test", "lint", "deploy", "deployment", "release", "rollout", "rollback", "approval",
+    "canary", "blue", "green", "rolling", "matrix", "parallel", "scan", "security", "notify",
+    "notification", "slack", "email", "push", "publish", "cache", "trigger", "schedule", "cron",
+    "python", "node", "nodejs", "node.js", "javascript", "typescript", "java", "maven", "gradle", "go",
+    "golang", "rust", "ruby", "dotnet", "php", "docker", "kubernetes", "k8s", "helm", "terraform",
+    "ecs", "lambda", "serverless", "github", "gitlab", "bitbucket", "dockerhub", "aws", "gcp",
+    "azure", "no", "not", "without", "skip", "except", "exclude", "excluding", "only", "never",
+)}
+# Matched before suffix stripping, which would turn "staging" into "stages"
+ENVIRONMENT_TERMS = {"dev", "qa", "staging", "prod", "production"}
+
+# Names must match too, or one service gets another's name and identifier. A name is
+# a URL, a double-quoted or backticked string, an identifier-like token (digits,
+# underscores, inner dots/dashes/slashes), the word after "named"/"called", or a
+# word next to a resource noun ("payments service", "service alpha")
+URL_PATTERN = re.compile(r"https?://[^\s,;)\"`]+")
+QUOTED_PATTERN = re.compile(r"[\"`]([^\"`]{1,80})[\"`]")
+IDENTIFIER_PATTERN = re.compile(r"[\d_]|\w[\-./]\w")
+NAMING_WORDS = {"named", "called", "identifier", "id"}
+NAME_CUES = {_normalize(word) for word in (
+    "service", "microservice", "app", "application", "pipeline", "project", "repo", "repository",
+    "connector", "module", "api", "org", "organization", "team", "environment",
+)}
+GENERIC_WORDS = {_normalize(word) for word in STOPWORDS | NAME_CUES | NAMING_WORDS | {
+    "ci", "cd", "ci/cd", "cicd", "simple", "basic", "standard", "new", "all", "both", "then",
+    "from", "at", "which", "should", "will", "also", "some", "any", "by", "as", "are",
+}}
+
+
+def requirement_signature(text: str) -> frozenset:
+    """The requirement terms (see ``REQUIREMENT_TERMS``) and names a request contains."""
+    lowered = text.lower()
+    terms = set()
+    for url in URL_PATTERN.findall(lowered):
+        terms.add(url.rstrip("/."))
+        lowered = lowered.replace(url, " ")
+    terms.update(quoted.strip() for quoted in QUOTED_PATTERN.findall(lowered))
+
+    raw_words = [word.strip("-./") for word in re.findall(r"[a-z0-9][a-z0-9_\-./]*", lowered)]
+    words = [_normalize(word) for word in raw_words]
+    for i, word in enumerate(words):
+        if raw_words[i] in ENVIRONMENT_TERMS:
+            terms.add(raw_words[i])
+        elif word in REQUIREMENT_TERMS:
+            terms.add(word)
+        elif word not in GENERIC_WORDS and IDENTIFIER_PATTERN.search(word):
+            terms.add(word)
+        if word in NAMING_WORDS:
+            neighbours = [i + 1]
+        elif word in NAME_CUES:
+            neighbours = [i - 1, i + 1]
+        else:
+            continue
+        for j in neighbours:
+            if 0 <= j < len(words) and raw_words[j] not in ENVIRONMENT_TERMS \
+                    and words[j] not in GENERIC_WORDS and words[j] not in REQUIREMENT_TERMS:
+                terms.add(words[j])
+    return frozenset(terms)
+
+
+class Embedder(ABC):
+    """Turns request text into a fixed-size, L2-normalized vector."""
+
+    dim: int
+
+    @abstractmethod
+    async def embed(self, text: str) -> np.ndarray:
+        ...
+
+
+class HashingEmbedder(Embedder):
+    """
+    Offline bag-of-words embedder using the hashing trick.
+
+    Tokens are lowercased, stopwords dropped and common suffixes stripped,
+    so paraphrases like "python CI with build and test stages" and
+    "CI pipeline for python app, build+test" land on the same features.
+    """
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        tokens = []
+        for word in re.findall(r"[a-z0-9][a-z0-9_\-./]*", text.lower()):
+            word = word.strip("-./")
+            if not word or word in STOPWORDS:
+                continue
+            tokens.append(_normalize(word))
+        return tokens
+
+    async def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in self.tokenize(text):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vector[bucket] += sign
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class OpenAIEmbedder(Embedder):
+    """Embedder backed by the OpenAI embeddings API."""
+
+    def __init__(self, model: str):
+        from langchain_openai import OpenAIEmbeddings
+        from llm_client import llm_clients
+        self._embeddings = OpenAIEmbeddings(
+            model=model,
+            openai_api_key=settings.openai_api_key,
+            base_url=settings.openai_base_url,
+            http_async_client=llm_clients.client_for(settings.openai_base_url),
+            timeout=llm_clients.timeout,
+            max_retries=llm_clients.client_max_retries,
+        )
+        self.dim = 0
+
+    async def embed(self, text: str) -> np.ndarray:
+        vector = np.asarray(await self._embeddings.aembed_query(text), dtype=np.float32)
+        self.dim = vector.shape[0]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+def create_embedder(name: str) -> Embedder:
+    """Build the embedder selected by ``SEMANTIC_CACHE_EMBEDDER``."""
+    if name == "hashing":
+        return HashingEmbedder(dim=settings.semantic_cache_embedding_dim)
+    if name == "openai":
+        return OpenAIEmbedder(settings.semantic_cache_openai_model)
+    raise ValueError(f"Unknown semantic cache embedder '{name}'. Use hashing or openai.")
+
+
+class SemanticCache:
+    """
+    Embedding-similarity cache of past request/response pairs.
+
+    Vectors live in a fixed-capacity matrix so a lookup is one
+    matrix-vector product. Entries are namespaced by endpoint kind, model
+    and prompt version, and only match requests with the same
+    ``requirement_signature``; when the index is full the least recently
+    used slot is overwritten. Every lookup records the best similarity seen so
+    ``get_metrics`` can show the hit rate other thresholds would give.
+    """
+
+    def __init__(self, enabled: bool, embedder_name: str, threshold: float, max_entries: int, ttl: float):
+        self.enabled = enabled
+        self.embedder_name = embedder_name
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._embedder: Optional[Embedder] = None
+
+        self._vectors: Optional[np.ndarray] = None
+        self._namespaces: List[Optional[str]] = [None] * max_entries
+        self._values: List[Optional[Dict[str, Any]]] = [None] * max_entries
+        self._requests: List[Optional[str]] = [None] * max_entries
+        self._signatures: List[Optional[frozenset]] = [None] * max_entries
+        self._expires_at = np.zeros(max_entries, dtype=np.float64)
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.requirement_mismatches = 0
+        self._best_scores = {t: 0 for t in THRESHOLD_BUCKETS}
+
+    @property
+    def embedder(self) -> Embedder:
+        if self._embedder is None:
+            self._embedder = create_embedder(self.embedder_name)
+        return self._embedder
+
+    @staticmethod
+    def namespace(kind: str, model: str, prompt_version: str) -> str:
+        return f"{kind}:{model}:{prompt_version}"
+
+    def _ensure_matrix(self, dim: int):
+        if self._vectors is None or self._vectors.shape[1] != dim:
+            self._vectors = np.zeros((self.max_entries, dim), dtype=np.float32)
+            self._namespaces = [None] * self.max_entries
+            self._values = [None] * self.max_entries
+            self._requests = [None] * self.max_entries
+            self._signatures = [None] * self.max_entries
+
+    async def lookup(self, namespace: str, user_request: str) -> Optional[Dict[str, Any]]:
+        """Return the stored response of the most similar past request above the threshold."""
+        vector = await self.embedder.embed(user_request)
+        if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+            self.misses += 1
+            return None
+
+        now = time.time()
+        valid = np.array(
+            [ns == namespace for ns in self._namespaces], dtype=bool
+        ) & (self._expires_at > now)
+        if not valid.any():
+            self.misses += 1
+            return None
+        signature = requirement_signature(user_request)
+        valid &= np.array([sig == signature for sig in self._signatures], dtype=bool)
+        if not valid.any():
+            self.requirement_mismatches += 1
+            self.misses += 1
+            return None
+
+        scores = self._vectors @ vector
+        scores[~valid] = -1.0
+        best = int(np.argmax(scores))
+        score = float(scores[best])
+
+        for bucket in THRESHOLD_BUCKETS:
+            if score >= bucket:
+                self._best_scores[bucket] += 1
+
+        if score < self.threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._last_used[best] = now
+        logger.info(f"Semantic cache hit (similarity {score:.3f}) for: {self._requests[best][:80]}")
+        return {**self._values[best], "similarity": round(score, 4)}
+
+    async def store(self, namespace: str, user_request: str, value: Dict[str, Any]):
+        vector = await self.embedder.embed(user_request)
+        self._ensure_matrix(vector.shape[0])
+
+        now = time.time()
+        free = [i for i, ns in enumerate(self._namespaces) if ns is None or self._expires_at[i] <= now]
+        if free:
+            slot = free[0]
+        else:
+            slot = int(np.argmin(self._last_used))
+            self.evictions += 1
+
+        self._vectors[slot] = vector
+        self._namespaces[slot] = namespace
+        self._values[slot] = value
+        self._requests[slot] = user_request
+        self._signatures[slot] = requirement_signature(user_request)
+        self._expires_at[slot] = now + self.ttl
+        self._last_used[slot] = now
+        self.stores += 1
+
+    def clear(self):
+        self._vectors = None
+        self._namespaces = [None] * self.max_entries
+        self._values = [None] * self.max_entries
+        self._requests = [None] * self.max_entries
+        self._signatures = [None] * self.max_entries
+        self._expires_at[:] = 0
+
+    def get_metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "embedder": self.embedder_name,
+            "threshold": self.threshold,
+            "entries": sum(1 for ns in self._namespaces if ns is not None),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            # Lookups whose namespace had entries, none naming the same stages, features and names
+            "requirement_mismatches": self.requirement_mismatches,
+            # Fraction of lookups whose best match would have hit at each threshold
+            "hit_rate_by_threshold": {
+                f"{t:.2f}": round(count / lookups, 4) if lookups else 0.0
+                for t, count in self._best_scores.items()
+            },
+        }
+
+
+# Global semantic cache instance
+semantic_cache = SemanticCache(
+    enabled=settings.semantic_cache_enabled,
+    embedder_name=settings.semantic_cache_embedder,
+    threshold=settings.semantic_cache_threshold,
+    max_entries=settings.semantic_cache_max_entries,
+    ttl=settings.semantic_cache_ttl,
+)
@@ -0,0 +1,308 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+import weakref
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Turns that no longer fit the history budget -> new summary (given the old one)
+Summarizer = Callable[[str, List[Dict[str, Any]]], Awaitable[str]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+class SessionBackend(ABC):
+    """Storage interface for conversation sessions."""
+
+    @abstractmethod
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def set(self, session_id: str, session: Dict[str, Any], ttl: float):
+        ...
+
+    @abstractmethod
+    async def delete(self, session_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def count(self) -> int:
+        ...
+
+
+class MemorySessionBackend(SessionBackend):
+    """In-process LRU; a session expires ``ttl`` seconds after its last turn."""
+
+    def __init__(self, max_sessions: int = 1024):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        expires_at, session = entry
+        if expires_at < time.time():
+            del self._sessions[session_id]
+            return None
+        self._sessions.move_to_end(session_id)
+        return session
+
+    async def set(self, session_id: str, session: Dict[str, Any], ttl: float):
+        self._sessions[session_id] = (time.time() + ttl, session)
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    async def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+    async def count(self) -> int:
+        return len(self._sessions)
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """On-disk store shared by every worker on the host and kept across restarts."""
+
+    def __init__(self, path: str, max_sessions: int = 1024):
+        self.path = path
+        self.max_sessions = max_sessions
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+                return None
+        return json.loads(row[0])
+
+    def _set(self, session_id: str, session: Dict[str, Any], ttl: float):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, value, expires_at, updated_at) VALUES (?, ?, ?, ?)",
+                (session_id, json.dumps(session), now + ttl, now)
+            )
+            conn.execute("DELETE FROM sessions WHERE expires_at < ?", (now,))
+            conn.execute(
+                "DELETE FROM sessions WHERE id IN ("
+                "SELECT id FROM sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,)
+            )
+
+    def _delete(self, session_id: str) -> bool:
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount > 0
+
+    def _count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM sessions WHERE expires_at >= ?", (time.time(),)).fetchone()[0]
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get, session_id)
+
+    async def set(self, session_id: str, session: Dict[str, Any], ttl: float):
+        await asyncio.to_thread(self._set, session_id, session, ttl)
+
+    async def delete(self, session_id: str) -> bool:
+        return await asyncio.to_thread(self._delete, session_id)
+
+    async def count(self) -> int:
+        return await asyncio.to_thread(self._count)
+
+
+def create_session_backend(name: str) -> SessionBackend:
+    """Build the backend selected by ``SESSION_BACKEND``."""
+    if name == "memory":
+        return MemorySessionBackend(max_sessions=settings.session_max_sessions)
+    if name == "sqlite":
+        return SQLiteSessionBackend(settings.session_sqlite_path, max_sessions=settings.session_max_sessions)
+    raise ValueError(f"Unknown session backend '{name}'. Use memory or sqlite.")
+
+
+def extractive_summary(summary: str, turns: List[Dict[str, Any]], max_tokens: int) -> str:
+    """Fold dropped turns into the summary as one line per request, oldest lines first out."""
+    lines = [line for line in summary.splitlines() if line]
+    for turn in turns:
+        request = " ".join(turn["request"].split())
+        lines.append(f"- {turn['kind']} request: {request[:300]}")
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class SessionStore:
+    """
+    Conversation sessions that feed the agent's ``chat_history``.
+
+    A session keeps its turns (request and agent output) plus a summary of
+    turns that no longer fit. After each turn the oldest turns are folded
+    into the summary until the history is within ``max_history_tokens``;
+    the latest turn is always kept whole because it holds the YAML the
+    next request is likely to edit. Turns on one session are serialized
+    per process so history stays in order.
+    """
+
+    def __init__(self, enabled: bool, backend_name: str, ttl: float,
+                 max_history_tokens: int, max_summary_tokens: int):
+        self.enabled = enabled
+        self.backend_name = backend_name
+        self.ttl = ttl
+        self.max_history_tokens = max_history_tokens
+        self.max_summary_tokens = max_summary_tokens
+        self._backend: Optional[SessionBackend] = None
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+        self.created = 0
+        self.turns = 0
+        self.follow_ups = 0
+        self.compacted_turns = 0
+        self.summaries = 0
+        self.history_tokens = 0
+        self.errors = 0
+
+    @property
+    def backend(self) -> SessionBackend:
+        if self._backend is None:
+            self._backend = create_session_backend(self.backend_name)
+        return self._backend
+
+    def lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[session_id] = lock
+        return lock
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            return await self.backend.get(session_id)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Session lookup failed: {e}")
+            return None
+
+    async def delete(self, session_id: str) -> bool:
+        return await self.backend.delete(session_id)
+
+    def history_messages(self, session: Optional[Dict[str, Any]]) -> List[BaseMessage]:
+        """The session as chat messages: the summary, then each kept turn."""
+        if not session:
+            return []
+        messages: List[BaseMessage] = []
+        if session.get("summary"):
+            messages.append(SystemMessage(content=f"Summary of earlier requests in this conversation:\n{session['summary']}"))
+        for turn in session["turns"]:
+            messages.append(HumanMessage(content=turn["request"]))
+            messages.append(AIMessage(content=turn["output"]))
+        if messages:
+            self.follow_ups += 1
+            self.history_tokens += sum(estimate_tokens(str(m.content)) for m in messages)
+        return messages
+
+    @staticmethod
+    def _turns_tokens(turns: List[Dict[str, Any]]) -> int:
+        return sum(estimate_tokens(t["request"]) + estimate_tokens(t["output"]) for t in turns)
+
+    async def append(self, session_id: str, kind: str, user_request: str, output: str,
+                     summarizer: Optional[Summarizer] = None) -> Dict[str, Any]:
+        """Record a turn, compact the history to budget and save the session."""
+        now = time.time()
+        session = await self.get(session_id)
+        if session is None:
+            session = {"id": session_id, "created_at": now, "summary": "", "turns": [], "total_turns": 0}
+            self.created += 1
+        session["turns"].append({"kind": kind, "request": user_request, "output": output, "at": now})
+        session["total_turns"] += 1
+        session["updated_at"] = now
+        self.turns += 1
+
+        dropped = []
+        while len(session["turns"]) > 1 and self._turns_tokens(session["turns"]) > self.max_history_tokens:
+            dropped.append(session["turns"].pop(0))
+        if dropped:
+            self.compacted_turns += len(dropped)
+            session["summary"] = await self._summarize(session["summary"], dropped, summarizer)
+
+        try:
+            await self.backend.set(session_id, session, self.ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Session store failed: {e}")
+        return session
+
+    async def _summarize(self, summary: str, dropped: List[Dict[str, Any]],
+                         summarizer: Optional[Summarizer]) -> str:
+        if summarizer is not None:
+            try:
+                summary = await summarizer(summary, dropped)
+                self.summaries += 1
+                return summary
+            except Exception as e:
+                logger.warning(f"Session summarization failed, trimming instead: {e}")
+        return extractive_summary(summary, dropped, self.max_summary_tokens)
+
+    async def get_metrics(self) -> Dict[str, Any]:
+        try:
+            active = await self.backend.count()
+        except Exception:
+            active = None
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend_name,
+            "ttl_seconds": self.ttl,
+            "max_history_tokens": self.max_history_tokens,
+            "active_sessions": active,
+            "created": self.created,
+            "turns": self.turns,
+            "follow_ups": self.follow_ups,
+            "compacted_turns": self.compacted_turns,
+            "llm_summaries": self.summaries,
+            "avg_history_tokens": round(self.history_tokens / self.follow_ups, 1) if self.follow_ups else 0.0,
+            "errors": self.errors,
+        }
+
+
+# Global session store instance
+session_store = SessionStore(
+    enabled=settings.session_enabled,
+    backend_name=settings.session_backend,
+    ttl=settings.session_ttl,
+    max_history_tokens=settings.session_max_history_tokens,
+    max_summary_tokens=settings.session_max_summary_tokens,
+)
@@ -77,6 +77,31 @@ def test_query():
     return response.status_code == 200
 
 
+# Requests the template fast path must leave to the agent
+FAST_PATH_FALL_THROUGH = [
+    "Python CI pipeline with build and test but skip deploy",
+    "Go and Python monorepo CI pipeline with build and test",
+    "Python CI pipeline with build and test, without a deploy stage",
+    "Only build my Node.js app, no tests",
+]
+
+
+def test_fast_path_fall_through():
+    """Test that negated and multi-language requests are not served from templates."""
+    print("\n=== Testing Fast Path Fall-Through ===")
+    success = True
+    for request in FAST_PATH_FALL_THROUGH:
+        response = requests.post(
+            f"{API_BASE_URL}/api/v1/generate/pipeline",
+            json={"request": request},
+            headers={"Content-Type": "application/json"}
+        )
+        fast_path = response.status_code == 200 and response.json().get("fast_path", False)
+        print(f"{'✗' if fast_path else '✓'} fast_path={fast_path}: {request}")
+        success = success and not fast_path
+    return success
+
+
 def main():
     """Run all tests."""
     print("=" * 80)
@@ -88,6 +113,7 @@ def main():
         ("Pipeline Generation", test_generate_pipeline),
         ("Connector Generation", test_generate_connector),
         ("General Query", test_query),
+        ("Fast Path Fall-Through", test_fast_path_fall_through),
     ]
 
     results = []
@@ -0,0 +1,13 @@
+import os
+import sys
+
+# Settings need credentials at import time; the tests never talk to OpenAI or Harness
+os.environ.update({
+    "OPENAI_API_KEY": "sk-test",
+    "HARNESS_ACCOUNT_ID": "test",
+    "HARNESS_API_KEY": "test",
+    "HARNESS_DEFAULT_ORG_ID": "default",
+    "HARNESS_DEFAULT_PROJECT_ID": "test",
+    "LANGCHAIN_TRACING_V2": "false",
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
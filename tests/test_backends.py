@@ -0,0 +1,21 @@
+import pytest
+
+from response_cache import MemoryBackend, RedisBackend, ResponseCacheBackend, SQLiteBackend
+from semantic_cache import Embedder, HashingEmbedder, OpenAIEmbedder
+from sessions import MemorySessionBackend, SessionBackend, SQLiteSessionBackend
+
+
+@pytest.mark.parametrize("base", [ResponseCacheBackend, SessionBackend, Embedder])
+def test_incomplete_backend_fails_on_construction(base):
+    incomplete = type("Incomplete", (base,), {})
+    with pytest.raises(TypeError):
+        incomplete()
+
+
+@pytest.mark.parametrize("backend", [
+    MemoryBackend, SQLiteBackend, RedisBackend,
+    MemorySessionBackend, SQLiteSessionBackend,
+    HashingEmbedder, OpenAIEmbedder,
+])
+def test_shipped_backends_implement_the_interface(backend):
+    assert not backend.__abstractmethods__
@@ -0,0 +1,25 @@
+import pytest
+
+from fast_path import classify_pipeline_request, fast_path
+
+
+@pytest.mark.parametrize("request_text", [
+    "Deploy my node app",
+    "Python CI pipeline with build and test but skip deploy",
+    "Go and Python monorepo CI pipeline with build and test",
+    "Python CI pipeline with build and test, without a deploy stage",
+    "Only build my Node.js app, no tests",
+])
+def test_falls_through_to_the_agent(request_text):
+    assert fast_path.try_generate("pipeline", request_text) is None
+
+
+@pytest.mark.parametrize("request_text, stages", [
+    ("Python CI pipeline with build and test", ["build", "test"]),
+    ("CI pipeline for a Java service", ["build", "test"]),
+    ("Go CI pipeline with build, test and deploy", ["build", "test", "deploy"]),
+])
+def test_renders_the_stages_named(request_text, stages):
+    match = classify_pipeline_request(request_text)
+    assert match is not None and match.slots["stages"] == stages
+    assert fast_path.try_generate("pipeline", request_text) is not None
@@ -0,0 +1,53 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import agent
+from model_router import ModelRouter, PromptTooLarge
+
+TIERS = {"fast": {"context_tokens": 128000, "max_tools": 1}, "strong": {"context_tokens": 8192}}
+
+
+def make_router(tiers=TIERS):
+    return ModelRouter(True, tiers, "strong", {}, {}, escalate=True)
+
+
+class FakeExecutor:
+    """Asks for tool ``b`` when it is only offered ``a``."""
+
+    def __init__(self, names):
+        self.names = names
+
+    async def ainvoke(self, inputs, config=None):
+        steps = [(SimpleNamespace(tool="b", tool_input={}), "not a valid tool")] if self.names else []
+        return {"output": "done", "intermediate_steps": steps}
+
+
+def test_toolset_fallback_records_the_tier_it_ran_on(monkeypatch):
+    router = make_router()
+    monkeypatch.setattr(agent, "model_router", router)
+    instance = agent.HarnessPipelineAgent()
+    instance.tools = [SimpleNamespace(name="a"), SimpleNamespace(name="b")]
+    instance._executor_for = lambda tier, names=None: FakeExecutor(names)
+
+    async def plan(kind, user_request, inputs):
+        return "fast", ["a"]
+
+    instance._plan = plan
+    result = asyncio.run(instance._run_agent("query", "list my pipelines"))
+
+    assert result["model_tier"] == "strong"
+    metrics = router.get_metrics()["tiers"]
+    assert metrics["strong"]["runs"] == 1
+    assert metrics["fast"]["runs"] == 0
+
+
+def test_unfit_request_goes_to_the_largest_context_that_holds_it():
+    # Too many tools for fast, too long for strong's 8k context
+    assert make_router().route("pipeline", "build it", prompt_tokens=20000, tools=5) == "fast"
+
+
+def test_prompt_no_tier_can_hold_fails_fast():
+    with pytest.raises(PromptTooLarge, match="200000 tokens"):
+        make_router().route("pipeline", "build it", prompt_tokens=200000)
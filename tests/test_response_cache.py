@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+import agent
+from main import _cache_flags
+from response_cache import ResponseCache
+from semantic_cache import SemanticCache
+
+REQUEST = "Canary deployment of the payments service with approval"
+GOOD = {"output": "pipeline:\n  name: payments\n", "validation": {"valid": True, "errors": []}}
+
+
+@pytest.fixture
+def harness_agent(monkeypatch):
+    monkeypatch.setattr(agent, "response_cache", ResponseCache(enabled=True, backend_name="memory", ttl=60))
+    monkeypatch.setattr(agent, "semantic_cache", SemanticCache(True, "hashing", 0.85, 16, 60))
+    instance = agent.HarnessPipelineAgent()
+    instance.agent_executor = object()
+    return instance
+
+
+def run_with(instance, results, calls=2, **kwargs):
+    """Serve REQUEST ``calls`` times while the agent returns ``results`` in turn."""
+    answers = iter(results)
+
+    async def run_coalesced(kind, user_request):
+        return dict(next(answers))
+
+    instance._run_coalesced = run_coalesced
+
+    async def serve():
+        return [await instance._execute("pipeline", REQUEST, **kwargs) for _ in range(calls)]
+
+    return asyncio.run(serve())
+
+
+@pytest.mark.parametrize("bad", [
+    {"output": "Agent stopped due to max iterations."},
+    {"output": "pipeline:\n  name: payments\n", "validation": {"valid": False, "errors": ["stages missing"]}},
+])
+def test_failed_or_invalid_run_is_not_cached(harness_agent, bad):
+    first, second = run_with(harness_agent, [bad, GOOD])
+    assert not first.get("cached")
+    assert not second.get("cached")
+    assert second["output"] == GOOD["output"]
+
+
+def test_valid_run_is_cached(harness_agent):
+    first, second = run_with(harness_agent, [GOOD])
+    assert not first.get("cached")
+    assert second["cached"]
+
+
+@pytest.mark.parametrize("header, flags", [
+    (None, (True, True)),
+    ("no-cache", (False, True)),
+    ("no-store", (False, False)),
+    ("max-age=0, No-Store", (False, False)),
+])
+def test_cache_control_flags(header, flags):
+    assert _cache_flags(header) == flags
+
+
+def test_no_cache_skips_lookup_but_stores(harness_agent):
+    run_with(harness_agent, [GOOD], calls=1)
+    fresh, = run_with(harness_agent, [GOOD], calls=1, use_cache=False)
+    assert not fresh.get("cached")
+    assert agent.response_cache.stores == 2
+
+
+def test_no_store_keeps_the_answer_out_of_the_caches(harness_agent):
+    run_with(harness_agent, [GOOD], calls=1, use_cache=False, store_cache=False)
+    assert agent.response_cache.stores == 0
+    assert agent.semantic_cache.stores == 0
+    after, = run_with(harness_agent, [GOOD], calls=1)
+    assert not after.get("cached")
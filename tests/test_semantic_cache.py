@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+from semantic_cache import SemanticCache, requirement_signature
+
+STORED = "Python CI pipeline with build and test for service alpha"
+
+
+def lookup(request, stored=STORED):
+    cache = SemanticCache(True, "hashing", 0.85, 16, 60)
+
+    async def run():
+        await cache.store("pipeline", stored, {"output": "pipeline:\n  name: alpha\n"})
+        return await cache.lookup("pipeline", request)
+
+    return asyncio.run(run())
+
+
+def test_paraphrase_with_the_same_service_hits():
+    assert lookup("CI pipeline for python service alpha, build+test") is not None
+
+
+@pytest.mark.parametrize("request_text", [
+    "Python CI pipeline with build and test for service beta",
+    "Python CI pipeline with build and test for the beta service",
+    "Python CI pipeline with build, test and deploy for service alpha",
+    "Python CI pipeline with build and test for service alpha without deploy",
+])
+def test_different_service_or_requirements_miss(request_text):
+    assert lookup(request_text) is None
+
+
+def test_signature_keeps_names_urls_and_identifiers():
+    signature = requirement_signature('Pipeline named checkout_v2 for https://github.com/acme/checkout in "Team Payments"')
+    assert {"checkout_v2", "https://github.com/acme/checkout", "team payments"} <= signature
+
+
+def test_staging_is_not_stages():
+    assert requirement_signature("deploy to staging") != requirement_signature("deploy stages")
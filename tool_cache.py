@@ -0,0 +1,212 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Verb prefixes of MCP tools that change Harness resources
+MUTATING_PREFIXES = ("create_", "update_", "delete_", "upsert_", "move_")
+
+
+class ToolResultCache:
+    """
+    Cache for results of read-only MCP tools.
+
+    Entries are keyed on the tool name plus the canonicalized JSON arguments,
+    expire after a per-tool TTL and are evicted least-recently-used once the
+    cached results exceed ``max_bytes``. Concurrent identical calls share a
+    single in-flight round-trip, and a call to a mutating tool (e.g.
+    ``create_pipeline``) invalidates every cached tool for the same resource
+    (``list_pipelines``, ``get_pipeline``).
+    """
+
+    def __init__(
+        self,
+        allowlist: List[str],
+        default_ttl: float,
+        ttl_overrides: Optional[Dict[str, float]] = None,
+        max_bytes: int = 16 * 1024 * 1024,
+        enabled: bool = True,
+    ):
+        self.allowlist = set(allowlist)
+        self.default_ttl = default_ttl
+        self.ttl_overrides = ttl_overrides or {}
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = OrderedDict()
+        self._in_flight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._size_bytes = 0
+        self._generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(tool_name: str, arguments: Any) -> Tuple[str, str]:
+        """Key on tool name plus arguments serialized with sorted keys."""
+        try:
+            canonical = json.dumps(arguments, sort_keys=True, separators=(",", ":"), default=str)
+        except (TypeError, ValueError):
+            canonical = str(arguments)
+        return tool_name, canonical
+
+    def is_cacheable(self, tool_name: str) -> bool:
+        return self.enabled and tool_name in self.allowlist
+
+    def ttl_for(self, tool_name: str) -> float:
+        return self.ttl_overrides.get(tool_name, self.default_ttl)
+
+    def get(self, tool_name: str, arguments: Any) -> Optional[str]:
+        """Return a fresh cached result, or None."""
+        key = self.make_key(tool_name, arguments)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, tool_name: str, arguments: Any, value: str):
+        key = self.make_key(tool_name, arguments)
+        if key in self._entries:
+            self._remove(key)
+
+        size = len(value)
+        if size > self.max_bytes:
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl_for(tool_name), value)
+        self._size_bytes += size
+        while self._size_bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: Tuple[str, str]):
+        _, value = self._entries.pop(key)
+        self._size_bytes -= len(value)
+
+    async def get_or_load(
+        self,
+        tool_name: str,
+        arguments: Any,
+        loader: Callable[[], Awaitable[str]],
+    ) -> str:
+        """
+        Return the cached result for a call, loading it at most once.
+
+        Non-cacheable tools always call ``loader``; mutating tools also
+        invalidate related entries, both before and after the call, so a
+        read that completed while the write was in flight is not kept. A
+        loader that raises is not cached and the exception is propagated to
+        every coalesced caller; if the loading call is cancelled, coalesced
+        callers run ``loader`` themselves.
+        """
+        if not self.is_cacheable(tool_name):
+            if not tool_name.startswith(MUTATING_PREFIXES):
+                return await loader()
+            self.invalidate_related(tool_name)
+            try:
+                return await loader()
+            finally:
+                self.invalidate_related(tool_name)
+
+        cached = self.get(tool_name, arguments)
+        if cached is not None:
+            self.hits += 1
+            logger.debug(f"Tool cache hit: {tool_name}")
+            return cached
+
+        key = self.make_key(tool_name, arguments)
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            logger.debug(f"Tool cache coalesced: {tool_name}")
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # The loading call was cancelled, not us: load it ourselves
+                if not pending.cancelled() or asyncio.current_task().cancelling():
+                    raise
+            return await loader()
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        generation = self._generation
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an uncontended failure doesn't log a warning
+            future.exception()
+            raise
+        else:
+            # Skip storing if a mutating call invalidated entries meanwhile
+            if generation == self._generation:
+                self.put(tool_name, arguments, value)
+            future.set_result(value)
+            return value
+        finally:
+            self._in_flight.pop(key, None)
+
+    def invalidate_related(self, tool_name: str):
+        """Drop cached entries for the resource a mutating tool touches."""
+        resource = tool_name
+        for prefix in MUTATING_PREFIXES:
+            if tool_name.startswith(prefix):
+                resource = tool_name[len(prefix):]
+                break
+
+        self._generation += 1
+        stale = [key for key in self._entries if resource in key[0]]
+        for key in stale:
+            self._remove(key)
+        self.invalidations += len(stale)
+        if stale:
+            logger.info(f"Tool cache: {tool_name} invalidated {len(stale)} '{resource}' entries")
+
+    def clear(self):
+        self._generation += 1
+        self._entries.clear()
+        self._size_bytes = 0
+
+    def get_metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "size_bytes": self._size_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "in_flight": len(self._in_flight),
+        }
+
+
+# Global tool result cache instance
+tool_cache = ToolResultCache(
+    allowlist=settings.tool_cache_allowlist,
+    default_ttl=settings.tool_cache_default_ttl,
+    ttl_overrides=settings.tool_cache_ttl_overrides,
+    max_bytes=settings.tool_cache_max_bytes,
+    enabled=settings.tool_cache_enabled,
+)
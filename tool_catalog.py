@@ -0,0 +1,159 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+import langchain_core
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bump when the snapshot layout changes; older snapshots are ignored
+SNAPSHOT_FORMAT = 1
+
+
+def catalog_hash(tools: List[Dict[str, Any]]) -> str:
+    """Content hash of a tool catalog (names, descriptions and input schemas)."""
+    canonical = json.dumps(sorted(tools, key=lambda t: t["name"]), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def tool_to_dict(tool: Any) -> Dict[str, Any]:
+    """Plain-dict form of an MCP ``Tool``."""
+    return {
+        "name": tool.name,
+        "description": tool.description or "",
+        "inputSchema": tool.inputSchema,
+    }
+
+
+class ToolCatalogSnapshot:
+    """
+    On-disk snapshot of the MCP tool catalog.
+
+    Stores the tools returned by ``list_tools`` with a content hash, plus
+    the OpenAI function schemas generated from them, so a restart can skip
+    both the ``list_tools`` round trip and schema generation. Function
+    schemas are only reused when the catalog hash and the LangChain
+    version that produced them still match. Writes go through a temp file
+    and ``os.replace`` so concurrent workers never see a partial file.
+    """
+
+    def __init__(self, enabled: bool, path: str):
+        self.enabled = enabled
+        self.path = path
+        self._data: Optional[Dict[str, Any]] = None
+
+        self.loads = 0
+        self.saves = 0
+        self.schema_hits = 0
+        self.schema_misses = 0
+
+    def _read(self) -> Optional[Dict[str, Any]]:
+        if self._data is not None:
+            return self._data
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable tool catalog snapshot {self.path}: {e}")
+            return None
+
+        if data.get("format") != SNAPSHOT_FORMAT or data.get("server") != settings.mcp_server_path:
+            logger.info("Tool catalog snapshot is for a different format or MCP server; ignoring it")
+            return None
+        self._data = data
+        return data
+
+    def _write(self, data: Dict[str, Any]):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tool_catalog-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write tool catalog snapshot {self.path}: {e}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+        self._data = data
+        self.saves += 1
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Return ``{"hash", "tools", "saved_at"}`` from disk, or None."""
+        if not self.enabled:
+            return None
+        data = self._read()
+        if data is None:
+            return None
+        self.loads += 1
+        return {"hash": data["hash"], "tools": data["tools"], "saved_at": data.get("saved_at")}
+
+    def save(self, tools: List[Dict[str, Any]]) -> str:
+        """Persist ``tools`` (if enabled) and return their catalog hash."""
+        digest = catalog_hash(tools)
+        if not self.enabled:
+            return digest
+
+        current = self._read()
+        if current is not None and current.get("hash") == digest:
+            return digest
+        self._write({
+            "format": SNAPSHOT_FORMAT,
+            "server": settings.mcp_server_path,
+            "hash": digest,
+            "saved_at": time.time(),
+            "tools": tools,
+            "function_schemas": None,
+        })
+        return digest
+
+    def _schema_key(self, digest: str) -> str:
+        return f"{digest}:{langchain_core.__version__}"
+
+    def get_function_schemas(self, digest: str) -> Optional[List[Dict[str, Any]]]:
+        """Precomputed OpenAI function schemas for catalog ``digest``, if stored."""
+        data = self._read() if self.enabled else None
+        stored = (data or {}).get("function_schemas") or {}
+        if stored.get("key") != self._schema_key(digest):
+            self.schema_misses += 1
+            return None
+        self.schema_hits += 1
+        return stored["schemas"]
+
+    def save_function_schemas(self, digest: str, schemas: List[Dict[str, Any]]):
+        if not self.enabled:
+            return
+        data = self._read()
+        if data is None or data.get("hash") != digest:
+            return
+        self._write({**data, "function_schemas": {"key": self._schema_key(digest), "schemas": schemas}})
+
+    def get_metrics(self) -> Dict[str, Any]:
+        data = self._data or {}
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "hash": data.get("hash"),
+            "tools": len(data.get("tools") or []),
+            "saved_at": data.get("saved_at"),
+            "loads": self.loads,
+            "saves": self.saves,
+            "schema_hits": self.schema_hits,
+            "schema_misses": self.schema_misses,
+        }
+
+
+# Global tool catalog snapshot instance
+tool_catalog = ToolCatalogSnapshot(
+    enabled=settings.tool_catalog_snapshot_enabled,
+    path=settings.tool_catalog_path,
+)
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Kept at any level of a projected document so the agent can ask for the next page
+PAGINATION_KEYS = {
+    "pageIndex", "pageSize", "pageItemCount", "totalItems", "totalPages", "empty", "first", "last",
+    "page", "size", "total", "hasMore", "next", "nextPage", "nextPageToken", "pageToken", "cursor", "nextCursor",
+}
+
+# Longest string kept in a projected list item
+MAX_FIELD_CHARS = 300
+
+
+def _compact(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _largest_list(node: Any) -> Optional[Tuple[Dict[str, Any], str, List[Any]]]:
+    """The longest list of objects in ``node`` as (parent, key, list)."""
+    best = None
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, dict):
+            for key, value in current.items():
+                if isinstance(value, list) and value and isinstance(value[0], dict):
+                    if best is None or len(value) > len(best[2]):
+                        best = (current, key, value)
+                if isinstance(value, (dict, list)):
+                    stack.append(value)
+        elif isinstance(current, list):
+            stack.extend(item for item in current if isinstance(item, (dict, list)))
+    return best
+
+
+class ToolOutputShaper:
+    """
+    Keeps MCP tool results handed to the LLM within a byte budget.
+
+    Results under the tool's budget pass through untouched (no parse or
+    pretty-print round trip). Larger JSON results are parsed, off the event
+    loop above ``offload_bytes``, and projected: items of the largest list
+    keep only ``item_fields`` (identifiers, names, types, status...) and
+    pagination fields survive at every level. If the projection is still
+    over budget the list is cut and a ``_truncated`` note tells the agent
+    how many items it is not seeing and how to page. Non-JSON text is cut
+    at the budget with a marker. About 4 bytes make one token.
+    """
+
+    def __init__(self, max_bytes: int, overrides: Dict[str, int], item_fields: List[str], offload_bytes: int):
+        self.max_bytes = max_bytes
+        self.overrides = overrides
+        self.item_fields = item_fields
+        self.offload_bytes = offload_bytes
+
+        self.calls = 0
+        self.shaped = 0
+        self.projected = 0
+        self.truncated = 0
+        self.offloaded = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._per_tool: Dict[str, Dict[str, int]] = {}
+
+    def budget(self, tool: str) -> int:
+        return self.overrides.get(tool, self.max_bytes)
+
+    async def shape(self, tool: str, text: str) -> str:
+        """Fit ``text`` from ``tool`` into its budget."""
+        self.calls += 1
+        budget = self.budget(tool)
+        # At most 4 bytes per character, so short text needs no encoding to check
+        if budget <= 0 or len(text) * 4 <= budget:
+            return text
+        size = len(text.encode("utf-8"))
+        if size <= budget:
+            return text
+
+        if size > self.offload_bytes:
+            self.offloaded += 1
+            shaped, projected, truncated = await asyncio.to_thread(self._shape, text, budget)
+        else:
+            shaped, projected, truncated = self._shape(text, budget)
+
+        self.shaped += 1
+        self.projected += projected
+        self.truncated += truncated
+        self.bytes_in += size
+        self.bytes_out += len(shaped.encode("utf-8"))
+        stats = self._per_tool.setdefault(tool, {"shaped": 0, "bytes_in": 0, "bytes_out": 0})
+        stats["shaped"] += 1
+        stats["bytes_in"] += size
+        stats["bytes_out"] += len(shaped.encode("utf-8"))
+        logger.info(f"Shaped {tool} output from {size} to {len(shaped)} bytes (budget {budget})")
+        return shaped
+
+    def _shape(self, text: str, budget: int) -> Tuple[str, bool, bool]:
+        try:
+            document = json.loads(text)
+        except ValueError:
+            return self._cut(text, budget), False, True
+
+        found = _largest_list(document)
+        if found is None:
+            return self._cut(_compact(document), budget), False, True
+
+        parent, key, items = found
+        parent[key] = [self._project_item(item) for item in items]
+        shaped = _compact(document)
+        if len(shaped.encode("utf-8")) <= budget:
+            return shaped, True, False
+
+        # Keep as many projected items as fit, leaving room for the note
+        projected = parent[key]
+        parent[key] = []
+        parent["_truncated"] = {
+            "field": key, "shown": 0, "total": len(projected),
+            "hint": "Output was cut to fit the budget; request a smaller page or filter the query",
+        }
+        used = len(_compact(document).encode("utf-8"))
+        kept = []
+        for item in projected:
+            item_size = len(_compact(item).encode("utf-8")) + 1
+            if used + item_size > budget:
+                break
+            kept.append(item)
+            used += item_size
+        parent[key] = kept
+        parent["_truncated"]["shown"] = len(kept)
+        shaped = _compact(document)
+        if len(shaped.encode("utf-8")) > budget:
+            return self._cut(shaped, budget), True, True
+        return shaped, True, True
+
+    def _project_item(self, item: Any) -> Any:
+        if not isinstance(item, dict):
+            return item
+        fields = [k for k in self.item_fields if k in item]
+        if not fields:
+            # Unknown shape: keep the scalar fields
+            fields = [k for k, v in item.items() if not isinstance(v, (dict, list))]
+        projected = {}
+        for key in fields:
+            value = item[key]
+            if isinstance(value, str) and len(value) > MAX_FIELD_CHARS:
+                value = value[:MAX_FIELD_CHARS] + "..."
+            elif isinstance(value, (dict, list)) and len(_compact(value)) > MAX_FIELD_CHARS:
+                continue
+            projected[key] = value
+        for key in PAGINATION_KEYS & item.keys():
+            projected.setdefault(key, item[key])
+        return projected
+
+    @staticmethod
+    def _cut(text: str, budget: int) -> str:
+        marker = f"\n... (truncated to {budget} bytes of {len(text)}; narrow the query for more)"
+        head = text.encode("utf-8")[:max(0, budget - len(marker))].decode("utf-8", errors="ignore")
+        return head + marker
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "max_bytes": self.max_bytes,
+            "overrides": self.overrides,
+            "calls": self.calls,
+            "shaped": self.shaped,
+            "projected": self.projected,
+            "truncated": self.truncated,
+            "offloaded": self.offloaded,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "estimated_tokens_saved": (self.bytes_in - self.bytes_out) // 4,
+            "per_tool": self._per_tool,
+        }
+
+
+# Global tool output shaper instance
+tool_output = ToolOutputShaper(
+    max_bytes=settings.tool_output_max_bytes,
+    overrides=settings.tool_output_max_bytes_overrides,
+    item_fields=settings.tool_output_item_fields,
+    offload_bytes=settings.tool_output_offload_bytes,
+)
@@ -0,0 +1,208 @@
+import json
+import logging
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from instrumentation import instrumentation
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Offered on every request regardless of score
+ALWAYS_INCLUDE = ("generate_yaml", "submit_yaml")
+
+# Tools whose names contain one of these words are relevant to every request of the kind
+KIND_TOOL_KEYWORDS = {
+    "pipeline": ("pipeline", "template", "connector", "service", "environment", "infrastructure"),
+    "connector": ("connector", "secret"),
+    "query": (),
+}
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "for", "with", "to", "of", "in", "on", "by", "my", "our",
+    "me", "i", "we", "please", "can", "you", "that", "this", "it", "is", "are", "be", "all",
+    "from", "into", "using", "use", "get", "list", "create", "generate", "make", "show",
+    "harness", "io", "yaml", "tool", "tools", "given", "specific", "details",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with snake_case split and a plural ``s`` stripped."""
+    tokens = []
+    for word in re.findall(r"[a-z0-9]+", text.lower().replace("_", " ")):
+        if word in STOPWORDS or len(word) < 2:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def estimate_tokens(schema: Dict[str, Any]) -> int:
+    """Rough prompt-token cost of one function schema (about 4 characters per token)."""
+    return max(1, len(json.dumps(schema, separators=(",", ":"))) // 4)
+
+
+class _CatalogIndex:
+    """Per-catalog tool token weights (and embeddings, for the embedding strategy)."""
+
+    def __init__(self, schemas: Dict[str, Dict[str, Any]]):
+        self.names = list(schemas)
+        self.name_tokens = {name: set(tokenize(name)) for name in self.names}
+        self.tokens: Dict[str, Counter] = {}
+        document_frequency: Counter = Counter()
+        for name, schema in schemas.items():
+            counts = Counter(tokenize(schema.get("description", "")))
+            for token in self.name_tokens[name]:
+                counts[token] += 2  # name matches count double
+            self.tokens[name] = counts
+            document_frequency.update(counts.keys())
+
+        total = len(self.names)
+        self.idf = {t: math.log(1 + total / df) for t, df in document_frequency.items()}
+        self.schema_tokens = {name: estimate_tokens(schema) for name, schema in schemas.items()}
+        self.full_tokens = sum(self.schema_tokens.values())
+        self.embeddings: Optional[np.ndarray] = None
+
+
+class ToolRouter:
+    """
+    Picks the tools worth sending to the LLM for one request.
+
+    Every tool gets a score: 1.0 if its name carries a keyword of the
+    endpoint kind, plus how well it matches the request, either by
+    IDF-weighted keyword overlap with its name and description or by
+    embedding similarity. The top ``max_tools`` tools above
+    ``min_score`` are offered (plus ``generate_yaml``); if nothing
+    qualifies the caller uses the full toolset.
+    """
+
+    def __init__(self, enabled: bool, strategy: str, max_tools: int, min_score: float):
+        self.enabled = enabled
+        self.strategy = strategy
+        self.max_tools = max_tools
+        self.min_score = min_score
+        self._index: Optional[Tuple[str, _CatalogIndex]] = None
+        self._embedder = None
+
+        self.routed = 0
+        self.fallbacks: Dict[str, int] = {"no_match": 0, "invalid_tool": 0}
+        self.tools_offered = 0
+        self.schema_tokens_full = 0
+        self.schema_tokens_sent = 0
+
+    def _get_index(self, catalog_key: str, schemas: Dict[str, Dict[str, Any]]) -> _CatalogIndex:
+        if self._index is None or self._index[0] != catalog_key:
+            self._index = (catalog_key, _CatalogIndex(schemas))
+        return self._index[1]
+
+    async def _embedding_scores(self, index: _CatalogIndex, schemas: Dict[str, Dict[str, Any]],
+                                user_request: str) -> Dict[str, float]:
+        if self._embedder is None:
+            from semantic_cache import create_embedder
+            self._embedder = create_embedder(settings.semantic_cache_embedder)
+        if index.embeddings is None:
+            vectors = [
+                await self._embedder.embed(f"{name} {schemas[name].get('description', '')}")
+                for name in index.names
+            ]
+            index.embeddings = np.vstack(vectors)
+        query = await self._embedder.embed(user_request)
+        similarities = index.embeddings @ query
+        return {name: float(similarities[i]) for i, name in enumerate(index.names)}
+
+    @staticmethod
+    def _keyword_scores(index: _CatalogIndex, user_request: str) -> Dict[str, float]:
+        request_tokens = set(tokenize(user_request))
+        if not request_tokens:
+            return {name: 0.0 for name in index.names}
+        norm = sum(index.idf.get(t, 0.0) for t in request_tokens) or 1.0
+        return {
+            name: sum(index.idf[t] * min(counts[t], 2) for t in request_tokens if t in counts) / (2 * norm)
+            for name, counts in index.tokens.items()
+        }
+
+    async def select(self, kind: str, user_request: str, schemas: Dict[str, Dict[str, Any]],
+                     catalog_key: str) -> Optional[List[str]]:
+        """Names of the tools to offer for this request, or None for the full toolset."""
+        if not self.enabled or not schemas:
+            return None
+
+        index = self._get_index(catalog_key, schemas)
+        if self.strategy == "embedding":
+            match = await self._embedding_scores(index, schemas, user_request)
+        else:
+            match = self._keyword_scores(index, user_request)
+
+        keywords = KIND_TOOL_KEYWORDS.get(kind, ())
+        scores = {}
+        for name in index.names:
+            if name in ALWAYS_INCLUDE:
+                continue
+            base = 1.0 if any(k in index.name_tokens[name] for k in keywords) else 0.0
+            scores[name] = base + match[name]
+
+        ranked = sorted(
+            (name for name, score in scores.items() if score >= self.min_score),
+            key=lambda name: scores[name], reverse=True
+        )[:self.max_tools]
+
+        if not ranked:
+            self.fallbacks["no_match"] += 1
+            self._record(index.full_tokens, index.full_tokens, len(index.names))
+            instrumentation.observe_tool_routing("no_match")
+            logger.info(f"Tool routing found no relevant tools for {kind} request; using all {len(index.names)}")
+            return None
+
+        selected = ranked + [name for name in ALWAYS_INCLUDE if name in schemas]
+        # Keep catalog order so equal subsets share one executor
+        selected = [name for name in index.names if name in selected]
+        sent = sum(index.schema_tokens[name] for name in selected)
+        self.routed += 1
+        self._record(index.full_tokens, sent, len(selected))
+        instrumentation.observe_tool_routing("routed", index.full_tokens - sent)
+        logger.info(
+            f"Routed {kind} request to {len(selected)}/{len(index.names)} tools "
+            f"(~{index.full_tokens - sent} schema tokens saved per LLM call): {selected}"
+        )
+        return selected
+
+    def _record(self, full_tokens: int, sent_tokens: int, tools: int):
+        self.tools_offered += tools
+        self.schema_tokens_full += full_tokens
+        self.schema_tokens_sent += sent_tokens
+
+    def record_fallback(self, reason: str):
+        """A routed run had to be repeated with the full toolset."""
+        self.fallbacks[reason] = self.fallbacks.get(reason, 0) + 1
+        instrumentation.observe_tool_routing(reason)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        decisions = self.routed + self.fallbacks["no_match"]
+        saved = self.schema_tokens_full - self.schema_tokens_sent
+        return {
+            "enabled": self.enabled,
+            "strategy": self.strategy,
+            "max_tools": self.max_tools,
+            "min_score": self.min_score,
+            "catalog_tools": len(self._index[1].names) if self._index else 0,
+            "routed": self.routed,
+            "fallbacks": dict(self.fallbacks),
+            "avg_tools_offered": round(self.tools_offered / decisions, 2) if decisions else 0.0,
+            # Estimates (~4 characters per token) of function-schema prompt tokens per LLM call
+            "schema_tokens_full": self.schema_tokens_full,
+            "schema_tokens_sent": self.schema_tokens_sent,
+            "schema_tokens_saved": saved,
+            "schema_token_savings_ratio": round(saved / self.schema_tokens_full, 4) if self.schema_tokens_full else 0.0,
+        }
+
+
+# Global tool router instance
+tool_router = ToolRouter(
+    enabled=settings.tool_routing_enabled,
+    strategy=settings.tool_routing_strategy,
+    max_tools=settings.tool_routing_max_tools,
+    min_score=settings.tool_routing_min_score,
+)
@@ -0,0 +1,62 @@
+import asyncio
+import fcntl
+import logging
+import os
+import tempfile
+from typing import Optional
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Kept open for the life of the process; the OS drops the lock when it exits
+_slot_file = None
+_slot_index: Optional[int] = None
+
+
+def claim_worker_slot(max_slots: int = 64) -> int:
+    """
+    Claim the lowest free worker slot on this host.
+
+    uvicorn and gunicorn don't tell a worker its index, so each worker
+    takes an exclusive lock on the first free slot file. A worker that is
+    restarted after a crash reuses the slot its predecessor held. Set
+    ``WORKER_INDEX`` to override.
+    """
+    global _slot_file, _slot_index
+    if _slot_index is not None:
+        return _slot_index
+
+    if os.environ.get("WORKER_INDEX"):
+        _slot_index = int(os.environ["WORKER_INDEX"])
+        return _slot_index
+
+    directory = os.path.join(tempfile.gettempdir(), f"harness-agent-{settings.api_port}")
+    os.makedirs(directory, exist_ok=True)
+    for index in range(max_slots):
+        handle = open(os.path.join(directory, f"worker-{index}.lock"), "w")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            continue
+        _slot_file = handle
+        _slot_index = index
+        return index
+
+    logger.warning(f"All {max_slots} worker slots are taken; using slot 0")
+    _slot_index = 0
+    return _slot_index
+
+
+def startup_delay(worker_index: int) -> float:
+    """Seconds worker ``worker_index`` should wait before starting MCP sessions."""
+    return worker_index * settings.worker_startup_stagger
+
+
+async def staggered_start(worker_index: int):
+    """Delay startup by ``worker_index * WORKER_STARTUP_STAGGER`` seconds."""
+    delay = startup_delay(worker_index)
+    if delay > 0:
+        logger.info(f"Worker {worker_index} (pid {os.getpid()}) waiting {delay:.1f}s before starting MCP sessions")
+        await asyncio.sleep(delay)
+
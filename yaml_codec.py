@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict
+import yaml
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# libyaml bindings when PyYAML was built with them, pure Python otherwise
+try:
+    from yaml import CSafeDumper as SafeDumper, CSafeLoader as SafeLoader
+    LIBYAML = True
+except ImportError:
+    from yaml import SafeDumper, SafeLoader
+    LIBYAML = False
+
+# Rough YAML bytes per scalar, for sizing documents without dumping them
+BYTES_PER_SCALAR = 24
+
+
+def estimate_size(data: Any, limit: int) -> int:
+    """Approximate serialized size of ``data``, counting no further than ``limit``."""
+    if isinstance(data, (str, bytes)):
+        return len(data)
+    size = 0
+    stack = [data]
+    while stack and size <= limit:
+        node = stack.pop()
+        if isinstance(node, dict):
+            size += sum(len(str(key)) for key in node) + 8 * len(node)
+            stack.extend(node.values())
+        elif isinstance(node, (list, tuple)):
+            size += 4 * len(node)
+            stack.extend(node)
+        elif isinstance(node, str):
+            size += len(node) + 2
+        else:
+            size += BYTES_PER_SCALAR
+    return size
+
+
+class YamlCodec:
+    """
+    YAML parsing and serialization for every generate, parse and validate path.
+
+    Uses the libyaml C loader and dumper when available (several times
+    faster than the pure-Python ones, same safe subset and output) and
+    falls back to pure Python otherwise. The async methods run documents
+    larger than ``offload_bytes`` in a worker thread so a big pipeline does
+    not stall the event loop for other requests; small ones are handled
+    inline, where a thread hop would cost more than the work.
+    """
+
+    def __init__(self, offload_bytes: int, use_libyaml: bool = True):
+        self.offload_bytes = offload_bytes
+        self.libyaml = LIBYAML and use_libyaml
+        self._loader = SafeLoader if self.libyaml else yaml.SafeLoader
+        self._dumper = SafeDumper if self.libyaml else yaml.SafeDumper
+
+        self.loads = 0
+        self.dumps = 0
+        self.offloaded = 0
+        self.load_seconds = 0.0
+        self.dump_seconds = 0.0
+
+    def load(self, text: str) -> Any:
+        """Parse one YAML document (safe subset)."""
+        started = time.perf_counter()
+        try:
+            return yaml.load(text, Loader=self._loader)
+        finally:
+            self.loads += 1
+            self.load_seconds += time.perf_counter() - started
+
+    def dump(self, data: Any) -> str:
+        """Serialize in block style, keeping key order."""
+        started = time.perf_counter()
+        try:
+            return yaml.dump(data, Dumper=self._dumper, default_flow_style=False, sort_keys=False)
+        finally:
+            self.dumps += 1
+            self.dump_seconds += time.perf_counter() - started
+
+    async def aload(self, text: str) -> Any:
+        if len(text) > self.offload_bytes:
+            self.offloaded += 1
+            return await asyncio.to_thread(self.load, text)
+        return self.load(text)
+
+    async def adump(self, data: Any) -> str:
+        if estimate_size(data, self.offload_bytes) > self.offload_bytes:
+            self.offloaded += 1
+            return await asyncio.to_thread(self.dump, data)
+        return self.dump(data)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "libyaml": self.libyaml,
+            "offload_bytes": self.offload_bytes,
+            "loads": self.loads,
+            "dumps": self.dumps,
+            "offloaded": self.offloaded,
+            "avg_load_ms": round(self.load_seconds * 1000 / self.loads, 3) if self.loads else 0.0,
+            "avg_dump_ms": round(self.dump_seconds * 1000 / self.dumps, 3) if self.dumps else 0.0,
+        }
+
+
+# Global YAML codec instance
+yaml_codec = YamlCodec(offload_bytes=settings.yaml_offload_bytes, use_libyaml=settings.yaml_use_libyaml)